@@ -0,0 +1,153 @@
+"""add users lower email unique index
+
+Revision ID: 0d15bf15e4f1
+Revises: ef1504b29e40
+Create Date: 2026-10-17 20:53:19.968412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d15bf15e4f1'
+down_revision: Union[str, None] = 'ef1504b29e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+users = sa.table(
+    'users',
+    sa.column('id', sa.String),
+    sa.column('email', sa.String),
+    sa.column('full_name', sa.String),
+    sa.column('picture', sa.String),
+    sa.column('google_id', sa.String),
+    sa.column('hashed_password', sa.String),
+    sa.column('created_at', sa.DateTime),
+)
+refresh_tokens = sa.table(
+    'refresh_tokens',
+    sa.column('user_id', sa.String),
+)
+
+# Поля, которые переносятся в оставшийся аккаунт, если у него их нет
+MERGED_FIELDS = ('full_name', 'picture', 'google_id', 'hashed_password')
+# Способы входа: разные значения у дубликатов - это разные люди или
+# аккаунты, автоматически их не сливаем
+IDENTITY_FIELDS = ('google_id', 'hashed_password')
+
+
+def _conflicts(accounts) -> list:
+    """Поля входа, в которых у дубликатов разные непустые значения"""
+    return [
+        field
+        for field in IDENTITY_FIELDS
+        if len({row[field] for row in accounts if row[field] is not None}) > 1
+    ]
+
+
+def _merge_duplicates(conn) -> None:
+    """
+    Аккаунты, отличающиеся только регистром email, сливаются в самый старый:
+    он получает недостающие google_id/пароль/профиль, сессии дубликатов
+    переходят к нему, дубликаты удаляются. Пробел заполняется, только если
+    у дубликатов в этом поле одно значение.
+
+    Если у дубликатов разные google_id или пароли, миграция прерывается
+    до любых изменений со списком таких аккаунтов: их нужно развести
+    вручную (сменить email или удалить лишний аккаунт) и повторить.
+    """
+    duplicated = (
+        sa.select(sa.func.lower(users.c.email))
+        .group_by(sa.func.lower(users.c.email))
+        .having(sa.func.count() > 1)
+    )
+    rows = conn.execute(
+        sa.select(users)
+        .where(sa.func.lower(users.c.email).in_(duplicated))
+        .order_by(sa.func.lower(users.c.email), users.c.created_at, users.c.id)
+    ).mappings().all()
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(row['email'].lower(), []).append(row)
+
+    conflicts = {
+        email: fields
+        for email, accounts in groups.items()
+        if (fields := _conflicts(accounts))
+    }
+    if conflicts:
+        details = '\n'.join(
+            f"  {email}: conflicting {', '.join(fields)} "
+            f"(ids {', '.join(row['id'] for row in groups[email])})"
+            for email, fields in conflicts.items()
+        )
+        raise RuntimeError(
+            'Accounts differing only by email case have conflicting sign-in '
+            f'identities; resolve them manually and rerun:\n{details}'
+        )
+
+    for accounts in groups.values():
+        keeper, duplicates = accounts[0], accounts[1:]
+        merged = {}
+        for field in MERGED_FIELDS:
+            values = {row[field] for row in duplicates if row[field] is not None}
+            if keeper[field] is None and len(values) == 1:
+                merged[field] = values.pop()
+        duplicate_ids = [row['id'] for row in duplicates]
+
+        conn.execute(
+            refresh_tokens.update()
+            .where(refresh_tokens.c.user_id.in_(duplicate_ids))
+            .values(user_id=keeper['id'])
+        )
+        # Сначала удаляем дубликаты: google_id уникален
+        conn.execute(users.delete().where(users.c.id.in_(duplicate_ids)))
+        if merged:
+            conn.execute(
+                users.update().where(users.c.id == keeper['id']).values(**merged)
+            )
+
+
+def _create_index(conn) -> None:
+    if conn.dialect.name == 'postgresql':
+        # Без блокировки записи в users на время построения индекса
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_users_email_lower',
+                'users',
+                [sa.text('lower(email)')],
+                unique=True,
+                postgresql_concurrently=True,
+            )
+    else:
+        op.create_index(
+            'ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True
+        )
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    _merge_duplicates(conn)
+    # Переписываются только строки с заглавными буквами в email
+    lower_email = sa.func.lower(users.c.email)
+    conn.execute(
+        users.update().where(users.c.email != lower_email).values(email=lower_email)
+    )
+    _create_index(conn)
+
+
+def downgrade() -> None:
+    # Слитые аккаунты не восстанавливаются
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(
+                'ix_users_email_lower',
+                table_name='users',
+                postgresql_concurrently=True,
+            )
+    else:
+        op.drop_index('ix_users_email_lower', table_name='users')
@@ -0,0 +1,131 @@
+"""use uuid for users id and drop redundant indexes
+
+Revision ID: be9cfddc9600
+Revises: 64c3b7d30166
+Create Date: 2026-10-17 21:11:52.125190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'be9cfddc9600'
+down_revision: Union[str, None] = '64c3b7d30166'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# ix_users_id дублирует индекс первичного ключа, ix_users_email - уникальный
+# ix_users_email_lower (email хранится в нижнем регистре, поиск по lower(email))
+REDUNDANT_INDEXES = ('ix_users_id', 'ix_users_email')
+
+BACKFILL_BATCH_SIZE = 10000
+
+SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION users_sync_id_uuid() RETURNS trigger AS $$
+BEGIN
+    NEW.id_uuid := NEW.id::uuid;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def _convert_id_to_uuid_postgresql() -> None:
+    """
+    varchar -> uuid без долгой блокировки users (ALTER COLUMN TYPE
+    переписал бы таблицу под ACCESS EXCLUSIVE):
+    теневая колонка с триггером, пачечный backfill, индексы CONCURRENTLY,
+    затем короткая транзакция с подменой колонки. Шаги до подмены
+    идемпотентны: если подмена не дождалась блокировки, миграцию можно повторить.
+    Приложение работает все это время: UserId не приводит тип параметров.
+    """
+    conn = op.get_bind()
+    primary_key = sa.inspect(conn).get_pk_constraint('users')['name'] or 'users_pkey'
+
+    # ADD COLUMN без DEFAULT - только изменение каталога
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.execute('ALTER TABLE users ADD COLUMN IF NOT EXISTS id_uuid uuid')
+    op.execute(SYNC_FUNCTION)
+    op.execute('DROP TRIGGER IF EXISTS users_sync_id_uuid ON users')
+    op.execute(
+        'CREATE TRIGGER users_sync_id_uuid BEFORE INSERT OR UPDATE OF id ON users '
+        'FOR EACH ROW EXECUTE FUNCTION users_sync_id_uuid()'
+    )
+
+    with op.get_context().autocommit_block():
+        # Keyset по первичному ключу: каждая пачка читает только свой диапазон
+        # индекса, а не сканирует заново уже заполненные строки
+        batch_end = sa.text(
+            'SELECT max(id) FROM (SELECT id FROM users WHERE id > :last_id '
+            'ORDER BY id LIMIT :batch_size) AS batch'
+        )
+        backfill = sa.text(
+            'UPDATE users SET id_uuid = id::uuid '
+            'WHERE id > :last_id AND id <= :end_id AND id_uuid IS NULL'
+        )
+        last_id = ''
+        while True:
+            end_id = conn.execute(
+                batch_end, {'last_id': last_id, 'batch_size': BACKFILL_BATCH_SIZE}
+            ).scalar()
+            if end_id is None:
+                break
+            conn.execute(backfill, {'last_id': last_id, 'end_id': end_id})
+            last_id = end_id
+        # Невалидные остатки прерванного CREATE INDEX CONCURRENTLY
+        for index in ('users_id_uuid_key', 'ix_users_created_at_id_uuid'):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index}')
+        op.execute(
+            'CREATE UNIQUE INDEX CONCURRENTLY users_id_uuid_key ON users (id_uuid)'
+        )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY ix_users_created_at_id_uuid '
+            'ON users (created_at, id_uuid)'
+        )
+        # Проверенный CHECK позволяет SET NOT NULL без сканирования таблицы
+        op.execute(
+            'ALTER TABLE users DROP CONSTRAINT IF EXISTS users_id_uuid_not_null'
+        )
+        op.execute(
+            'ALTER TABLE users ADD CONSTRAINT users_id_uuid_not_null '
+            'CHECK (id_uuid IS NOT NULL) NOT VALID'
+        )
+        op.execute('ALTER TABLE users VALIDATE CONSTRAINT users_id_uuid_not_null')
+
+    # Подмена: только изменения каталога, без перезаписи таблицы
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.execute('ALTER TABLE users ALTER COLUMN id_uuid SET NOT NULL')
+    op.execute('ALTER TABLE users DROP CONSTRAINT users_id_uuid_not_null')
+    op.execute('DROP TRIGGER users_sync_id_uuid ON users')
+    op.execute('DROP FUNCTION users_sync_id_uuid()')
+    op.execute(f'ALTER TABLE users DROP CONSTRAINT {primary_key}')
+    # Вместе с колонкой удаляется и старый ix_users_created_at_id
+    op.execute('ALTER TABLE users DROP COLUMN id')
+    op.execute('ALTER TABLE users RENAME COLUMN id_uuid TO id')
+    op.execute(
+        'ALTER TABLE users ADD CONSTRAINT users_pkey PRIMARY KEY '
+        'USING INDEX users_id_uuid_key'
+    )
+    op.execute('ALTER INDEX ix_users_created_at_id_uuid RENAME TO ix_users_created_at_id')
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for index in REDUNDANT_INDEXES:
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index}')
+        _convert_id_to_uuid_postgresql()
+    else:
+        for index in REDUNDANT_INDEXES:
+            op.drop_index(index, table_name='users')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # Обратная конвертация переписывает таблицу под блокировкой
+        op.execute('ALTER TABLE users ALTER COLUMN id TYPE varchar USING id::text')
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
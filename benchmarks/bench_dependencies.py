@@ -0,0 +1,170 @@
+"""
+Бенчмарк накладных расходов зависимостей на запрос: прежний граф (сессия
+и сервисы создаются в каждом запросе) против сервисов уровня приложения
+с ленивой сессией.
+
+Запросы к /auth/me, которые не доходят до БД: с невалидным токеном
+и с валидным токеном (профиль из claims). Приложение вызывается через
+ASGI без сети, считаются созданные сессии и выдачи соединений из пула.
+
+Запуск:
+    python -m benchmarks.bench_dependencies
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+from src.database import LazySession, SessionLocal, get_db, pool_stats
+from src.dependencies.auth import (
+    build_user_repository,
+    get_auth_service,
+    get_password_hasher,
+    get_replica_router,
+    get_revocation_list,
+    get_token_cache,
+    get_token_codec,
+    get_user_cache,
+    get_user_shards,
+    get_user_versions,
+)
+from src.main import app
+from src.models.user import UserRecord
+from src.repositories.cached_user_repository import CachedUserRepository
+from src.repositories.refresh_token_repository import (
+    SQLAlchemyRefreshTokenRepository,
+)
+from src.repositories.revoked_token_repository import (
+    SQLAlchemyRevokedTokenRepository,
+)
+from src.services.auth_service import AuthService
+
+REQUESTS = 3000
+
+sessions_created = 0
+
+
+def counting_session() -> AsyncSession:
+    global sessions_created
+    sessions_created += 1
+    return SessionLocal()
+
+
+async def eager_get_db():
+    """Прежняя get_db: сессия создается до обработки запроса"""
+    async with counting_session() as db:
+        yield db
+
+
+async def lazy_get_db():
+    db = LazySession(counting_session)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def legacy_get_user_repository(
+    db: AsyncSession = Depends(get_db),
+    user_cache=Depends(get_user_cache),
+    replicas=Depends(get_replica_router),
+    shards=Depends(get_user_shards),
+):
+    return CachedUserRepository(build_user_repository(db, replicas, shards), user_cache)
+
+
+def legacy_get_refresh_token_repository(db: AsyncSession = Depends(get_db)):
+    return SQLAlchemyRefreshTokenRepository(db)
+
+
+def legacy_get_revoked_token_repository(db: AsyncSession = Depends(get_db)):
+    return SQLAlchemyRevokedTokenRepository(db)
+
+
+def legacy_get_auth_service(
+    user_repository=Depends(legacy_get_user_repository),
+    password_hasher=Depends(get_password_hasher),
+    token_codec=Depends(get_token_codec),
+    token_cache=Depends(get_token_cache),
+    user_versions=Depends(get_user_versions),
+    refresh_token_repository=Depends(legacy_get_refresh_token_repository),
+    revocation_list=Depends(get_revocation_list),
+    revoked_token_repository=Depends(legacy_get_revoked_token_repository),
+) -> AuthService:
+    """Прежний граф: сервис и репозитории создаются в каждом запросе"""
+    settings = get_settings()
+    return AuthService(
+        user_repository=user_repository,
+        token_codec=token_codec,
+        access_token_expire_minutes=settings.access_token_expire_minutes,
+        password_hasher=password_hasher,
+        token_cache=token_cache,
+        claims_max_age_seconds=settings.claims_max_age_seconds,
+        user_versions=user_versions,
+        refresh_token_repository=refresh_token_repository,
+        refresh_token_secret=settings.secret_key,
+        refresh_token_expire_days=settings.refresh_token_expire_days,
+        revocation_list=revocation_list,
+        revoked_token_repository=revoked_token_repository,
+    )
+
+
+async def measure(client: httpx.AsyncClient, token: str) -> dict:
+    global sessions_created
+    sessions_created = 0
+    checkouts = pool_stats.checkouts
+    headers = {"Authorization": f"Bearer {token}"}
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        await client.get("/auth/me", headers=headers)
+    return {
+        "seconds": time.perf_counter() - started,
+        "sessions": sessions_created,
+        "checkouts": pool_stats.checkouts - checkouts,
+    }
+
+
+def report(name: str, result: dict) -> None:
+    per_request = result["seconds"] / REQUESTS * 1e6
+    print(
+        f"  {name:<40} {per_request:8.1f} мкс/запрос"
+        f"  сессий: {result['sessions']:5d}  выдач из пула: {result['checkouts']}"
+    )
+
+
+async def main():
+    now = datetime.utcnow()
+    user = UserRecord(
+        "bench-user", "bench@example.com", "Bench", None, None, None, True, now, now
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        token = app.state.auth_service.create_access_token(user).access_token
+        scenarios = {"невалидный токен": "invalid_token", "профиль из claims": token}
+        graphs = {
+            "прежний граф, сессия в каждом запросе": {
+                get_db: eager_get_db,
+                get_auth_service: legacy_get_auth_service,
+            },
+            "сервисы приложения, ленивая сессия": {get_db: lazy_get_db},
+        }
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            print(f"{REQUESTS} запросов GET /auth/me через ASGI:")
+            for scenario, scenario_token in scenarios.items():
+                print(f" {scenario}:")
+                for name, overrides in graphs.items():
+                    app.dependency_overrides = overrides
+                    await measure(client, scenario_token)  # прогрев
+                    report(name, await measure(client, scenario_token))
+        app.dependency_overrides = {}
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
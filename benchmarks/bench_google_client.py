@@ -0,0 +1,145 @@
+"""
+Бенчмарк запросов Google callback: новый httpx.AsyncClient на каждый
+callback против общего клиента приложения (create_http_client).
+
+Вместо Google - локальный HTTPS сервер с самоподписанным сертификатом,
+на callback приходится два запроса (обмен кода и userinfo), как в
+google_callback. Сеть локальная, поэтому в цифрах только стоимость
+TCP и TLS рукопожатий; до настоящего Google к ним добавляются RTT и DNS.
+
+Запуск:
+    python -m benchmarks.bench_google_client
+"""
+
+import asyncio
+import datetime
+import os
+import ssl
+import statistics
+import tempfile
+import time
+
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from src.utils.http import create_http_client
+
+CALLBACKS = 300
+
+BODY = b'{"access_token": "token", "id": "1", "email": "a@example.com"}'
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+)
+
+connections = 0
+
+
+def self_signed_cert(directory: str):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.utcnow()
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False
+        )
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = f"{directory}/cert.pem", f"{directory}/key.pem"
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+    return cert_path, key_path
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Минимальный HTTP/1.1 сервер с keep-alive"""
+    global connections
+    connections += 1
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    await reader.readexactly(int(line.split(b":")[1]))
+            writer.write(RESPONSE)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def callback(client: httpx.AsyncClient, base_url: str) -> None:
+    await client.post(f"{base_url}/token", data={"code": "abc"})
+    await client.get(f"{base_url}/userinfo", headers={"Authorization": "Bearer token"})
+
+
+async def per_callback_client(base_url: str) -> None:
+    """Прежний google_callback: клиент создается и закрывается в каждом вызове"""
+    async with httpx.AsyncClient() as client:
+        await callback(client, base_url)
+
+
+def report(name: str, timings: list, new_connections: int) -> None:
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(
+        f"  {name:<32} p50 {statistics.median(timings) * 1e3:6.2f} мс"
+        f"  p99 {p99 * 1e3:6.2f} мс  соединений: {new_connections}"
+    )
+
+
+async def main():
+    global connections
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path, key_path = self_signed_cert(directory)
+        server_ssl = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_ssl.load_cert_chain(cert_path, key_path)
+        # Клиенты httpx доверяют локальному сертификату через SSL_CERT_FILE
+        os.environ["SSL_CERT_FILE"] = cert_path
+
+        server = await asyncio.start_server(handle, "localhost", 0, ssl=server_ssl)
+        base_url = f"https://localhost:{server.sockets[0].getsockname()[1]}"
+
+        shared = create_http_client()
+        scenarios = {
+            "клиент на каждый callback": lambda: per_callback_client(base_url),
+            "общий клиент приложения": lambda: callback(shared, base_url),
+        }
+
+        print(f"{CALLBACKS} callback (token + userinfo) к локальному HTTPS:")
+        for name, run in scenarios.items():
+            await run()  # прогрев
+            connections = 0
+            timings = []
+            for _ in range(CALLBACKS):
+                started = time.perf_counter()
+                await run()
+                timings.append(time.perf_counter() - started)
+            report(name, timings, connections)
+
+        await shared.aclose()
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
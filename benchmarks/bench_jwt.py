@@ -0,0 +1,79 @@
+"""
+Микро-бенчмарк выпуска и проверки JWT: python-jose против JWTCodec.
+
+Запуск:
+    python -m benchmarks.bench_jwt
+"""
+
+import time
+import timeit
+from datetime import datetime, timedelta
+
+from jose import jwt
+
+from src.services.token_codec import JWTCodec, create_key_ring
+
+SECRET = "benchmark-secret-key"
+NUMBER = 20000
+
+
+def report(name: str, seconds: float) -> None:
+    per_op = seconds / NUMBER * 1e6
+    print(f"  {name:<32} {per_op:8.2f} мкс/оп  {NUMBER / seconds:10.0f} оп/с")
+
+
+def main():
+    codec = JWTCodec(create_key_ring(SECRET))
+
+    # Старый формат: длинные имена claims и datetime в exp
+    legacy_claims = {
+        "user_id": "0b8f6d1e-4a1f-4b0e-9d55-3c1f0a6b7e21",
+        "email": "user@example.com",
+        "exp": datetime.utcnow() + timedelta(minutes=30),
+    }
+    now = int(time.time())
+    compact_claims = {
+        "sub": "0b8f6d1e-4a1f-4b0e-9d55-3c1f0a6b7e21",
+        "em": "user@example.com",
+        "iat": now,
+        "exp": now + 1800,
+    }
+
+    jose_token = jwt.encode(legacy_claims, SECRET, algorithm="HS256")
+    codec_token = codec.encode(compact_claims)
+
+    print(
+        f"Размер токена: python-jose {len(jose_token)} B, JWTCodec {len(codec_token)} B"
+    )
+    print()
+    print("Выпуск:")
+    report(
+        "python-jose encode",
+        timeit.timeit(
+            lambda: jwt.encode(legacy_claims, SECRET, "HS256"), number=NUMBER
+        ),
+    )
+    report(
+        "JWTCodec.encode",
+        timeit.timeit(lambda: codec.encode(compact_claims), number=NUMBER),
+    )
+
+    print("Проверка:")
+    report(
+        "python-jose decode",
+        timeit.timeit(
+            lambda: jwt.decode(jose_token, SECRET, algorithms=["HS256"]), number=NUMBER
+        ),
+    )
+    report(
+        "JWTCodec.decode",
+        timeit.timeit(lambda: codec.decode(codec_token), number=NUMBER),
+    )
+    report(
+        "JWTCodec.decode (токен jose)",
+        timeit.timeit(lambda: codec.decode(jose_token), number=NUMBER),
+    )
+
+
+if __name__ == "__main__":
+    main()
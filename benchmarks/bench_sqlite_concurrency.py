@@ -0,0 +1,131 @@
+"""
+Бенчмарк конкурентной нагрузки на SQLite: прежний режим (rollback journal,
+соединение на сессию) против WAL профиля (один писатель + пул читателей).
+
+Смесь запросов: на каждую регистрацию приходится READS_PER_WRITE поисков
+по email, все клиенты работают одновременно.
+
+Запуск:
+    python -m benchmarks.bench_sqlite_concurrency
+"""
+
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from src.config import get_settings
+from src.database import Base, ReadRoutingSession, configure_sqlite
+from src.repositories.user_repository import (
+    SQLAlchemyUserRepository,
+    UserAlreadyExistsError,
+)
+
+CLIENTS = 32
+OPERATIONS_PER_CLIENT = 200
+READS_PER_WRITE = 10
+SEED_USERS = 1000
+
+
+async def seed(session_factory) -> None:
+    async with session_factory() as db:
+        repository = SQLAlchemyUserRepository(db)
+        for i in range(SEED_USERS):
+            await repository.create_user_with_password(f"seed{i}@example.com", "h")
+
+
+async def run_clients(session_factory) -> dict:
+    counters = {"ops": 0, "locked": 0}
+
+    async def client(client_id: int) -> None:
+        rng = random.Random(client_id)
+        for i in range(OPERATIONS_PER_CLIENT):
+            try:
+                async with session_factory() as db:
+                    repository = SQLAlchemyUserRepository(db)
+                    if i % (READS_PER_WRITE + 1) == 0:
+                        await repository.create_user_with_password(
+                            f"c{client_id}-{i}@example.com", "h"
+                        )
+                    else:
+                        await repository.get_user_by_email(
+                            f"seed{rng.randrange(SEED_USERS)}@example.com"
+                        )
+                counters["ops"] += 1
+            except UserAlreadyExistsError:
+                counters["ops"] += 1
+            except OperationalError:
+                counters["locked"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(CLIENTS)))
+    counters["seconds"] = time.perf_counter() - started
+    return counters
+
+
+async def legacy_profile(path: Path) -> dict:
+    """Прежний режим: NullPool, журнал по умолчанию"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(session_factory)
+    result = await run_clients(session_factory)
+    await engine.dispose()
+    return result
+
+
+async def wal_profile(path: Path) -> dict:
+    """WAL профиль: один писатель, чтения сессий через ReadRoutingSession"""
+    settings = get_settings()
+    url = f"sqlite+aiosqlite:///{path}"
+    writer = create_async_engine(
+        url, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0
+    )
+    reader = create_async_engine(
+        url, poolclass=AsyncAdaptedQueuePool, pool_size=8, max_overflow=0
+    )
+    configure_sqlite(writer, settings)
+    configure_sqlite(reader, settings, query_only=True)
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(
+        writer,
+        expire_on_commit=False,
+        sync_session_class=ReadRoutingSession,
+        info={"reader": reader.sync_engine},
+    )
+    await seed(session_factory)
+    result = await run_clients(session_factory)
+    await writer.dispose()
+    await reader.dispose()
+    return result
+
+
+def report(name: str, result: dict) -> None:
+    print(
+        f"  {name:<34} {result['ops'] / result['seconds']:8.0f} оп/с"
+        f"  ошибок 'database is locked': {result['locked']}"
+    )
+
+
+async def main():
+    total = CLIENTS * OPERATIONS_PER_CLIENT
+    print(
+        f"{CLIENTS} клиентов, {total} операций "
+        f"(1 регистрация на {READS_PER_WRITE} поисков), SQLite + aiosqlite:"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        report("rollback journal, NullPool", await legacy_profile(Path(tmp) / "a.db"))
+        report("WAL, один писатель + читатели", await wal_profile(Path(tmp) / "b.db"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
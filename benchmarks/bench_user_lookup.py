@@ -0,0 +1,137 @@
+"""
+Бенчмарк чтения пользователя: ORM + pydantic против Core select + UserRecord.
+
+Запуск:
+    python -m benchmarks.bench_user_lookup
+"""
+
+import asyncio
+import tempfile
+import time
+import timeit
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.database import Base, UserModel
+from src.models.user import User, UserInDB, UserRecord
+from src.repositories.user_repository import USER_COLUMNS, SQLAlchemyUserRepository
+
+USERS = 1000
+LOOKUPS = 5000
+MAPPINGS = 100000
+
+
+def report(name: str, seconds: float, number: int) -> None:
+    per_op = seconds / number * 1e6
+    print(f"  {name:<36} {per_op:8.2f} мкс/оп  {number / seconds:10.0f} оп/с")
+
+
+async def orm_lookup(session_factory, user_id: str) -> User:
+    """Прежний путь: ORM объект -> UserInDB -> User"""
+    async with session_factory() as db:
+        db_user = await db.get(UserModel, user_id)
+        user_in_db = UserInDB(
+            id=db_user.id,
+            email=db_user.email,
+            full_name=db_user.full_name,
+            picture=db_user.picture,
+            google_id=db_user.google_id,
+            hashed_password=db_user.hashed_password,
+            is_active=db_user.is_active,
+            created_at=db_user.created_at,
+            updated_at=db_user.updated_at,
+        )
+        return User(
+            id=user_in_db.id,
+            email=user_in_db.email,
+            full_name=user_in_db.full_name,
+            picture=user_in_db.picture,
+            is_active=user_in_db.is_active,
+        )
+
+
+async def core_lookup(session_factory, user_id: str) -> User:
+    """Новый путь: Core select -> UserRecord -> User на границе ответа"""
+    async with session_factory() as db:
+        record = await SQLAlchemyUserRepository(db).get_user_by_id(user_id)
+        return record.to_user()
+
+
+async def measure(lookup, session_factory, user_ids) -> float:
+    started = time.perf_counter()
+    for i in range(LOOKUPS):
+        await lookup(session_factory, user_ids[i % len(user_ids)])
+    return time.perf_counter() - started
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Пул вместо NullPool по умолчанию, чтобы не мерить открытие соединений
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}",
+            poolclass=AsyncAdaptedQueuePool,
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            now = datetime.utcnow()
+            await conn.execute(
+                insert(UserModel.__table__),
+                [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "email": f"user{i}@example.com",
+                        "full_name": f"User {i}",
+                        "hashed_password": "$argon2id$v=19$m=65536,t=3,p=4$benchmark",
+                        "is_active": True,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for i in range(USERS)
+                ],
+            )
+            rows = (await conn.execute(select(*USER_COLUMNS))).all()
+
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        user_ids = [row[0] for row in rows]
+
+        # Прогрев пула и кэша скомпилированных запросов
+        await measure(orm_lookup, session_factory, user_ids[:10])
+        await measure(core_lookup, session_factory, user_ids[:10])
+
+        print(f"Поиск по id ({LOOKUPS} запросов, SQLite + aiosqlite):")
+        report(
+            "ORM + UserInDB + User",
+            await measure(orm_lookup, session_factory, user_ids),
+            LOOKUPS,
+        )
+        report(
+            "Core select + UserRecord + User",
+            await measure(core_lookup, session_factory, user_ids),
+            LOOKUPS,
+        )
+        await engine.dispose()
+
+    row = rows[0]
+    print("Только преобразование строки (без БД):")
+    report(
+        "UserInDB(**row) + User",
+        timeit.timeit(
+            lambda: User.model_validate(UserInDB(**row._mapping), from_attributes=True),
+            number=MAPPINGS,
+        ),
+        MAPPINGS,
+    )
+    report(
+        "UserRecord(*row)",
+        timeit.timeit(lambda: UserRecord(*row), number=MAPPINGS),
+        MAPPINGS,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Калибровка параметров argon2 под текущее железо.
+
+Подбирает memory_cost и time_cost так, чтобы одно хеширование занимало
+примерно заданное время, и записывает результат в .env (ARGON2_*),
+откуда его читает Settings.
+
+Использование:
+    python calibrate_argon2.py                      - цель 250 мс, до 64 MiB
+    python calibrate_argon2.py --target-ms 100      - другая цель по времени
+    python calibrate_argon2.py --max-memory-mib 128 - больше памяти на хеш
+    python calibrate_argon2.py --dry-run            - только показать результат
+
+После изменения параметров старые хеши обновляются автоматически
+при следующем успешном входе пользователя.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from argon2 import PasswordHasher
+
+# Минимум памяти по рекомендациям OWASP для argon2id (19 MiB)
+MIN_MEMORY_KIB = 19 * 1024
+MAX_TIME_COST = 20
+SAMPLES = 5
+
+
+def measure(time_cost: int, memory_cost: int, parallelism: int) -> float:
+    """Медианное время одного хеширования в миллисекундах"""
+    hasher = PasswordHasher(
+        time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )
+    hasher.hash("calibration")  # прогрев
+
+    timings = []
+    for _ in range(SAMPLES):
+        started = time.perf_counter()
+        hasher.hash("calibration")
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, max_memory_kib: int, parallelism: int):
+    """
+    Подобрать параметры: сначала максимум памяти (дороже для перебора на GPU),
+    затем наращиваем time_cost до целевого времени. Если даже time_cost=1
+    не укладывается в цель - уменьшаем память.
+    """
+    memory_cost = max_memory_kib
+    while True:
+        elapsed = measure(1, memory_cost, parallelism)
+        print(f"  m={memory_cost} KiB, t=1: {elapsed:.1f} мс")
+        if elapsed <= target_ms or memory_cost // 2 < MIN_MEMORY_KIB:
+            break
+        memory_cost //= 2
+
+    time_cost = 1
+    while elapsed < target_ms and time_cost < MAX_TIME_COST:
+        candidate = measure(time_cost + 1, memory_cost, parallelism)
+        print(f"  m={memory_cost} KiB, t={time_cost + 1}: {candidate:.1f} мс")
+        if candidate > target_ms * 1.1:
+            break
+        time_cost += 1
+        elapsed = candidate
+
+    return time_cost, memory_cost, elapsed
+
+
+def update_env_file(path: Path, values: dict) -> None:
+    """Обновить (или добавить) переменные в .env файле"""
+    lines = path.read_text().splitlines() if path.exists() else []
+    pending = dict(values)
+
+    for i, line in enumerate(lines):
+        key = line.split("=", 1)[0].strip()
+        if key in pending:
+            lines[i] = f"{key}={pending.pop(key)}"
+
+    lines.extend(f"{key}={value}" for key, value in pending.items())
+    path.write_text("\n".join(lines) + "\n")
+
+
+def main():
+    """Калибровка argon2 и запись параметров в .env"""
+    parser = argparse.ArgumentParser(description="Калибровка параметров argon2")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--max-memory-mib", type=int, default=64)
+    parser.add_argument("--parallelism", type=int, default=min(os.cpu_count() or 1, 4))
+    parser.add_argument("--env-file", default=str(Path(__file__).parent / ".env"))
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    print(f"🔄 Калибровка argon2 (цель {args.target_ms:.0f} мс на хеш)...")
+    print()
+
+    time_cost, memory_cost, elapsed = calibrate(
+        args.target_ms, args.max_memory_mib * 1024, args.parallelism
+    )
+    values = {
+        "ARGON2_TIME_COST": time_cost,
+        "ARGON2_MEMORY_COST": memory_cost,
+        "ARGON2_PARALLELISM": args.parallelism,
+    }
+
+    print()
+    print(f"✅ Подобрано: ~{elapsed:.1f} мс на хеш")
+    for key, value in values.items():
+        print(f"  {key}={value}")
+
+    if args.dry_run:
+        return
+
+    try:
+        update_env_file(Path(args.env_file), values)
+    except OSError as e:
+        print(f"❌ Не удалось записать {args.env_file}: {e}")
+        sys.exit(1)
+
+    print()
+    print(f"📝 Параметры записаны в {args.env_file}")
+
+
+if __name__ == "__main__":
+    main()
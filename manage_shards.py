@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Обслуживание шардов пользователей (USER_SHARDS).
+
+Использование:
+    python manage_shards.py status                 - пользователи на шардах
+    python manage_shards.py rebuild-directory      - заполнить каталог email/google_id
+    python manage_shards.py rebalance --dry-run    - что переедет после смены шардов
+    python manage_shards.py rebalance              - перенести пользователей
+
+Добавление шарда: прогнать миграции на новой БД, добавить ее в USER_SHARDS
+и запустить rebalance. Приложение может работать во время переноса:
+записи в пользователей переносимой пачки ждут ее завершения.
+Перевод существующей БД на шардирование: указать ее в USER_SHARDS как один
+из шардов, выполнить rebuild-directory, затем rebalance.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from src.database import engine, shard_engines
+from src.repositories.sharded_user_repository import (
+    UserShards,
+    rebalance,
+    rebuild_directory,
+    shard_status,
+)
+
+
+async def run(args) -> None:
+    if not shard_engines:
+        print("❌ USER_SHARDS не задан", file=sys.stderr)
+        sys.exit(1)
+
+    shards = UserShards(shard_engines)
+    try:
+        if args.command == "status":
+            for shard, counts in (await shard_status(shards)).items():
+                print(
+                    f"  {shard}: {counts['users']} пользователей, "
+                    f"к переносу {counts['misplaced']}"
+                )
+        elif args.command == "rebuild-directory":
+            total = await rebuild_directory(engine, shards, args.batch_size)
+            print(f"✅ Каталог заполнен: {total} пользователей")
+        else:
+            moved = await rebalance(engine, shards, args.batch_size, args.dry_run)
+            for route, count in moved.items():
+                print(f"  {route}: {count}")
+            verb = "будет перенесено" if args.dry_run else "перенесено"
+            print(f"✅ Ребалансировка: {verb} {sum(moved.values())} пользователей")
+    finally:
+        await shards.dispose()
+        await engine.dispose()
+
+
+def main():
+    """Обслуживание шардов пользователей"""
+    parser = argparse.ArgumentParser(description="Шарды пользователей")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Пользователи на шардах")
+    directory_parser = subparsers.add_parser(
+        "rebuild-directory", help="Заполнить каталог по шардам"
+    )
+    rebalance_parser = subparsers.add_parser(
+        "rebalance", help="Перенести пользователей на шарды-владельцы"
+    )
+    rebalance_parser.add_argument("--dry-run", action="store_true")
+    for subparser in (directory_parser, rebalance_parser):
+        subparser.add_argument("--batch-size", type=int, default=1000)
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Массовый импорт и экспорт пользователей (JSONL/CSV) для миграций.
+
+Файлы читаются и пишутся потоково, память не зависит от размера таблицы.
+
+Использование:
+    python manage_users.py import users.jsonl                 - пропустить существующих
+    python manage_users.py import users.csv --on-conflict upsert
+    python manage_users.py export users.jsonl                 - полный дамп
+    python manage_users.py export - --format csv > users.csv
+
+Поля записи: email (обязательно), id, full_name, picture, google_id,
+hashed_password (готовый хеш argon2), is_active, created_at, updated_at.
+Отсутствующие id и даты заполняются при импорте.
+
+Работает только с одной БД: при заданном USER_SHARDS команда завершается
+с ошибкой, потому что записи в обход каталога user_directory попали бы
+не на те шарды.
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import Column, MetaData, Table, create_engine, func, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError
+
+from src.config import get_settings
+from src.models.user import UserInDB
+from src.repositories.user_repository import (
+    UPSERT_DIALECTS,
+    USER_COLUMNS,
+    new_user_id,
+    users,
+)
+
+FIELDS = [column.name for column in USER_COLUMNS]
+
+# При upsert по email обновляются все поля, кроме id и created_at;
+# пустые значения из файла не затирают сохраненные
+UPSERT_FIELDS = ["full_name", "picture", "google_id", "hashed_password"]
+
+users_batch = TypeAdapter(List[UserInDB])
+
+# Ошибки отдельных записей (дубликат, слишком длинное значение): пачка
+# повторяется по одной записи, остальные ошибки БД прерывают импорт
+ROW_ERRORS = (IntegrityError, DataError)
+
+
+def read_jsonl(stream: TextIO) -> Iterator[Tuple[int, Optional[Dict]]]:
+    for line_no, line in enumerate(stream, start=1):
+        if line.strip():
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError:
+                yield line_no, None
+
+
+def read_csv(stream: TextIO) -> Iterator[Tuple[int, Dict]]:
+    # Номер строки с учетом заголовка
+    for line_no, row in enumerate(csv.DictReader(stream), start=2):
+        yield line_no, {key: value for key, value in row.items() if value != ""}
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Колонки без часового пояса хранят UTC"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def validate_batch(
+    rows: List[Tuple[int, Dict]]
+) -> Tuple[List[Dict], List[Tuple[int, str]]]:
+    """
+    Проверить пачку записей моделью UserInDB одним вызовом pydantic.
+    Возвращает (валидные записи, [(номер строки, ошибка)]).
+    """
+    now = datetime.utcnow()
+    errors: Dict[int, str] = {}
+    prepared = []
+    for index, (_, raw) in enumerate(rows):
+        if not isinstance(raw, dict):
+            errors[index] = "not a JSON object"
+            continue
+        record = {"id": new_user_id(), "created_at": now, "updated_at": now}
+        record.update(raw)
+        prepared.append(record)
+    indexes = [i for i in range(len(rows)) if i not in errors]
+
+    try:
+        validated = users_batch.validate_python(prepared)
+        valid_indexes = indexes
+    except ValidationError:
+        # В пачке есть плохие записи: проверяем по одной, чтобы каждая
+        # ошибка досталась своей строке, а остальные записи импортировались
+        validated, valid_indexes = [], []
+        for index, record in zip(indexes, prepared):
+            try:
+                validated.append(UserInDB.model_validate(record))
+            except ValidationError as e:
+                error = e.errors()[0]
+                field = ".".join(str(part) for part in error["loc"])
+                errors[index] = f"{field}: {error['msg']}"
+                continue
+            valid_indexes.append(index)
+
+    records = []
+    for index, user in zip(valid_indexes, validated):
+        if user.hashed_password and not user.hashed_password.startswith("$argon2"):
+            errors[index] = "hashed_password: expected an argon2 hash"
+            continue
+        try:
+            user_id = str(uuid.UUID(user.id))
+        except ValueError:
+            errors[index] = "id: expected a UUID"
+            continue
+        record = user.model_dump(include=set(FIELDS))
+        record["id"] = user_id
+        record["created_at"] = _naive_utc(record["created_at"])
+        record["updated_at"] = _naive_utc(record["updated_at"])
+        if record["last_login_at"] is not None:
+            record["last_login_at"] = _naive_utc(record["last_login_at"])
+        records.append(record)
+
+    return records, [(rows[i][0], message) for i, message in sorted(errors.items())]
+
+
+def dedupe(records: List[Dict]) -> List[Dict]:
+    """Повторы email внутри пачки: побеждает последняя запись"""
+    by_email = {record["email"]: record for record in records}
+    return list(by_email.values())
+
+
+class UserImporter:
+    """
+    Запись пачек пользователей.
+    PostgreSQL: COPY во временную таблицу и INSERT ... SELECT ... ON CONFLICT;
+    SQLite: executemany с ON CONFLICT.
+    """
+
+    def __init__(self, conn: Connection, on_conflict: str, use_copy: bool):
+        self.conn = conn
+        self.on_conflict = on_conflict
+        self.dialect = conn.dialect.name
+        self.use_copy = use_copy and self.dialect == "postgresql"
+        if self.dialect not in UPSERT_DIALECTS:
+            raise SystemExit(f"Unsupported database dialect: {self.dialect}")
+
+        if self.use_copy:
+            self.staging = Table(
+                "users_import",
+                MetaData(),
+                *(Column(column.name, column.type) for column in USER_COLUMNS),
+                prefixes=["TEMPORARY"],
+                postgresql_on_commit="DELETE ROWS",
+            )
+            self.staging.create(conn)
+            conn.commit()
+
+    def _with_conflict_clause(self, stmt):
+        if self.on_conflict == "skip":
+            return stmt.on_conflict_do_nothing()
+
+        excluded = stmt.excluded
+        return stmt.on_conflict_do_update(
+            # Уникальный индекс ix_users_email_lower
+            index_elements=[func.lower(users.c.email)],
+            set_={
+                **{
+                    name: func.coalesce(excluded[name], users.c[name])
+                    for name in UPSERT_FIELDS
+                },
+                "is_active": excluded.is_active,
+                "updated_at": excluded.updated_at,
+            },
+        )
+
+    def write(self, records: List[Dict]) -> int:
+        """Записать пачку в одной транзакции; вернуть число записанных строк"""
+        records = dedupe(records)
+        dialect_insert = UPSERT_DIALECTS[self.dialect]
+
+        if self.use_copy:
+            self._copy_to_staging(records)
+            stmt = self._with_conflict_clause(
+                dialect_insert(users).from_select(FIELDS, select(self.staging))
+            )
+            written = self.conn.execute(stmt).rowcount
+        else:
+            stmt = self._with_conflict_clause(dialect_insert(users)).returning(
+                users.c.id
+            )
+            written = len(self.conn.execute(stmt, records).all())
+
+        self.conn.commit()
+        return written
+
+    def _copy_to_staging(self, records: List[Dict]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow(
+                "\\N" if record[name] is None else record[name] for name in FIELDS
+            )
+        buffer.seek(0)
+
+        statement = (
+            f"COPY users_import ({', '.join(FIELDS)}) FROM STDIN "
+            "WITH (FORMAT csv, NULL '\\N')"
+        )
+        dbapi = self.conn.dialect.dbapi
+        cursor = self.conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(statement, buffer)
+        except dbapi.Error as e:
+            # COPY идет в обход SQLAlchemy: оборачиваем ошибку драйвера так же,
+            # как для execute (DataError, IntegrityError, ...)
+            raise DBAPIError.instance(statement, None, e, dbapi.Error) from e
+        finally:
+            cursor.close()
+
+    def write_row_by_row(
+        self, records: List[Dict]
+    ) -> Tuple[int, List[Tuple[str, str]]]:
+        """
+        Запасной путь для пачки, упавшей на записи (например, google_id
+        занят другим email или значение длиннее колонки): каждая запись
+        в своей транзакции.
+        """
+        written, failed = 0, []
+        for record in records:
+            try:
+                written += self.write([record])
+            except ROW_ERRORS as e:
+                self.conn.rollback()
+                failed.append((record["email"], str(e.orig).splitlines()[0]))
+        return written, failed
+
+
+def import_users(engine: Engine, args) -> None:
+    reader = read_csv if args.format == "csv" else read_jsonl
+    stream = sys.stdin if args.path == "-" else open(args.path, newline="")
+
+    started = time.perf_counter()
+    total = written = rejected = 0
+    with stream, engine.connect() as conn:
+        importer = UserImporter(conn, args.on_conflict, use_copy=not args.no_copy)
+        for rows in batched(reader(stream), args.batch_size):
+            records, errors = validate_batch(rows)
+            for line_no, message in errors:
+                print(f"  строка {line_no}: {message}", file=sys.stderr)
+
+            try:
+                batch_written = importer.write(records) if records else 0
+            except ROW_ERRORS:
+                conn.rollback()
+                batch_written, failed = importer.write_row_by_row(records)
+                for email, message in failed:
+                    print(f"  {email}: {message}", file=sys.stderr)
+                errors.extend(failed)
+
+            total += len(rows)
+            written += batch_written
+            rejected += len(errors)
+            elapsed = time.perf_counter() - started
+            print(
+                f"🔄 прочитано {total}, записано {written}, "
+                f"пропущено {total - written - rejected}, ошибок {rejected} "
+                f"({total / elapsed:.0f} строк/с)",
+                file=sys.stderr,
+            )
+
+    print(f"✅ Импорт завершен: записано {written} из {total}", file=sys.stderr)
+    if rejected:
+        sys.exit(1)
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_users(engine: Engine, args) -> None:
+    output = sys.stdout if args.path == "-" else open(args.path, "w", newline="")
+
+    started = time.perf_counter()
+    exported = 0
+    with output, engine.connect() as conn:
+        # Серверный курсор: строки приходят пачками по batch_size
+        result = conn.execution_options(
+            stream_results=True, yield_per=args.batch_size
+        ).execute(select(*USER_COLUMNS).order_by(users.c.created_at, users.c.id))
+
+        writer: Optional[csv.DictWriter] = None
+        if args.format == "csv":
+            writer = csv.DictWriter(output, fieldnames=FIELDS)
+            writer.writeheader()
+
+        for rows in result.partitions():
+            for row in rows:
+                record = {name: _serialize(value) for name, value in zip(FIELDS, row)}
+                if writer is not None:
+                    writer.writerow(record)
+                else:
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            exported += len(rows)
+            elapsed = time.perf_counter() - started
+            print(
+                f"🔄 выгружено {exported} ({exported / elapsed:.0f} строк/с)",
+                file=sys.stderr,
+            )
+
+    print(f"✅ Экспорт завершен: {exported} пользователей", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Импорт/экспорт пользователей"""
+    parser = argparse.ArgumentParser(
+        description="Массовый импорт/экспорт пользователей"
+    )
+    parser.add_argument("--database-url", default=None)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Загрузить пользователей")
+    import_parser.add_argument("path", help="файл или - для stdin")
+    import_parser.add_argument(
+        "--on-conflict",
+        choices=["skip", "upsert"],
+        default="skip",
+        help="существующий email (без учета регистра) пропустить или обновить; "
+        "конфликт по google_id с другим email upsert не обрабатывает: такая "
+        "пачка записывается по одной записи, и строка попадает в ошибки",
+    )
+    import_parser.add_argument(
+        "--no-copy", action="store_true", help="executemany вместо COPY на PostgreSQL"
+    )
+
+    export_parser = subparsers.add_parser("export", help="Выгрузить пользователей")
+    export_parser.add_argument("path", help="файл или - для stdout")
+
+    for subparser in (import_parser, export_parser):
+        subparser.add_argument("--format", choices=["jsonl", "csv"], default=None)
+        subparser.add_argument("--batch-size", type=int, default=5000)
+
+    args = parser.parse_args(argv)
+    settings = get_settings()
+    if settings.user_shards:
+        parser.error(
+            "USER_SHARDS is set: import/export does not support sharded users "
+            "(see manage_shards.py)"
+        )
+    if args.format is None:
+        args.format = "csv" if args.path.endswith(".csv") else "jsonl"
+
+    engine = create_engine(args.database_url or settings.database_url)
+    try:
+        if args.command == "import":
+            import_users(engine, args)
+        else:
+            export_users(engine, args)
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -17,13 +18,76 @@ class Settings(BaseSettings):
 
     # Настройки безопасности
     secret_key: str
-    algorithm: str = "HS256"
+    algorithm: str = "HS256"  # HS256 или HS512
+    # Дополнительные ключи подписи JWT ({"kid": "secret"}) для ротации.
+    # secret_key всегда доступен под kid "default"
+    jwt_keys: Dict[str, str] = {}
+    # Асимметричные ключи EdDSA/RS256 ({"kid": "путь к PEM"}), публикуются в JWKS.
+    # Подпись ими включается через jwt_active_kid
+    jwt_key_files: Dict[str, str] = {}
+    jwt_active_kid: Optional[str] = None
+    jwks_cache_max_age_seconds: int = 300
     access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 30
+
+    # Кэш проверенных токенов
+    token_cache_size: int = 10000
+    token_cache_ttl_seconds: int = 300
+
+    # Кэш пользователей в памяти процесса (0 - отключен)
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: int = 60
+
+    # Отзыв токенов доступа (logout): фильтр Блума по denylist в БД
+    revocation_filter_capacity: int = 100000
+    revocation_filter_error_rate: float = 0.001
+    revocation_sync_interval_seconds: float = 5
+    revocation_rebuild_interval_seconds: float = 600
+
+    # События входа: очередь в памяти, запись в login_events пачками в фоне.
+    # При переполнении очереди события отбрасываются, вход не замедляется
+    login_events_queue_size: int = 10000
+    login_events_batch_size: int = 500
+    login_events_flush_interval_seconds: float = 1
+
+    # Версии пользователей после записи: claims токена со старшей меткой ver
+    # проверяются по БД (memory:// - изменения этого воркера, redis://... -
+    # изменения всех воркеров)
+    user_version_storage_url: str = "memory://"
+    # Только для memory://: сколько секунд claims считаются свежими, чтобы
+    # изменения, сделанные другими воркерами, были видны не позже
+    claims_max_age_seconds: int = 300
+
+    # Пул хеширования паролей (0 - по числу CPU)
+    password_hash_workers: int = 0
+    password_hash_queue_depth: int = 64
+
+    # Параметры argon2 (подбираются командой calibrate_argon2.py)
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536  # KiB
+    argon2_parallelism: int = 4
+
+    # Ограничение частоты /auth/login и /auth/register
+    # (memory:// - в пределах воркера, redis://... - общее для всех воркеров)
+    rate_limit_storage_url: str = "memory://"
+    rate_limit_window_seconds: int = 60
+    login_rate_limit_per_ip: int = 30
+    login_rate_limit_per_account: int = 10
+    register_rate_limit_per_ip: int = 10
+    register_rate_limit_per_account: int = 3
 
     # Google OAuth настройки
     google_client_id: str
     google_client_secret: str
     google_redirect_uri: str
+    # Общий HTTP-клиент для запросов к Google: соединения переиспользуются
+    # между callback, таймауты явные. HTTP/2 требует пакет h2 (httpx[http2])
+    google_http_max_connections: int = 20
+    google_http_max_keepalive_connections: int = 10
+    google_http_keepalive_expiry_seconds: float = 30
+    google_http_connect_timeout_seconds: float = 3
+    google_http_read_timeout_seconds: float = 10
+    google_http2: bool = False
 
     # Frontend URL для редиректов
     frontend_url: str = "http://localhost:3000"
@@ -31,6 +95,36 @@ class Settings(BaseSettings):
     # Database URL
     database_url: str = "sqlite:///./oauth_app.db"
 
+    # Пул соединений (для PostgreSQL; SQLite работает без пула)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+
+    # Профиль SQLite: WAL, один писатель на процесс и пул читателей
+    sqlite_wal: bool = False
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 268435456  # 256 MiB
+    sqlite_cache_size: int = -16384  # отрицательное значение - KiB на соединение
+
+    # Шардирование пользователей: {"имя шарда": "URL БД"}; пусто - таблица
+    # users в основной БД. Каталог email/google_id хранится в основной БД
+    user_shards: Dict[str, str] = {}
+
+    # Реплики для чтения (["postgresql://..."]); пустой список - все на primary
+    database_replica_urls: List[str] = []
+    # Реплика, отставшая больше порога или упавшая, исключается на ejection
+    replica_max_lag_seconds: float = 5
+    replica_check_interval_seconds: float = 5
+    replica_ejection_seconds: float = 30
+    # Сколько секунд после записи чтения пользователя идут на primary
+    read_your_writes_seconds: float = 5
+
+    # Ключ для /internal/* эндпоинтов (пустой - эндпоинты отключены)
+    internal_api_key: str = ""
+
     class Config:
         env_file = ".env"
         case_sensitive = False
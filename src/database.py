@@ -2,30 +2,218 @@
 SQLAlchemy модели для БД
 """
 
+from contextvars import ContextVar
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import Boolean, Column, DateTime, String, create_engine
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Select,
+    TypeDecorator,
+    event,
+    func,
+    make_url,
+)
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.types import UserDefinedType
 
 from src.config import get_settings
+from src.utils.pool_stats import InstrumentedQueuePool, PoolStats
 
 # Определяем базовый класс для моделей
 Base = declarative_base()
 
+# Асинхронные драйверы для URL из настроек (alembic работает с синхронными)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """URL с асинхронным драйвером: sqlite -> aiosqlite, postgresql -> asyncpg"""
+    scheme, sep, rest = database_url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
 # Получаем DATABASE_URL из конфига
 settings = get_settings()
-DATABASE_URL = settings.database_url
+DATABASE_URL = get_async_database_url(settings.database_url)
+
+
+def is_sqlite(database_url: str) -> bool:
+    return database_url.startswith("sqlite")
+
+
+def is_sqlite_memory(database_url: str) -> bool:
+    """БД в памяти: у каждого соединения своя, отдельный пул чтения невозможен"""
+    url = make_url(database_url)
+    return url.database in (None, "", ":memory:") or (url.query.get("mode") == "memory")
+
+
+def get_pool_options(database_url: str, settings) -> dict:
+    """Параметры пула из настроек; SQLite без WAL профиля - без пула"""
+    if is_sqlite(database_url) and not settings.sqlite_wal:
+        return {}
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def configure_sqlite(engine: AsyncEngine, settings, query_only: bool = False) -> None:
+    """PRAGMA для каждого нового соединения SQLite"""
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size={settings.sqlite_cache_size}",
+    ]
+    if query_only:
+        pragmas.append("PRAGMA query_only=ON")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+class ReadRoutingSession(Session):
+    """
+    Сессия SQLite WAL профиля: SELECT идут в пул соединений только для
+    чтения (info["reader"]), записи (INSERT/UPDATE/DELETE, flush) - в
+    соединение писателя. После записи в транзакции чтения тоже идут
+    к писателю: только он видит еще не закоммиченные изменения.
+    """
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+        elif isinstance(clause, Select) and not self.info.get("wrote"):
+            return self.info["reader"]
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(ReadRoutingSession, "after_transaction_end")
+def _reset_read_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("wrote", None)
+
+
+# SQLite в режиме WAL: читатели не блокируются писателем
+SQLITE_WAL = is_sqlite(DATABASE_URL) and settings.sqlite_wal
+
+engine_options = get_pool_options(DATABASE_URL, settings)
+if SQLITE_WAL:
+    # Единственный писатель процесса: конкурирующие записи ждут в очереди пула,
+    # а не получают "database is locked"
+    engine_options.update(pool_size=1, max_overflow=0)
 
 # Создаем engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=False,
-)
+engine = create_async_engine(DATABASE_URL, echo=False, **engine_options)
+
+# Реплики для чтения (см. ReplicaRouter); записи всегда идут через engine
+replica_engines = [
+    create_async_engine(
+        get_async_database_url(url),
+        echo=False,
+        **get_pool_options(get_async_database_url(url), settings),
+    )
+    for url in settings.database_replica_urls
+]
+
+sqlite_read_engine: Optional[AsyncEngine] = None
+if SQLITE_WAL:
+    configure_sqlite(engine, settings)
+    if not is_sqlite_memory(DATABASE_URL):
+        # Все чтения сессий - через пул соединений только для чтения
+        # (ReadRoutingSession), единственный писатель занят только записями
+        sqlite_read_engine = create_async_engine(
+            DATABASE_URL, echo=False, **get_pool_options(DATABASE_URL, settings)
+        )
+        configure_sqlite(sqlite_read_engine, settings, query_only=True)
+
+# Шарды таблицы users (см. ShardedUserRepository)
+shard_engines = {}
+for name, url in settings.user_shards.items():
+    shard_url = get_async_database_url(url)
+    shard_engines[name] = create_async_engine(
+        shard_url, echo=False, **get_pool_options(shard_url, settings)
+    )
+    if is_sqlite(shard_url) and settings.sqlite_wal:
+        configure_sqlite(shard_engines[name], settings)
+
+# Статистика пула для /internal/db/pool
+pool_stats = PoolStats()
+pool_stats.attach(engine.sync_engine.pool)
+
+# Создаем сессию (объекты остаются доступны после commit без повторного запроса)
+if sqlite_read_engine is not None:
+    SessionLocal = async_sessionmaker(
+        engine,
+        autoflush=False,
+        expire_on_commit=False,
+        sync_session_class=ReadRoutingSession,
+        info={"reader": sqlite_read_engine.sync_engine},
+    )
+else:
+    SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
-# Создаем сессию
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class _PostgresUuid(UserDefinedType):
+    """
+    Колонка uuid без приведения параметров: asyncpg для типизированных
+    колонок рендерит $1::UUID/$1::VARCHAR, и запросы ломались бы
+    на колонке другого типа во время ее конвертации.
+    """
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw) -> str:
+        return "UUID"
+
+
+class UserId(TypeDecorator):
+    """
+    Id пользователя: нативный UUID в PostgreSQL, строка в остальных БД.
+    Значения в коде - всегда str; работает и со старой varchar колонкой.
+    """
+
+    impl = String
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return _PostgresUuid()
+        return dialect.type_descriptor(String())
+
+    def process_result_value(self, value, dialect):
+        # asyncpg возвращает uuid колонку объектом UUID
+        return value if value is None or isinstance(value, str) else str(value)
 
 
 class UserModel(Base):
@@ -33,8 +221,9 @@ class UserModel(Base):
 
     __tablename__ = "users"
 
-    id = Column(String, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True)
+    # Первичный ключ уже индексирован; уникальность email - ix_users_email_lower
+    id = Column(UserId, primary_key=True)
+    email = Column(String)
     full_name = Column(String, nullable=True)
     picture = Column(String, nullable=True)
     google_id = Column(String, unique=True, nullable=True, index=True)
@@ -42,15 +231,148 @@ class UserModel(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Пишется пачками из login_events, updated_at (версию пользователя) не меняет
+    last_login_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Keyset пагинация списка пользователей по (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Поиск по email без учета регистра; один аккаунт на адрес
+        Index("ix_users_email_lower", func.lower(email), unique=True),
+    )
 
     def __repr__(self):
         return f"<UserModel(id={self.id}, email={self.email})>"
 
 
-def get_db():
-    """Dependency для получения сессии БД"""
-    db = SessionLocal()
+class RefreshTokenModel(Base):
+    """Модель refresh токена в БД (хранится только HMAC от токена)"""
+
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String, primary_key=True)
+    # Без внешнего ключа: при шардировании пользователь живет в другой БД
+    user_id = Column(String, nullable=False, index=True)
+    # Все токены одной цепочки ротации; при повторном использовании отзываются вместе
+    family_id = Column(String, nullable=False, index=True)
+    token_hash = Column(String, nullable=False, unique=True, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    rotated_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<RefreshTokenModel(id={self.id}, user_id={self.user_id})>"
+
+
+class RevokedTokenModel(Base):
+    """Отозванный токен доступа (denylist по jti)"""
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String, primary_key=True)
+    # После истечения токена запись больше не нужна и удаляется
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<RevokedTokenModel(jti={self.jti})>"
+
+
+class LoginEventModel(Base):
+    """Журнал входов пользователей (пишется пачками в фоне)"""
+
+    __tablename__ = "login_events"
+
+    id = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    # Без внешнего ключа: при шардировании пользователь живет в другой БД
+    user_id = Column(String, nullable=False)
+    method = Column(String, nullable=False)
+    ip_address = Column(String, nullable=True)
+    occurred_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_login_events_user_id_occurred_at", "user_id", "occurred_at"),
+    )
+
+    def __repr__(self):
+        return f"<LoginEventModel(user_id={self.user_id}, method={self.method})>"
+
+
+class UserDirectoryModel(Base):
+    """
+    Каталог шардированных пользователей: email и google_id -> (id, шард).
+    Хранится в основной БД, первичный ключ обеспечивает глобальную уникальность.
+    """
+
+    __tablename__ = "user_directory"
+
+    # "email:<email>" или "google:<google_id>"
+    lookup_key = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False, index=True)
+    shard = Column(String, nullable=False)
+
+    def __repr__(self):
+        return f"<UserDirectoryModel(key={self.lookup_key}, shard={self.shard})>"
+
+
+class LazySession:
+    """
+    Сессия, создаваемая при первом обращении. Запросы, отклоненные до БД
+    или обслуженные из кэшей, не создают AsyncSession и не берут
+    соединение из пула.
+    """
+
+    __slots__ = ("_factory", "_session")
+
+    def __init__(self, factory: async_sessionmaker = SessionLocal):
+        self._factory = factory
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+# Сессия текущего запроса для репозиториев уровня приложения
+request_session: ContextVar[Optional[AsyncSession]] = ContextVar(
+    "request_session", default=None
+)
+
+
+class RequestSession:
+    """
+    Прокси к сессии текущего запроса (request_session): репозитории
+    и сервисы создаются один раз в lifespan, а работают с сессией запроса,
+    в котором вызваны.
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        db = request_session.get()
+        if db is None:
+            raise RuntimeError("No database session is bound to the current request")
+        return getattr(db, name)
+
+
+async def get_db():
+    """Dependency для получения сессии БД (соединение берется при первом запросе)"""
+    db = LazySession()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
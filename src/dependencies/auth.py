@@ -1,54 +1,218 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+import httpx
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.config import get_settings
-from src.database import get_db
-from src.models.user import UserInDB
-from src.repositories.user_repository import SQLAlchemyUserRepository
+from src.database import RequestSession, get_db, request_session
+from src.models.user import User, UserRecord
+from src.repositories.cached_user_repository import CachedUserRepository
+from src.repositories.refresh_token_repository import (
+    SQLAlchemyRefreshTokenRepository,
+)
+from src.repositories.revoked_token_repository import (
+    SQLAlchemyRevokedTokenRepository,
+)
+from src.repositories.sharded_user_repository import (
+    ShardedUserRepository,
+    UserShards,
+)
+from src.repositories.single_flight_user_repository import (
+    SingleFlightUserRepository,
+)
+from src.repositories.user_repository import (
+    SQLAlchemyUserRepository,
+    UserRepositoryInterface,
+)
 from src.services.auth_service import AuthService
+from src.services.replica_router import ReplicaRouter
+from src.services.token_cache import VerifiedTokenCache
+from src.services.token_codec import JWTCodec
+from src.services.token_revocation import TokenRevocationList
+from src.services.user_cache import UserCache
 from src.services.user_service import UserService
+from src.services.user_versions import UserVersionStore
+from src.utils.hashing import PasswordHashingExecutor
+from src.utils.rate_limit import AuthRateLimiter
+from src.utils.single_flight import SingleFlight
 
 # Security scheme
 security = HTTPBearer()
 
 
-def get_user_repository(db: Session = Depends(get_db)) -> SQLAlchemyUserRepository:
-    """Получить репозиторий пользователей (Dependency Injection)"""
-    return SQLAlchemyUserRepository(db)
+def get_user_cache(request: Request) -> UserCache:
+    """Получить кэш пользователей уровня приложения"""
+    return request.app.state.user_cache
 
 
-def get_auth_service(
-    user_repository: SQLAlchemyUserRepository = Depends(get_user_repository),
-) -> AuthService:
-    """Получить сервис аутентификации (Dependency Injection)"""
-    settings = get_settings()
-    return AuthService(
-        user_repository=user_repository,
-        secret_key=settings.secret_key,
-        algorithm=settings.algorithm,
+def get_replica_router(request: Request) -> Optional[ReplicaRouter]:
+    """Получить маршрутизатор чтений на реплики (None - реплики не настроены)"""
+    return request.app.state.replica_router
+
+
+def get_user_shards(request: Request) -> Optional[UserShards]:
+    """Получить шарды пользователей (None - шардирование не настроено)"""
+    return request.app.state.user_shards
+
+
+def build_user_repository(
+    db: AsyncSession,
+    replicas: Optional[ReplicaRouter] = None,
+    shards: Optional[UserShards] = None,
+) -> UserRepositoryInterface:
+    """Репозиторий пользователей без кэша: шардированный или в одной БД"""
+    if shards is not None:
+        return ShardedUserRepository(db, shards)
+    return SQLAlchemyUserRepository(db, replicas)
+
+
+def create_services(state, settings) -> None:
+    """
+    Репозитории и сервисы уровня приложения (вызывается из lifespan).
+    Сами они без состояния запроса: работают через RequestSession
+    с сессией, привязанной bind_request_session.
+    """
+    db = RequestSession()
+    # Одновременные промахи кэша по одному ключу - один запрос к БД
+    state.user_lookups = SingleFlight()
+    state.user_repository = CachedUserRepository(
+        SingleFlightUserRepository(
+            build_user_repository(db, state.replica_router, state.user_shards),
+            state.user_lookups,
+        ),
+        state.user_cache,
+    )
+    state.refresh_token_repository = SQLAlchemyRefreshTokenRepository(db)
+    state.revoked_token_repository = SQLAlchemyRevokedTokenRepository(db)
+    state.auth_service = AuthService(
+        user_repository=state.user_repository,
+        token_codec=state.token_codec,
         access_token_expire_minutes=settings.access_token_expire_minutes,
+        password_hasher=state.password_hasher,
+        token_cache=state.token_cache,
+        claims_max_age_seconds=settings.claims_max_age_seconds,
+        user_versions=state.user_versions,
+        refresh_token_repository=state.refresh_token_repository,
+        refresh_token_secret=settings.secret_key,
+        refresh_token_expire_days=settings.refresh_token_expire_days,
+        revocation_list=state.revocation_list,
+        revoked_token_repository=state.revoked_token_repository,
+        login_events=state.login_events,
     )
+    state.user_service = UserService(user_repository=state.user_repository)
+
+
+async def bind_request_session(db: AsyncSession = Depends(get_db)):
+    """
+    Привязать сессию запроса к сервисам уровня приложения на время запроса.
+    Сессия ленивая: соединение из пула берется только при первом запросе к БД.
+    Подключается на уровне роутера (APIRouter(dependencies=...)), поэтому
+    геттеры сервисов ниже от нее не зависят.
+    """
+    token = request_session.set(db)
+    try:
+        yield db
+    finally:
+        request_session.reset(token)
+
+
+def get_user_repository(request: Request) -> UserRepositoryInterface:
+    """Получить репозиторий пользователей с кэшем (Dependency Injection)"""
+    return request.app.state.user_repository
+
+
+def get_refresh_token_repository(request: Request) -> SQLAlchemyRefreshTokenRepository:
+    """Получить репозиторий refresh токенов (Dependency Injection)"""
+    return request.app.state.refresh_token_repository
+
+
+def get_revoked_token_repository(request: Request) -> SQLAlchemyRevokedTokenRepository:
+    """Получить репозиторий отозванных токенов (Dependency Injection)"""
+    return request.app.state.revoked_token_repository
+
+
+def get_password_hasher(request: Request) -> PasswordHashingExecutor:
+    """Получить пул хеширования паролей, созданный в lifespan приложения"""
+    return request.app.state.password_hasher
+
+
+def get_token_codec(request: Request) -> JWTCodec:
+    """Получить кодек JWT с набором ключей подписи"""
+    return request.app.state.token_codec
+
 
+def get_token_cache(request: Request) -> VerifiedTokenCache:
+    """Получить кэш проверенных токенов"""
+    return request.app.state.token_cache
 
-def get_user_service(
-    user_repository: SQLAlchemyUserRepository = Depends(get_user_repository),
-) -> UserService:
+
+def get_user_versions(request: Request) -> UserVersionStore:
+    """Получить хранилище последних версий пользователей"""
+    return request.app.state.user_versions
+
+
+def get_revocation_list(request: Request) -> TokenRevocationList:
+    """Получить фильтр отозванных токенов"""
+    return request.app.state.revocation_list
+
+
+def get_auth_rate_limiter(request: Request) -> AuthRateLimiter:
+    """Получить ограничитель частоты попыток входа/регистрации"""
+    return request.app.state.auth_rate_limiter
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Получить общий HTTP-клиент приложения (запросы к Google)"""
+    return request.app.state.http_client
+
+
+def get_client_ip(request: Request) -> str:
+    """IP клиента для ограничения частоты запросов"""
+    return request.client.host if request.client else "unknown"
+
+
+def get_auth_service(request: Request) -> AuthService:
+    """Получить сервис аутентификации (Dependency Injection)"""
+    return request.app.state.auth_service
+
+
+def get_user_service(request: Request) -> UserService:
     """Получить сервис пользователей (Dependency Injection)"""
-    return UserService(user_repository=user_repository)
+    return request.app.state.user_service
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     auth_service: AuthService = Depends(get_auth_service),
-) -> UserInDB:
+) -> UserRecord:
     """
     Получить текущего авторизованного пользователя.
     Используется как dependency для защищенных эндпоинтов.
     """
     token = credentials.credentials
     user = await auth_service.get_current_user(token)
+    _ensure_active(user)
+    return user
 
+
+async def get_current_user_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    auth_service: AuthService = Depends(get_auth_service),
+) -> User:
+    """
+    Получить текущего пользователя из claims токена без запроса к БД.
+    Для эндпоинтов, которым нужен только профиль; к БД обращаемся,
+    только если метка версии в токене устарела.
+    """
+    token = credentials.credentials
+    user = await auth_service.get_current_user_from_claims(token)
+    _ensure_active(user)
+    return user
+
+
+def _ensure_active(user) -> None:
+    """Проверить, что пользователь найден и активен"""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,5 +224,3 @@ async def get_current_user(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user"
         )
-
-    return user
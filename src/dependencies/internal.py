@@ -0,0 +1,25 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+from src.config import get_settings
+
+
+async def require_internal_api_key(
+    x_internal_api_key: Optional[str] = Header(None),
+) -> None:
+    """
+    Доступ к служебным эндпоинтам по ключу из INTERNAL_API_KEY.
+    Без настроенного ключа эндпоинты недоступны.
+    """
+    expected = get_settings().internal_api_key
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    if x_internal_api_key is None or not hmac.compare_digest(
+        x_internal_api_key.encode(), expected.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid internal API key"
+        )
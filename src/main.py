@@ -1,12 +1,177 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from src.config import get_settings
+from src.database import (
+    SessionLocal,
+    engine,
+    replica_engines,
+    shard_engines,
+    sqlite_read_engine,
+)
+from src.dependencies.auth import create_services
+from src.repositories.login_event_repository import (
+    SQLAlchemyLoginEventRepository,
+)
+from src.repositories.revoked_token_repository import (
+    SQLAlchemyRevokedTokenRepository,
+)
+from src.repositories.sharded_user_repository import UserShards
+from src.routes.admin import router as admin_router
 from src.routes.auth import router as auth_router
+from src.routes.internal import router as internal_router
+from src.routes.jwks import router as jwks_router
+from src.services.login_events import LoginEventRecorder
+from src.services.replica_router import ReplicaRouter
+from src.services.token_cache import VerifiedTokenCache
+from src.services.token_codec import JWTCodec, create_key_ring
+from src.services.token_revocation import TokenRevocationList
+from src.services.user_cache import UserCache
+from src.services.user_versions import create_user_version_store
+from src.utils.hashing import HashingQueueFullError, PasswordHashingExecutor
+from src.utils.http import create_http_client
+from src.utils.rate_limit import (
+    AuthRateLimiter,
+    RateLimitExceeded,
+    create_rate_limit_store,
+)
+
+
+@asynccontextmanager
+async def revoked_token_repository():
+    """Репозиторий denylist с собственной сессией для фоновой синхронизации"""
+    async with SessionLocal() as db:
+        yield SQLAlchemyRevokedTokenRepository(db)
+
+
+@asynccontextmanager
+async def login_event_repository(shards: Optional[UserShards]):
+    """Репозиторий журнала входов с собственной сессией для фоновой записи"""
+    async with SessionLocal() as db:
+        yield SQLAlchemyLoginEventRepository(db, shards)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ресурсы уровня приложения: создаются при старте и освобождаются при остановке"""
+    settings = get_settings()
+
+    app.state.password_hasher = PasswordHashingExecutor(
+        pool_size=settings.password_hash_workers,
+        queue_depth=settings.password_hash_queue_depth,
+        time_cost=settings.argon2_time_cost,
+        memory_cost=settings.argon2_memory_cost,
+        parallelism=settings.argon2_parallelism,
+    )
+    app.state.token_codec = JWTCodec(
+        create_key_ring(
+            secret_key=settings.secret_key,
+            algorithm=settings.algorithm,
+            keys=settings.jwt_keys,
+            active_kid=settings.jwt_active_kid,
+            key_files=settings.jwt_key_files,
+        )
+    )
+    app.state.token_cache = VerifiedTokenCache(
+        maxsize=settings.token_cache_size, ttl_seconds=settings.token_cache_ttl_seconds
+    )
+    # Версии пользователей после записи: claims старше них устарели
+    app.state.user_versions = create_user_version_store(
+        settings.user_version_storage_url,
+        maxsize=settings.token_cache_size,
+        ttl_seconds=settings.access_token_expire_minutes * 60,
+    )
+    app.state.user_cache = UserCache(
+        maxsize=settings.user_cache_size, ttl_seconds=settings.user_cache_ttl_seconds
+    )
+    app.state.auth_rate_limiter = AuthRateLimiter(
+        store=create_rate_limit_store(settings.rate_limit_storage_url),
+        window_seconds=settings.rate_limit_window_seconds,
+        login_per_ip=settings.login_rate_limit_per_ip,
+        login_per_account=settings.login_rate_limit_per_account,
+        register_per_ip=settings.register_rate_limit_per_ip,
+        register_per_account=settings.register_rate_limit_per_account,
+    )
+    # Один клиент на приложение: callback Google идут по прогретым соединениям
+    app.state.http_client = create_http_client(
+        max_connections=settings.google_http_max_connections,
+        max_keepalive_connections=settings.google_http_max_keepalive_connections,
+        keepalive_expiry=settings.google_http_keepalive_expiry_seconds,
+        connect_timeout=settings.google_http_connect_timeout_seconds,
+        read_timeout=settings.google_http_read_timeout_seconds,
+        http2=settings.google_http2,
+    )
+    app.state.revocation_list = TokenRevocationList(
+        capacity=settings.revocation_filter_capacity,
+        error_rate=settings.revocation_filter_error_rate,
+    )
+    async with revoked_token_repository() as repository:
+        await app.state.revocation_list.rebuild(repository)
+    revocation_sync = asyncio.create_task(
+        app.state.revocation_list.run(
+            revoked_token_repository,
+            sync_interval=settings.revocation_sync_interval_seconds,
+            rebuild_interval=settings.revocation_rebuild_interval_seconds,
+        )
+    )
+
+    # Шардирование пользователей (реплики в этом режиме не используются)
+    app.state.user_shards = UserShards(shard_engines) if shard_engines else None
+    app.state.replica_router = None
+    replica_checks = None
+    if replica_engines:
+        app.state.replica_router = ReplicaRouter(
+            replica_engines,
+            read_your_writes_seconds=settings.read_your_writes_seconds,
+            max_lag_seconds=settings.replica_max_lag_seconds,
+            ejection_seconds=settings.replica_ejection_seconds,
+        )
+        await app.state.replica_router.check()
+        replica_checks = asyncio.create_task(
+            app.state.replica_router.run(settings.replica_check_interval_seconds)
+        )
+
+    app.state.login_events = LoginEventRecorder(
+        max_pending=settings.login_events_queue_size,
+        batch_size=settings.login_events_batch_size,
+        flush_interval=settings.login_events_flush_interval_seconds,
+    )
+    login_events_writer = asyncio.create_task(
+        app.state.login_events.run(
+            partial(login_event_repository, app.state.user_shards)
+        )
+    )
+
+    # Сервисы создаются один раз; сессию БД им дает каждый запрос
+    create_services(app.state, settings)
+
+    try:
+        yield
+    finally:
+        # Дописываем накопленные события входа, пока БД доступна
+        await app.state.login_events.close(login_events_writer)
+        revocation_sync.cancel()
+        if replica_checks is not None:
+            replica_checks.cancel()
+            await app.state.replica_router.dispose()
+        if app.state.user_shards is not None:
+            await app.state.user_shards.dispose()
+        await app.state.auth_rate_limiter.close()
+        await app.state.user_versions.close()
+        await app.state.http_client.aclose()
+        app.state.password_hasher.shutdown()
+        # Соединения пула привязаны к event loop, который сейчас завершится
+        await engine.dispose()
+        if sqlite_read_engine is not None:
+            await sqlite_read_engine.dispose()
 
 
 def create_app() -> FastAPI:
@@ -18,6 +183,7 @@ def create_app() -> FastAPI:
         version=settings.app_version,
         debug=settings.debug,
         description="FastAPI приложение с чистой архитектурой и Google OAuth авторизацией",
+        lifespan=lifespan,
     )
 
     # Настройка CORS
@@ -29,8 +195,29 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    @app.exception_handler(HashingQueueFullError)
+    async def hashing_queue_full_handler(request: Request, exc: HashingQueueFullError):
+        """Пул хеширования перегружен - просим клиента повторить позже"""
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Server is busy, try again later"},
+            headers={"Retry-After": "1"},
+        )
+
+    @app.exception_handler(RateLimitExceeded)
+    async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+        """Слишком много попыток входа/регистрации"""
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": "Too many requests"},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
     # Подключение роутеров
     app.include_router(auth_router)
+    app.include_router(jwks_router)
+    app.include_router(internal_router)
+    app.include_router(admin_router)
 
     # Подключение статических файлов
     static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
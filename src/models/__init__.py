@@ -1,4 +1,19 @@
-from .user import Token, TokenData, User, UserCreate, UserInDB, UserLogin, UserRegister
+from .user import (
+    AdminUser,
+    LoginEvent,
+    LogoutRequest,
+    RefreshTokenInDB,
+    RefreshTokenRequest,
+    Token,
+    TokenData,
+    User,
+    UserCreate,
+    UserInDB,
+    UserLogin,
+    UserPage,
+    UserRecord,
+    UserRegister,
+)
 
 __all__ = [
     "User",
@@ -6,6 +21,13 @@ __all__ = [
     "UserRegister",
     "UserLogin",
     "UserInDB",
+    "UserRecord",
+    "AdminUser",
+    "UserPage",
+    "LoginEvent",
     "Token",
     "TokenData",
+    "RefreshTokenRequest",
+    "RefreshTokenInDB",
+    "LogoutRequest",
 ]
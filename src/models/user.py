@@ -1,9 +1,15 @@
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, EmailStr, field_validator
 
 
+def normalize_email(email: str) -> str:
+    """Каноническая форма email: адреса, отличающиеся регистром, - один аккаунт"""
+    return email.strip().lower()
+
+
 class UserBase(BaseModel):
     """Базовая модель пользователя"""
 
@@ -11,6 +17,11 @@ class UserBase(BaseModel):
     full_name: Optional[str] = None
     picture: Optional[str] = None
 
+    @field_validator("email")
+    @classmethod
+    def normalize_email_case(cls, value: str) -> str:
+        return normalize_email(value)
+
 
 class UserCreate(UserBase):
     """Модель для создания пользователя через OAuth"""
@@ -25,6 +36,11 @@ class UserRegister(BaseModel):
     password: str
     full_name: Optional[str] = None
 
+    @field_validator("email")
+    @classmethod
+    def normalize_email_case(cls, value: str) -> str:
+        return normalize_email(value)
+
 
 class UserLogin(BaseModel):
     """Модель для входа пользователя"""
@@ -32,6 +48,11 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+    @field_validator("email")
+    @classmethod
+    def normalize_email_case(cls, value: str) -> str:
+        return normalize_email(value)
+
 
 class UserInDB(UserBase):
     """Модель пользователя в базе данных"""
@@ -42,6 +63,7 @@ class UserInDB(UserBase):
     is_active: bool = True
     created_at: datetime
     updated_at: datetime
+    last_login_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -57,11 +79,112 @@ class User(UserBase):
         from_attributes = True
 
 
+class AdminUser(User):
+    """Пользователь в списке для операторов (без хеша пароля)"""
+
+    google_id: Optional[str] = None
+    has_password: bool
+    created_at: datetime
+    updated_at: datetime
+    last_login_at: Optional[datetime] = None
+
+
+class UserPage(BaseModel):
+    """Страница списка пользователей; next_cursor - ключ следующей страницы"""
+
+    items: List[AdminUser]
+    next_cursor: Optional[str] = None
+
+
+@dataclass(slots=True)
+class UserRecord:
+    """
+    Строка пользователя из БД для внутренних путей: без валидации pydantic
+    и словаря атрибутов. Модель ответа (User) создается только на границе API.
+    Порядок полей совпадает с порядком колонок в запросах репозитория.
+    """
+
+    id: str
+    email: str
+    full_name: Optional[str]
+    picture: Optional[str]
+    google_id: Optional[str]
+    hashed_password: Optional[str]
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+    last_login_at: Optional[datetime] = None
+
+    def to_user(self) -> User:
+        """Модель для ответа API"""
+        return User(
+            id=self.id,
+            email=self.email,
+            full_name=self.full_name,
+            picture=self.picture,
+            is_active=self.is_active,
+        )
+
+    def to_admin_user(self) -> AdminUser:
+        """Модель для списка пользователей в админке"""
+        return AdminUser(
+            id=self.id,
+            email=self.email,
+            full_name=self.full_name,
+            picture=self.picture,
+            is_active=self.is_active,
+            google_id=self.google_id,
+            has_password=self.hashed_password is not None,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+            last_login_at=self.last_login_at,
+        )
+
+
+@dataclass(slots=True)
+class LoginEvent:
+    """Успешный вход пользователя для журнала login_events"""
+
+    user_id: str
+    method: str
+    ip_address: Optional[str]
+    occurred_at: datetime
+
+
 class Token(BaseModel):
     """Модель токена доступа"""
 
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    """Запрос на обновление токена доступа"""
+
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    """Запрос на выход: refresh токен сессии отзывается вместе с токеном доступа"""
+
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenInDB(BaseModel):
+    """Модель refresh токена в базе данных"""
+
+    id: str
+    user_id: str
+    family_id: str
+    token_hash: str
+    created_at: datetime
+    expires_at: datetime
+    rotated_at: Optional[datetime] = None
+    revoked_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
 
 
 class TokenData(BaseModel):
@@ -69,3 +192,12 @@ class TokenData(BaseModel):
 
     user_id: Optional[str] = None
     email: Optional[str] = None
+    # Профиль и метка версии пользователя для режима без запроса к БД
+    full_name: Optional[str] = None
+    picture: Optional[str] = None
+    is_active: Optional[bool] = None
+    version: Optional[int] = None
+    issued_at: Optional[int] = None
+    # Идентификатор токена для отзыва и срок его действия
+    jti: Optional[str] = None
+    expires_at: Optional[int] = None
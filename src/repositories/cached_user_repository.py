@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.models.user import UserCreate, UserRecord, normalize_email
+from src.repositories.user_repository import (
+    AuthMethod,
+    UserCursor,
+    UserRepositoryInterface,
+    is_stale,
+)
+from src.services.user_cache import UserCache
+
+
+class CachedUserRepository(UserRepositoryInterface):
+    """
+    Read-through кэш поверх любого репозитория пользователей.
+    Чтения обслуживаются из памяти, записи идут в исходный репозиторий
+    и обновляют кэш. Отсутствующие пользователи не кэшируются.
+    """
+
+    def __init__(self, repository: UserRepositoryInterface, cache: UserCache):
+        self.repository = repository
+        self.cache = cache
+
+    def _remember(self, user: Optional[UserRecord]) -> Optional[UserRecord]:
+        if user is not None:
+            self.cache.put(user)
+        return user
+
+    async def create_user(self, user: UserCreate) -> UserRecord:
+        """Создать пользователя через OAuth"""
+        return self._remember(await self.repository.create_user(user))
+
+    async def create_user_with_password(
+        self, email: str, hashed_password: str, full_name: Optional[str] = None
+    ) -> UserRecord:
+        """Создать пользователя с паролем"""
+        return self._remember(
+            await self.repository.create_user_with_password(
+                email, hashed_password, full_name
+            )
+        )
+
+    async def upsert_google_user(self, user: UserCreate) -> UserRecord:
+        """Создать или обновить пользователя Google"""
+        return self._remember(await self.repository.upsert_google_user(user))
+
+    async def get_user_by_id(
+        self, user_id: str, min_updated_at: Optional[datetime] = None
+    ) -> Optional[UserRecord]:
+        """Получить пользователя по ID (версия в кэше старше метки - промах)"""
+        user = self.cache.get_by_id(user_id)
+        if user is None or is_stale(user, min_updated_at):
+            user = self._remember(
+                await self.repository.get_user_by_id(user_id, min_updated_at)
+            )
+        return user
+
+    async def get_user_by_email(self, email: str) -> Optional[UserRecord]:
+        """Получить пользователя по email"""
+        user = self.cache.get_by_email(normalize_email(email))
+        if user is None:
+            user = self._remember(await self.repository.get_user_by_email(email))
+        return user
+
+    async def get_user_by_google_id(self, google_id: str) -> Optional[UserRecord]:
+        """Получить пользователя по Google ID"""
+        user = self.cache.get_by_google_id(google_id)
+        if user is None:
+            user = self._remember(
+                await self.repository.get_user_by_google_id(google_id)
+            )
+        return user
+
+    async def list_users(
+        self,
+        limit: int,
+        after: Optional[UserCursor] = None,
+        is_active: Optional[bool] = None,
+        auth_method: Optional[AuthMethod] = None,
+    ) -> List[UserRecord]:
+        """Списки не кэшируются: запрос идет в исходный репозиторий"""
+        return await self.repository.list_users(limit, after, is_active, auth_method)
+
+    async def update_user(self, user_id: str, user_data: Dict) -> Optional[UserRecord]:
+        """
+        Обновить пользователя. Запись вычищается до обращения к БД,
+        чтобы неудачное обновление не оставило в кэше старую версию.
+        """
+        self.cache.invalidate(user_id)
+        return self._remember(await self.repository.update_user(user_id, user_data))
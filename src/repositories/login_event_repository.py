@@ -0,0 +1,98 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, insert, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import LoginEventModel
+from src.models.user import LoginEvent
+from src.repositories.sharded_user_repository import UserShards
+from src.repositories.user_repository import users
+
+login_events = LoginEventModel.__table__
+
+# last_login_at только растет; updated_at (версия пользователя в claims
+# токенов) остается прежним, иначе каждый вход инвалидировал бы токены
+UPDATE_LAST_LOGIN = (
+    update(users)
+    .where(
+        users.c.id == bindparam("login_user_id"),
+        or_(
+            users.c.last_login_at.is_(None),
+            users.c.last_login_at < bindparam("login_at"),
+        ),
+    )
+    .values(last_login_at=bindparam("login_at"), updated_at=users.c.updated_at)
+)
+
+
+class LoginEventRepositoryInterface(ABC):
+    """Интерфейс репозитория событий входа"""
+
+    @abstractmethod
+    async def write_batch(self, events: List[LoginEvent]) -> None:
+        """Записать пачку событий и обновить last_login_at пользователей"""
+        pass
+
+
+class SQLAlchemyLoginEventRepository(LoginEventRepositoryInterface):
+    """
+    SQLAlchemy реализация: события одним INSERT, last_login_at одним
+    executemany UPDATE - по строке на пользователя, а не на событие.
+    """
+
+    def __init__(self, db: AsyncSession, shards: Optional[UserShards] = None):
+        self.db = db
+        self.shards = shards
+
+    async def write_batch(self, events: List[LoginEvent]) -> None:
+        """События и last_login_at (без шардов) - в одной транзакции"""
+        if not events:
+            return
+        last_logins: Dict[str, datetime] = {}
+        for event in events:
+            if event.occurred_at > last_logins.get(event.user_id, datetime.min):
+                last_logins[event.user_id] = event.occurred_at
+
+        await self.db.execute(
+            insert(login_events),
+            [
+                {
+                    "user_id": event.user_id,
+                    "method": event.method,
+                    "ip_address": event.ip_address,
+                    "occurred_at": event.occurred_at,
+                }
+                for event in events
+            ],
+        )
+        if self.shards is None:
+            await self._update_last_login(self.db, last_logins)
+        await self.db.commit()
+
+        if self.shards is not None:
+            await self._update_shards(last_logins)
+
+    async def _update_shards(self, last_logins: Dict[str, datetime]) -> None:
+        # Пользователь, которого rebalance еще не перенес, обновится
+        # на следующем входе
+        by_shard: Dict[str, Dict[str, datetime]] = {}
+        for user_id, login_at in last_logins.items():
+            by_shard.setdefault(self.shards.owner(user_id), {})[user_id] = login_at
+        for shard, shard_logins in by_shard.items():
+            async with self.shards.session(shard) as session:
+                await self._update_last_login(session, shard_logins)
+                await session.commit()
+
+    @staticmethod
+    async def _update_last_login(
+        db: AsyncSession, last_logins: Dict[str, datetime]
+    ) -> None:
+        await db.execute(
+            UPDATE_LAST_LOGIN,
+            [
+                {"login_user_id": user_id, "login_at": login_at}
+                for user_id, login_at in last_logins.items()
+            ],
+        )
@@ -0,0 +1,100 @@
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import RefreshTokenModel
+from src.models.user import RefreshTokenInDB
+
+
+class RefreshTokenRepositoryInterface(ABC):
+    """Интерфейс репозитория refresh токенов"""
+
+    @abstractmethod
+    async def create_token(
+        self, user_id: str, family_id: str, token_hash: str, expires_at: datetime
+    ) -> RefreshTokenInDB:
+        """Сохранить новый refresh токен"""
+        pass
+
+    @abstractmethod
+    async def get_token_by_hash(self, token_hash: str) -> Optional[RefreshTokenInDB]:
+        """Найти refresh токен по его хешу"""
+        pass
+
+    @abstractmethod
+    async def mark_rotated(self, token_id: str) -> bool:
+        """
+        Пометить токен использованным.
+        Возвращает False, если токен уже был использован или отозван.
+        """
+        pass
+
+    @abstractmethod
+    async def revoke_family(self, family_id: str) -> None:
+        """Отозвать все токены цепочки ротации"""
+        pass
+
+
+class SQLAlchemyRefreshTokenRepository(RefreshTokenRepositoryInterface):
+    """SQLAlchemy реализация репозитория refresh токенов"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_token(
+        self, user_id: str, family_id: str, token_hash: str, expires_at: datetime
+    ) -> RefreshTokenInDB:
+        """Сохранить новый refresh токен"""
+        db_token = RefreshTokenModel(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            family_id=family_id,
+            token_hash=token_hash,
+            created_at=datetime.utcnow(),
+            expires_at=expires_at,
+        )
+
+        self.db.add(db_token)
+        await self.db.commit()
+
+        return RefreshTokenInDB.model_validate(db_token)
+
+    async def get_token_by_hash(self, token_hash: str) -> Optional[RefreshTokenInDB]:
+        """Найти refresh токен по его хешу"""
+        db_token = await self.db.scalar(
+            select(RefreshTokenModel).where(RefreshTokenModel.token_hash == token_hash)
+        )
+        if not db_token:
+            return None
+
+        return RefreshTokenInDB.model_validate(db_token)
+
+    async def mark_rotated(self, token_id: str) -> bool:
+        """Пометить токен использованным (атомарно, только один раз)"""
+        result = await self.db.execute(
+            update(RefreshTokenModel)
+            .where(
+                RefreshTokenModel.id == token_id,
+                RefreshTokenModel.rotated_at.is_(None),
+                RefreshTokenModel.revoked_at.is_(None),
+            )
+            .values(rotated_at=datetime.utcnow())
+        )
+        await self.db.commit()
+        return result.rowcount == 1
+
+    async def revoke_family(self, family_id: str) -> None:
+        """Отозвать все токены цепочки ротации"""
+        await self.db.execute(
+            update(RefreshTokenModel)
+            .where(
+                RefreshTokenModel.family_id == family_id,
+                RefreshTokenModel.revoked_at.is_(None),
+            )
+            .values(revoked_at=datetime.utcnow())
+        )
+        await self.db.commit()
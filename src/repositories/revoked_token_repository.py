@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import RevokedTokenModel
+
+
+class RevokedTokenRepositoryInterface(ABC):
+    """Интерфейс репозитория отозванных токенов доступа"""
+
+    @abstractmethod
+    async def revoke(self, jti: str, expires_at: datetime) -> None:
+        """Добавить токен в denylist"""
+        pass
+
+    @abstractmethod
+    async def is_revoked(self, jti: str) -> bool:
+        """Точная проверка: отозван ли токен"""
+        pass
+
+    @abstractmethod
+    async def list_revoked(
+        self, since: Optional[datetime] = None
+    ) -> List[Tuple[str, datetime]]:
+        """Неистекшие отозванные токены: [(jti, revoked_at)], начиная с since"""
+        pass
+
+    @abstractmethod
+    async def purge_expired(self) -> int:
+        """Удалить записи об истекших токенах"""
+        pass
+
+
+class SQLAlchemyRevokedTokenRepository(RevokedTokenRepositoryInterface):
+    """SQLAlchemy реализация репозитория отозванных токенов"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def revoke(self, jti: str, expires_at: datetime) -> None:
+        """Добавить токен в denylist (повторный отзыв не считается ошибкой)"""
+        self.db.add(
+            RevokedTokenModel(
+                jti=jti, expires_at=expires_at, revoked_at=datetime.utcnow()
+            )
+        )
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+
+    async def is_revoked(self, jti: str) -> bool:
+        """Точная проверка по первичному ключу"""
+        return await self.db.get(RevokedTokenModel, jti) is not None
+
+    async def list_revoked(
+        self, since: Optional[datetime] = None
+    ) -> List[Tuple[str, datetime]]:
+        """Неистекшие отозванные токены, начиная с since"""
+        query = select(RevokedTokenModel.jti, RevokedTokenModel.revoked_at).where(
+            RevokedTokenModel.expires_at > datetime.utcnow()
+        )
+        if since is not None:
+            query = query.where(RevokedTokenModel.revoked_at >= since)
+        result = await self.db.execute(query)
+        return [(jti, revoked_at) for jti, revoked_at in result.all()]
+
+    async def purge_expired(self) -> int:
+        """Удалить записи об истекших токенах"""
+        result = await self.db.execute(
+            delete(RevokedTokenModel).where(
+                RevokedTokenModel.expires_at <= datetime.utcnow()
+            )
+        )
+        await self.db.commit()
+        return result.rowcount
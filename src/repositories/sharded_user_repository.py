@@ -0,0 +1,418 @@
+"""
+Репозиторий пользователей, шардированный по хешу id
+"""
+
+import asyncio
+import heapq
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from src.database import UserDirectoryModel
+from src.models.user import UserCreate, UserRecord, normalize_email
+from src.repositories.user_repository import (
+    UPSERT_DIALECTS,
+    AuthMethod,
+    SQLAlchemyUserRepository,
+    UserAlreadyExistsError,
+    UserCursor,
+    UserRepositoryInterface,
+    new_user_id,
+    users,
+)
+from src.utils.sharding import rendezvous_owner
+
+directory = UserDirectoryModel.__table__
+
+
+def email_key(email: str) -> str:
+    return f"email:{normalize_email(email)}"
+
+
+def google_key(google_id: str) -> str:
+    return f"google:{google_id}"
+
+
+def directory_rows(user_id: str, email: str, google_id: Optional[str], shard: str):
+    """Записи каталога для пользователя"""
+    rows = [{"lookup_key": email_key(email), "user_id": user_id, "shard": shard}]
+    if google_id:
+        rows.append(
+            {"lookup_key": google_key(google_id), "user_id": user_id, "shard": shard}
+        )
+    return rows
+
+
+class UserShards:
+    """Движки шардов таблицы users и выбор шарда-владельца по id"""
+
+    def __init__(self, engines: Mapping[str, AsyncEngine]):
+        if not engines:
+            raise ValueError("At least one user shard is required")
+        self.engines: Dict[str, AsyncEngine] = dict(engines)
+        self._sessions = {
+            name: async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+            for name, engine in self.engines.items()
+        }
+
+    @property
+    def names(self) -> List[str]:
+        return sorted(self.engines)
+
+    def owner(self, user_id: str) -> str:
+        """Шард, на котором должен жить пользователь"""
+        return rendezvous_owner(user_id, self.engines)
+
+    def session(self, shard: str) -> AsyncSession:
+        return self._sessions[shard]()
+
+    async def dispose(self) -> None:
+        for engine in self.engines.values():
+            await engine.dispose()
+
+
+class ShardedUserRepository(UserRepositoryInterface):
+    """
+    Пользователи распределены по шардам rendezvous хешем id: поиск по id
+    идет сразу на шард-владелец. Поиск по email и google_id - через каталог
+    user_directory в основной БД (одна строка по первичному ключу), без
+    опроса всех шардов. Каталог же гарантирует уникальность email и google_id
+    между шардами: запись в него делается до вставки пользователя.
+
+    Пока rebalance переносит пользователя на новый шард, его строка может
+    оставаться на старом: промах по id перепроверяется по каталогу, а запись,
+    не нашедшая строку на старом шарде, повторяется на шарде из каталога.
+    """
+
+    def __init__(self, db: AsyncSession, shards: UserShards):
+        self.db = db
+        self.shards = shards
+
+    @asynccontextmanager
+    async def _shard(self, shard: str) -> AsyncIterator[SQLAlchemyUserRepository]:
+        async with self.shards.session(shard) as session:
+            yield SQLAlchemyUserRepository(session)
+
+    async def _lookup(self, lookup_key: str) -> Optional[Tuple[str, str]]:
+        """(id, шард) по ключу каталога"""
+        result = await self.db.execute(
+            select(directory.c.user_id, directory.c.shard).where(
+                directory.c.lookup_key == lookup_key
+            )
+        )
+        row = result.first()
+        return (row.user_id, row.shard) if row is not None else None
+
+    async def _directory_shard(self, user_id: str) -> Optional[str]:
+        result = await self.db.execute(
+            select(directory.c.shard).where(directory.c.user_id == user_id).limit(1)
+        )
+        return result.scalar()
+
+    async def _get_from(
+        self, shard: str, user_id: str, min_updated_at: Optional[datetime] = None
+    ) -> Optional[UserRecord]:
+        async with self._shard(shard) as repository:
+            return await repository.get_user_by_id(user_id, min_updated_at)
+
+    async def _create(self, user_id: str, email: str, google_id, create) -> UserRecord:
+        """Занять email/google_id в каталоге, затем вставить пользователя в шард"""
+        shard = self.shards.owner(user_id)
+        rows = directory_rows(user_id, email, google_id, shard)
+        try:
+            await self.db.execute(insert(directory), rows)
+            await self.db.commit()
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise UserAlreadyExistsError() from e
+
+        try:
+            async with self._shard(shard) as repository:
+                return await create(repository)
+        except BaseException:
+            # Компенсация: освобождаем ключи каталога
+            keys = [row["lookup_key"] for row in rows]
+            await self.db.execute(
+                delete(directory).where(directory.c.lookup_key.in_(keys))
+            )
+            await self.db.commit()
+            raise
+
+    async def create_user(self, user: UserCreate) -> UserRecord:
+        """Создать нового пользователя через OAuth"""
+        user_id = new_user_id()
+        return await self._create(
+            user_id,
+            user.email,
+            user.google_id,
+            lambda repository: repository.create_user(user, user_id=user_id),
+        )
+
+    async def create_user_with_password(
+        self, email: str, hashed_password: str, full_name: Optional[str] = None
+    ) -> UserRecord:
+        """Создать пользователя с паролем"""
+        user_id = new_user_id()
+        return await self._create(
+            user_id,
+            email,
+            None,
+            lambda repository: repository.create_user_with_password(
+                email, hashed_password, full_name, user_id=user_id
+            ),
+        )
+
+    async def upsert_google_user(self, user: UserCreate) -> UserRecord:
+        """Создать пользователя Google или обновить его на его шарде"""
+        found = await self._lookup(google_key(user.google_id))
+        if found is None:
+            try:
+                return await self.create_user(user)
+            except UserAlreadyExistsError:
+                # Параллельный первый вход с тем же google_id успел раньше
+                found = await self._lookup(google_key(user.google_id))
+                if found is None:
+                    raise
+
+        user_id, shard = found
+        async with self._shard(shard) as repository:
+            record = await repository.upsert_google_user(user)
+            if record.id == user_id:
+                return record
+            # rebalance перенес пользователя, пока вход ждал блокировку: вместо
+            # обновления на старом шарде вставлена новая строка - удаляем ее
+            await repository.db.execute(delete(users).where(users.c.id == record.id))
+            await repository.db.commit()
+
+        _, shard = await self._lookup(google_key(user.google_id))
+        async with self._shard(shard) as repository:
+            return await repository.upsert_google_user(user)
+
+    async def get_user_by_id(
+        self, user_id: str, min_updated_at: Optional[datetime] = None
+    ) -> Optional[UserRecord]:
+        """Получить пользователя по ID с шарда-владельца"""
+        owner = self.shards.owner(user_id)
+        user = await self._get_from(owner, user_id, min_updated_at)
+        if user is None:
+            shard = await self._directory_shard(user_id)
+            if shard is not None and shard != owner:
+                user = await self._get_from(shard, user_id, min_updated_at)
+        return user
+
+    async def get_user_by_email(self, email: str) -> Optional[UserRecord]:
+        """Получить пользователя по email через каталог"""
+        found = await self._lookup(email_key(email))
+        return await self._get_from(found[1], found[0]) if found else None
+
+    async def get_user_by_google_id(self, google_id: str) -> Optional[UserRecord]:
+        """Получить пользователя по Google ID через каталог"""
+        found = await self._lookup(google_key(google_id))
+        return await self._get_from(found[1], found[0]) if found else None
+
+    async def list_users(
+        self,
+        limit: int,
+        after: Optional[UserCursor] = None,
+        is_active: Optional[bool] = None,
+        auth_method: Optional[AuthMethod] = None,
+    ) -> List[UserRecord]:
+        """Страница из каждого шарда, слитая по (created_at, id)"""
+
+        async def page(shard: str) -> List[UserRecord]:
+            async with self._shard(shard) as repository:
+                return await repository.list_users(limit, after, is_active, auth_method)
+
+        pages = await asyncio.gather(*(page(shard) for shard in self.shards.names))
+        merged = heapq.merge(*pages, key=lambda user: (user.created_at, user.id))
+        return [user for user, _ in zip(merged, range(limit))]
+
+    async def update_user(self, user_id: str, user_data: Dict) -> Optional[UserRecord]:
+        """Обновить пользователя на его шарде; смена email обновляет каталог"""
+        current = await self.get_user_by_id(user_id)
+        if current is None:
+            return None
+        shard = await self._directory_shard(user_id) or self.shards.owner(user_id)
+
+        new_email = user_data.get("email")
+        old_key = email_key(current.email)
+        new_key = email_key(new_email) if new_email else old_key
+        if new_key != old_key:
+            try:
+                await self.db.execute(
+                    insert(directory).values(
+                        lookup_key=new_key, user_id=user_id, shard=shard
+                    )
+                )
+                await self.db.commit()
+            except IntegrityError as e:
+                await self.db.rollback()
+                raise UserAlreadyExistsError() from e
+
+        async with self._shard(shard) as repository:
+            user = await repository.update_user(user_id, user_data)
+        if user is None:
+            # rebalance перенес пользователя, пока запись ждала блокировку
+            moved_to = await self._directory_shard(user_id)
+            if moved_to is not None and moved_to != shard:
+                async with self._shard(moved_to) as repository:
+                    user = await repository.update_user(user_id, user_data)
+                if new_key != old_key:
+                    # Новый ключ email мог попасть в каталог после переключения
+                    await self.db.execute(
+                        update(directory)
+                        .where(directory.c.user_id == user_id)
+                        .values(shard=moved_to)
+                    )
+                    await self.db.commit()
+
+        if new_key != old_key:
+            stale_key = new_key if user is None else old_key
+            await self.db.execute(
+                delete(directory).where(directory.c.lookup_key == stale_key)
+            )
+            await self.db.commit()
+        return user
+
+
+async def rebuild_directory(
+    directory_engine: AsyncEngine, shards: UserShards, batch_size: int = 1000
+) -> int:
+    """
+    Заполнить каталог по содержимому шардов (перевод существующей БД
+    на шардирование или восстановление каталога). Возвращает число пользователей.
+    """
+    dialect_insert = UPSERT_DIALECTS[directory_engine.dialect.name]
+    total = 0
+    for shard in shards.names:
+        async with shards.engines[shard].connect() as source:
+            result = await source.stream(
+                select(users.c.id, users.c.email, users.c.google_id)
+            )
+            async for rows in result.partitions(batch_size):
+                entries = [
+                    entry
+                    for row in rows
+                    for entry in directory_rows(row.id, row.email, row.google_id, shard)
+                ]
+                stmt = dialect_insert(directory).values(entries)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[directory.c.lookup_key],
+                    set_={
+                        "user_id": stmt.excluded.user_id,
+                        "shard": stmt.excluded.shard,
+                    },
+                )
+                async with directory_engine.begin() as conn:
+                    await conn.execute(stmt)
+                total += len(rows)
+    return total
+
+
+async def shard_status(shards: UserShards) -> Dict[str, Dict[str, int]]:
+    """Число пользователей на каждом шарде и сколько из них должны переехать"""
+    status = {}
+    for shard in shards.names:
+        users_count = misplaced = 0
+        async with shards.engines[shard].connect() as conn:
+            result = await conn.stream(select(users.c.id))
+            async for user_id in result.scalars():
+                users_count += 1
+                if shards.owner(user_id) != shard:
+                    misplaced += 1
+        status[shard] = {"users": users_count, "misplaced": misplaced}
+    return status
+
+
+async def rebalance(
+    directory_engine: AsyncEngine,
+    shards: UserShards,
+    batch_size: int = 1000,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    Перенести пользователей на новых владельцев (после добавления шарда).
+
+    Пачка переносится в одной транзакции исходного шарда (см. _move):
+    в любой момент пользователь доступен на шарде из каталога, а записи,
+    пришедшие во время переноса, не теряются. Повторный запуск после сбоя
+    безопасен. Возвращает {"шард-источник -> шард-цель": число перенесенных}.
+    """
+    moved: Dict[str, int] = {}
+    for source in shards.names:
+        last_id = None
+        while True:
+            query = select(users.c.id).order_by(users.c.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(users.c.id > last_id)
+            async with shards.engines[source].connect() as conn:
+                ids = (await conn.execute(query)).scalars().all()
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            by_target: Dict[str, List[str]] = {}
+            for user_id in ids:
+                target = shards.owner(user_id)
+                if target != source:
+                    by_target.setdefault(target, []).append(user_id)
+
+            for target, batch in by_target.items():
+                if not dry_run:
+                    count = await _move(directory_engine, shards, source, target, batch)
+                else:
+                    count = len(batch)
+                key = f"{source} -> {target}"
+                moved[key] = moved.get(key, 0) + count
+    return moved
+
+
+async def _move(
+    directory_engine: AsyncEngine,
+    shards: UserShards,
+    source: str,
+    target: str,
+    ids: List[str],
+) -> int:
+    """
+    Строки удаляются с источника первым же запросом (DELETE ... RETURNING),
+    а транзакция источника остается открытой, пока копия не записана в цель
+    и каталог не переключен. Все это время записи в эти строки ждут
+    (блокировка строк в PostgreSQL, блокировка записи в SQLite), поэтому
+    копируется последняя версия. После коммита ожидавшие записи не находят
+    строку и повторяются на шарде из каталога. При сбое удаление откатывается,
+    а копия, оставшаяся в цели, перезаписывается при повторном запуске.
+    """
+    target_engine = shards.engines[target]
+    dialect_insert = UPSERT_DIALECTS[target_engine.dialect.name]
+    async with shards.engines[source].begin() as source_conn:
+        rows = (
+            await source_conn.execute(
+                delete(users).where(users.c.id.in_(ids)).returning(*users.c)
+            )
+        ).all()
+        if not rows:
+            return 0
+
+        stmt = dialect_insert(users).values([dict(row._mapping) for row in rows])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[users.c.id],
+            set_={
+                column.name: stmt.excluded[column.name]
+                for column in users.c
+                if column.name != "id"
+            },
+        )
+        async with target_engine.begin() as conn:
+            await conn.execute(stmt)
+        async with directory_engine.begin() as conn:
+            await conn.execute(
+                update(directory)
+                .where(directory.c.user_id.in_([row.id for row in rows]))
+                .values(shard=target)
+            )
+    return len(rows)
@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.models.user import UserCreate, UserRecord, normalize_email
+from src.repositories.user_repository import (
+    AuthMethod,
+    UserCursor,
+    UserRepositoryInterface,
+    is_stale,
+)
+from src.utils.single_flight import SingleFlight
+
+
+class SingleFlightUserRepository(UserRepositoryInterface):
+    """
+    Одновременные поиски одного пользователя объединяются в один запрос к БД
+    (промах кэша популярного токена, холодный старт после деплоя).
+    Ключи поиска по id, email и google_id раздельные. Результаты не хранятся:
+    это не кэш, а защита БД от лавины одинаковых запросов.
+
+    Записи освобождают ключи пользователя, чтобы вызовы после записи
+    не присоединялись к чтению, начатому до нее.
+    """
+
+    def __init__(self, repository: UserRepositoryInterface, flight: SingleFlight):
+        self.repository = repository
+        self.flight = flight
+
+    def _forget(self, *users: Optional[UserRecord]) -> None:
+        for user in users:
+            if user is not None:
+                self.flight.forget(("id", user.id))
+                self.flight.forget(("email", user.email))
+                if user.google_id:
+                    self.flight.forget(("google_id", user.google_id))
+
+    async def create_user(self, user: UserCreate) -> UserRecord:
+        """Создать пользователя через OAuth"""
+        created = await self.repository.create_user(user)
+        self._forget(created)
+        return created
+
+    async def create_user_with_password(
+        self, email: str, hashed_password: str, full_name: Optional[str] = None
+    ) -> UserRecord:
+        """Создать пользователя с паролем"""
+        created = await self.repository.create_user_with_password(
+            email, hashed_password, full_name
+        )
+        self._forget(created)
+        return created
+
+    async def upsert_google_user(self, user: UserCreate) -> UserRecord:
+        """Создать или обновить пользователя Google"""
+        upserted = await self.repository.upsert_google_user(user)
+        self._forget(upserted)
+        return upserted
+
+    async def get_user_by_id(
+        self, user_id: str, min_updated_at: Optional[datetime] = None
+    ) -> Optional[UserRecord]:
+        """
+        Получить пользователя по ID. Если общий запрос, начатый без метки
+        версии, вернул более старую версию, читаем отдельно.
+        """
+        user = await self.flight.do(
+            ("id", user_id),
+            lambda: self.repository.get_user_by_id(user_id, min_updated_at),
+        )
+        if is_stale(user, min_updated_at):
+            user = await self.repository.get_user_by_id(user_id, min_updated_at)
+        return user
+
+    async def get_user_by_email(self, email: str) -> Optional[UserRecord]:
+        """Получить пользователя по email"""
+        return await self.flight.do(
+            ("email", normalize_email(email)),
+            lambda: self.repository.get_user_by_email(email),
+        )
+
+    async def get_user_by_google_id(self, google_id: str) -> Optional[UserRecord]:
+        """Получить пользователя по Google ID"""
+        return await self.flight.do(
+            ("google_id", google_id),
+            lambda: self.repository.get_user_by_google_id(google_id),
+        )
+
+    async def list_users(
+        self,
+        limit: int,
+        after: Optional[UserCursor] = None,
+        is_active: Optional[bool] = None,
+        auth_method: Optional[AuthMethod] = None,
+    ) -> List[UserRecord]:
+        """Списки не объединяются: запрос идет в исходный репозиторий"""
+        return await self.repository.list_users(limit, after, is_active, auth_method)
+
+    async def update_user(self, user_id: str, user_data: Dict) -> Optional[UserRecord]:
+        """Обновить пользователя и освободить ключи старой и новой версии"""
+        self.flight.forget(("id", user_id))
+        updated = await self.repository.update_user(user_id, user_data)
+        self._forget(updated)
+        return updated
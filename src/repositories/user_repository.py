@@ -1,67 +1,260 @@
-import uuid
+import logging
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Literal, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import case, func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database import UserModel
-from src.models.user import UserCreate, UserInDB
+from src.models.user import UserCreate, UserRecord, normalize_email
+from src.services.replica_router import ReplicaRouter, is_connection_error
+from src.utils.ids import uuid7
+
+logger = logging.getLogger(__name__)
+
+
+class UserAlreadyExistsError(ValueError):
+    """Пользователь с таким email уже существует"""
+
+    def __init__(self, message: str = "User with this email already exists"):
+        super().__init__(message)
+
+
+# Способ входа для фильтра списка пользователей
+AuthMethod = Literal["google", "password"]
+
+# Ключ keyset пагинации: (created_at, id) последнего пользователя страницы
+UserCursor = Tuple[datetime, str]
+
+
+def new_user_id() -> str:
+    """Идентификатор нового пользователя (UUIDv7: растет со временем)"""
+    return str(uuid7())
+
+
+def is_stale(user: Optional[UserRecord], min_updated_at: Optional[datetime]) -> bool:
+    """
+    Прочитанная версия старше известной записи (реплика или кэш ее еще
+    не видят): пользователя нет или его updated_at раньше min_updated_at
+    """
+    return min_updated_at is not None and (
+        user is None or user.updated_at < min_updated_at
+    )
 
 
 class UserRepositoryInterface(ABC):
     """Интерфейс репозитория пользователей"""
 
     @abstractmethod
-    async def create_user(self, user: UserCreate) -> UserInDB:
+    async def create_user(self, user: UserCreate) -> UserRecord:
         """Создать нового пользователя"""
         pass
 
     @abstractmethod
-    async def get_user_by_id(self, user_id: str) -> Optional[UserInDB]:
-        """Получить пользователя по ID"""
+    async def get_user_by_id(
+        self, user_id: str, min_updated_at: Optional[datetime] = None
+    ) -> Optional[UserRecord]:
+        """
+        Получить пользователя по ID.
+        min_updated_at - updated_at последней известной записи пользователя
+        (из метки версии токена): более старая версия не возвращается.
+        """
         pass
 
     @abstractmethod
-    async def get_user_by_email(self, email: str) -> Optional[UserInDB]:
+    async def get_user_by_email(self, email: str) -> Optional[UserRecord]:
         """Получить пользователя по email"""
         pass
 
     @abstractmethod
-    async def get_user_by_google_id(self, google_id: str) -> Optional[UserInDB]:
+    async def get_user_by_google_id(self, google_id: str) -> Optional[UserRecord]:
         """Получить пользователя по Google ID"""
         pass
 
     @abstractmethod
-    async def update_user(self, user_id: str, user_data: Dict) -> Optional[UserInDB]:
+    async def update_user(self, user_id: str, user_data: Dict) -> Optional[UserRecord]:
         """Обновить данные пользователя"""
         pass
 
     @abstractmethod
     async def create_user_with_password(
         self, email: str, hashed_password: str, full_name: Optional[str] = None
-    ) -> UserInDB:
-        """Создать пользователя с паролем"""
+    ) -> UserRecord:
+        """
+        Создать пользователя с паролем.
+        Занятый email - UserAlreadyExistsError.
+        """
+        pass
+
+    @abstractmethod
+    async def list_users(
+        self,
+        limit: int,
+        after: Optional[UserCursor] = None,
+        is_active: Optional[bool] = None,
+        auth_method: Optional[AuthMethod] = None,
+    ) -> List[UserRecord]:
+        """
+        Страница пользователей в порядке (created_at, id), начиная после after.
+        Стоимость не зависит от номера страницы (keyset, без OFFSET).
+        """
         pass
 
+    @abstractmethod
+    async def upsert_google_user(self, user: UserCreate) -> UserRecord:
+        """
+        Создать пользователя Google или обновить имя и аватар существующего.
+        updated_at меняется, только если данные действительно изменились.
+        """
+        pass
+
+
+users = UserModel.__table__
+
+# Поля, которые нельзя менять через update_user
+IMMUTABLE_FIELDS = {"id", "google_id", "created_at"}
+
+# Диалекты с INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+# Колонки в порядке полей UserRecord: строка результата распаковывается позиционно
+USER_COLUMNS = tuple(users.c[name] for name in UserRecord.__slots__)
+
+
+def _row_to_user(row) -> UserRecord:
+    return UserRecord(*row)
+
 
 class SQLAlchemyUserRepository(UserRepositoryInterface):
     """
     SQLAlchemy реализация репозитория пользователей.
     Использует реальную БД (SQLite для разработки, PostgreSQL для продакшена)
+    через AsyncSession: ожидание БД не блокирует event loop.
+    Запись - одним запросом: уникальность проверяет БД, итоговая строка
+    берется из RETURNING.
+
+    С ReplicaRouter чтения идут на реплики, записи - через сессию primary.
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, replicas: Optional[ReplicaRouter] = None):
         self.db = db
+        self.replicas = replicas
+
+    @property
+    def _dialect(self):
+        return self.db.get_bind().dialect
+
+    async def _insert_user(self, values: Dict) -> UserRecord:
+        """Вставить пользователя; занятый email/google_id - UserAlreadyExistsError"""
+        try:
+            await self.db.execute(insert(users).values(**values))
+            await self.db.commit()
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise UserAlreadyExistsError() from e
+
+        return self._written(UserRecord(**values))
+
+    def _written(self, user: Optional[UserRecord]) -> Optional[UserRecord]:
+        """Чтения только что записанного пользователя - с primary"""
+        if self.replicas is not None and user is not None:
+            self.replicas.note_write(
+                ("id", user.id), ("email", user.email), ("google_id", user.google_id)
+            )
+        return user
+
+    async def _read(self, query, *keys, accept=None):
+        """
+        Выполнить чтение на реплике, если она есть и ключи не записывались
+        только что. Если к реплике не подключиться или соединение оборвалось,
+        реплика исключается и запрос повторяется на primary; остальные ошибки
+        (SQL, данные, таймаут запроса) пробрасываются.
 
-    async def create_user(self, user: UserCreate) -> UserInDB:
+        accept(rows) -> False: ответ реплики не принимается (она еще не видит
+        записи, сделанной, возможно, другим воркером), чтение идет на primary.
+        """
+        engine = self.replicas.engine_for_read(*keys) if self.replicas else None
+        if engine is not None:
+            try:
+                conn = await engine.connect()
+            except (DBAPIError, OSError) as e:
+                self.replicas.eject(engine, str(e))
+                logger.warning("Replica connection failed, retrying on primary")
+            else:
+                try:
+                    rows = (await conn.execute(query)).all()
+                    if accept is None or accept(rows):
+                        return rows
+                    self.replicas.note_stale_read()
+                except (DBAPIError, OSError) as e:
+                    if not is_connection_error(e):
+                        raise
+                    self.replicas.eject(engine, str(e))
+                    logger.warning("Replica read failed, retrying on primary")
+                finally:
+                    await conn.close()
+
+        return (await self.db.execute(query)).all()
+
+    async def create_user(
+        self, user: UserCreate, user_id: Optional[str] = None
+    ) -> UserRecord:
         """Создать нового пользователя через OAuth"""
-        user_id = str(uuid.uuid4())
         now = datetime.utcnow()
+        return await self._insert_user(
+            {
+                "id": user_id or new_user_id(),
+                "email": normalize_email(user.email),
+                "full_name": user.full_name,
+                "picture": user.picture,
+                "google_id": user.google_id,
+                "hashed_password": None,
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
 
-        db_user = UserModel(
-            id=user_id,
-            email=user.email,
+    async def create_user_with_password(
+        self,
+        email: str,
+        hashed_password: str,
+        full_name: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> UserRecord:
+        """
+        Создать пользователя с паролем (обычная регистрация).
+        user_id задается, когда id выбран заранее (ShardedUserRepository).
+        """
+        now = datetime.utcnow()
+        return await self._insert_user(
+            {
+                "id": user_id or new_user_id(),
+                "email": normalize_email(email),
+                "full_name": full_name,
+                "picture": None,
+                "google_id": None,
+                "hashed_password": hashed_password,
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+
+    async def upsert_google_user(self, user: UserCreate) -> UserRecord:
+        """Вход через Google одним INSERT ... ON CONFLICT (google_id) DO UPDATE"""
+        dialect_insert = UPSERT_DIALECTS.get(self._dialect.name)
+        if dialect_insert is None:
+            return await self._upsert_google_user_fallback(user)
+
+        now = datetime.utcnow()
+        stmt = dialect_insert(users).values(
+            id=new_user_id(),
+            email=normalize_email(user.email),
             full_name=user.full_name,
             picture=user.picture,
             google_id=user.google_id,
@@ -70,137 +263,131 @@ class SQLAlchemyUserRepository(UserRepositoryInterface):
             created_at=now,
             updated_at=now,
         )
-
-        self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
-
-        return UserInDB(
-            id=db_user.id,
-            email=db_user.email,
-            full_name=db_user.full_name,
-            picture=db_user.picture,
-            google_id=db_user.google_id,
-            hashed_password=db_user.hashed_password,
-            is_active=db_user.is_active,
-            created_at=db_user.created_at,
-            updated_at=db_user.updated_at,
+        # Пустые значения от Google не затирают сохраненные
+        full_name = func.coalesce(
+            func.nullif(stmt.excluded.full_name, ""), users.c.full_name
         )
+        picture = func.coalesce(func.nullif(stmt.excluded.picture, ""), users.c.picture)
+        changed = full_name.is_distinct_from(
+            users.c.full_name
+        ) | picture.is_distinct_from(users.c.picture)
 
-    async def create_user_with_password(
-        self, email: str, hashed_password: str, full_name: Optional[str] = None
-    ) -> UserInDB:
-        """Создать пользователя с паролем (обычная регистрация)"""
-        user_id = str(uuid.uuid4())
-        now = datetime.utcnow()
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[users.c.google_id],
+            set_={
+                "full_name": full_name,
+                "picture": picture,
+                "updated_at": case((changed, now), else_=users.c.updated_at),
+            },
+        ).returning(*USER_COLUMNS)
 
-        db_user = UserModel(
-            id=user_id,
-            email=email,
-            full_name=full_name,
-            picture=None,
-            google_id=None,
-            hashed_password=hashed_password,
-            is_active=True,
-            created_at=now,
-            updated_at=now,
-        )
+        try:
+            row = (await self.db.execute(stmt)).one()
+            await self.db.commit()
+        except IntegrityError as e:
+            # google_id новый, но email уже занят другим аккаунтом
+            await self.db.rollback()
+            raise UserAlreadyExistsError() from e
 
-        self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
-
-        return UserInDB(
-            id=db_user.id,
-            email=db_user.email,
-            full_name=db_user.full_name,
-            picture=db_user.picture,
-            google_id=db_user.google_id,
-            hashed_password=db_user.hashed_password,
-            is_active=db_user.is_active,
-            created_at=db_user.created_at,
-            updated_at=db_user.updated_at,
-        )
+        return self._written(_row_to_user(row))
 
-    async def get_user_by_id(self, user_id: str) -> Optional[UserInDB]:
-        """Получить пользователя по ID"""
-        db_user = self.db.query(UserModel).filter(UserModel.id == user_id).first()
-        if not db_user:
-            return None
+    async def _upsert_google_user_fallback(self, user: UserCreate) -> UserRecord:
+        """Для диалектов без ON CONFLICT: поиск, затем вставка или обновление"""
+        existing = await self.get_user_by_google_id(user.google_id)
+        if existing is None:
+            return await self.create_user(user)
+
+        update_data = {}
+        if user.full_name and existing.full_name != user.full_name:
+            update_data["full_name"] = user.full_name
+        if user.picture and existing.picture != user.picture:
+            update_data["picture"] = user.picture
+        if not update_data:
+            return existing
+        return await self.update_user(existing.id, update_data)
 
-        return UserInDB(
-            id=db_user.id,
-            email=db_user.email,
-            full_name=db_user.full_name,
-            picture=db_user.picture,
-            google_id=db_user.google_id,
-            hashed_password=db_user.hashed_password,
-            is_active=db_user.is_active,
-            created_at=db_user.created_at,
-            updated_at=db_user.updated_at,
+    async def _select_user(
+        self, condition, key, min_updated_at: Optional[datetime] = None
+    ) -> Optional[UserRecord]:
+        """
+        Core SELECT без ORM: строка сразу превращается в UserRecord.
+        Если известна версия пользователя (min_updated_at из токена), промах
+        или более старая строка на реплике перепроверяются на primary:
+        запись сделал другой воркер. Промах без версии (вход с неизвестным
+        email, проверка при регистрации) принимается: он не нагружает primary.
+        """
+        rows = await self._read(
+            select(*USER_COLUMNS).where(condition).limit(1),
+            key,
+            accept=lambda rows: not is_stale(
+                _row_to_user(rows[0]) if rows else None, min_updated_at
+            ),
         )
+        return _row_to_user(rows[0]) if rows else None
 
-    async def get_user_by_email(self, email: str) -> Optional[UserInDB]:
-        """Получить пользователя по email"""
-        db_user = self.db.query(UserModel).filter(UserModel.email == email).first()
-        if not db_user:
-            return None
+    async def get_user_by_id(
+        self, user_id: str, min_updated_at: Optional[datetime] = None
+    ) -> Optional[UserRecord]:
+        """Получить пользователя по ID"""
+        return await self._select_user(
+            users.c.id == user_id, ("id", user_id), min_updated_at
+        )
 
-        return UserInDB(
-            id=db_user.id,
-            email=db_user.email,
-            full_name=db_user.full_name,
-            picture=db_user.picture,
-            google_id=db_user.google_id,
-            hashed_password=db_user.hashed_password,
-            is_active=db_user.is_active,
-            created_at=db_user.created_at,
-            updated_at=db_user.updated_at,
+    async def get_user_by_email(self, email: str) -> Optional[UserRecord]:
+        """Получить пользователя по email без учета регистра (ix_users_email_lower)"""
+        email = normalize_email(email)
+        return await self._select_user(
+            func.lower(users.c.email) == email, ("email", email)
         )
 
-    async def get_user_by_google_id(self, google_id: str) -> Optional[UserInDB]:
+    async def get_user_by_google_id(self, google_id: str) -> Optional[UserRecord]:
         """Получить пользователя по Google ID"""
-        db_user = (
-            self.db.query(UserModel).filter(UserModel.google_id == google_id).first()
+        return await self._select_user(
+            users.c.google_id == google_id, ("google_id", google_id)
         )
-        if not db_user:
-            return None
 
-        return UserInDB(
-            id=db_user.id,
-            email=db_user.email,
-            full_name=db_user.full_name,
-            picture=db_user.picture,
-            google_id=db_user.google_id,
-            hashed_password=db_user.hashed_password,
-            is_active=db_user.is_active,
-            created_at=db_user.created_at,
-            updated_at=db_user.updated_at,
-        )
+    async def list_users(
+        self,
+        limit: int,
+        after: Optional[UserCursor] = None,
+        is_active: Optional[bool] = None,
+        auth_method: Optional[AuthMethod] = None,
+    ) -> List[UserRecord]:
+        """Страница пользователей по индексу ix_users_created_at_id"""
+        query = select(*USER_COLUMNS)
+        if after is not None:
+            query = query.where(tuple_(users.c.created_at, users.c.id) > tuple_(*after))
+        if is_active is not None:
+            query = query.where(users.c.is_active == is_active)
+        if auth_method == "google":
+            query = query.where(users.c.google_id.is_not(None))
+        elif auth_method == "password":
+            query = query.where(users.c.hashed_password.is_not(None))
 
-    async def update_user(self, user_id: str, user_data: Dict) -> Optional[UserInDB]:
-        """Обновить данные пользователя"""
-        db_user = self.db.query(UserModel).filter(UserModel.id == user_id).first()
-        if not db_user:
-            return None
+        query = query.order_by(users.c.created_at, users.c.id).limit(limit)
+        return [_row_to_user(row) for row in await self._read(query)]
 
-        # Обновляем поля
-        for key, value in user_data.items():
-            if hasattr(db_user, key) and key not in ["id", "google_id", "created_at"]:
-                setattr(db_user, key, value)
-
-        db_user.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(db_user)
-
-        return UserInDB(
-            id=db_user.id,
-            email=db_user.email,
-            full_name=db_user.full_name,
-            picture=db_user.picture,
-            google_id=db_user.google_id,
-            hashed_password=db_user.hashed_password,
-            is_active=db_user.is_active,
-            created_at=db_user.created_at,
-            updated_at=db_user.updated_at,
-        )
+    async def update_user(self, user_id: str, user_data: Dict) -> Optional[UserRecord]:
+        """Обновить данные пользователя (UPDATE ... RETURNING)"""
+        values = {
+            key: value
+            for key, value in user_data.items()
+            if key in users.c and key not in IMMUTABLE_FIELDS
+        }
+        values["updated_at"] = datetime.utcnow()
+        stmt = update(users).where(users.c.id == user_id).values(**values)
+
+        if self._dialect.update_returning:
+            row = (await self.db.execute(stmt.returning(*USER_COLUMNS))).one_or_none()
+            await self.db.commit()
+            return self._written(_row_to_user(row)) if row is not None else None
+
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        if result.rowcount == 0:
+            return None
+        # Перечитываем с primary: реплика может еще не видеть запись
+        row = (
+            await self.db.execute(select(*USER_COLUMNS).where(users.c.id == user_id))
+        ).one_or_none()
+        return self._written(_row_to_user(row)) if row is not None else None
@@ -0,0 +1,102 @@
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from src.database import SessionLocal
+from src.dependencies.auth import (
+    bind_request_session,
+    build_user_repository,
+    get_user_repository,
+)
+from src.dependencies.internal import require_internal_api_key
+from src.models.user import UserPage
+from src.repositories.user_repository import (
+    AuthMethod,
+    UserCursor,
+    UserRepositoryInterface,
+)
+from src.utils.pagination import decode_cursor, encode_cursor
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_internal_api_key), Depends(bind_request_session)],
+)
+
+# Размер страницы, которыми читается таблица при NDJSON выгрузке
+EXPORT_PAGE_SIZE = 1000
+
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[UserCursor]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+@router.get("/users", response_model=UserPage)
+async def list_users(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    auth_method: Optional[AuthMethod] = None,
+    user_repository: UserRepositoryInterface = Depends(get_user_repository),
+):
+    """
+    Список пользователей для операторов (keyset пагинация по created_at, id).
+    Следующая страница запрашивается с cursor=next_cursor.
+    """
+    users = await user_repository.list_users(
+        limit, _parse_cursor(cursor), is_active, auth_method
+    )
+
+    next_cursor = None
+    if len(users) == limit:
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
+
+    return UserPage(
+        items=[user.to_admin_user() for user in users], next_cursor=next_cursor
+    )
+
+
+@router.get("/users.ndjson")
+async def export_users(
+    request: Request,
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    auth_method: Optional[AuthMethod] = None,
+):
+    """
+    Потоковая выгрузка пользователей в NDJSON (по строке JSON на пользователя).
+    Таблица читается страницами по ключу, память не зависит от ее размера.
+    """
+    after = _parse_cursor(cursor)
+    state = request.app.state
+
+    async def generate() -> AsyncIterator[bytes]:
+        # Собственная сессия: зависимости с yield закрываются до начала потока
+        async with SessionLocal() as db:
+            repository = build_user_repository(
+                db, state.replica_router, state.user_shards
+            )
+            position = after
+            while True:
+                users = await repository.list_users(
+                    EXPORT_PAGE_SIZE, position, is_active, auth_method
+                )
+                if not users:
+                    break
+                yield b"".join(
+                    user.to_admin_user().model_dump_json().encode() + b"\n"
+                    for user in users
+                )
+                if len(users) < EXPORT_PAGE_SIZE:
+                    break
+                position = (users[-1].created_at, users[-1].id)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -1,14 +1,37 @@
+from typing import Optional
+
 import httpx
 from authlib.integrations.starlette_client import OAuth
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Cookie, Depends, HTTPException, Response, status
 from fastapi.responses import RedirectResponse
+from fastapi.security import HTTPAuthorizationCredentials
 
 from src.config import get_settings
-from src.dependencies.auth import get_auth_service, get_current_user
-from src.models.user import Token, User, UserInDB, UserLogin, UserRegister
+from src.dependencies.auth import (
+    bind_request_session,
+    get_auth_rate_limiter,
+    get_auth_service,
+    get_client_ip,
+    get_current_user_claims,
+    get_http_client,
+    security,
+)
+from src.models.user import (
+    LogoutRequest,
+    RefreshTokenRequest,
+    Token,
+    User,
+    UserLogin,
+    UserRegister,
+)
 from src.services.auth_service import AuthService
+from src.utils.rate_limit import AuthRateLimiter
 
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(
+    prefix="/auth",
+    tags=["authentication"],
+    dependencies=[Depends(bind_request_session)],
+)
 
 # Настройка OAuth
 settings = get_settings()
@@ -21,6 +44,23 @@ oauth.register(
     client_kwargs={"scope": "openid email profile"},
 )
 
+# Refresh токен входа через Google не передается в URL (логи, история,
+# Referer): он приходит в cookie, которую браузер шлет только на /auth/refresh
+REFRESH_COOKIE = "refresh_token"
+REFRESH_COOKIE_PATH = "/auth/refresh"
+
+
+def set_refresh_cookie(response: Response, refresh_token: str) -> None:
+    response.set_cookie(
+        REFRESH_COOKIE,
+        refresh_token,
+        max_age=settings.refresh_token_expire_days * 24 * 3600,
+        path=REFRESH_COOKIE_PATH,
+        secure=True,
+        httponly=True,
+        samesite="strict",
+    )
+
 
 @router.get("/google/login")
 async def google_login():
@@ -41,7 +81,10 @@ async def google_login():
 
 @router.get("/google/callback")
 async def google_callback(
-    code: str, auth_service: AuthService = Depends(get_auth_service)
+    code: str,
+    auth_service: AuthService = Depends(get_auth_service),
+    client_ip: str = Depends(get_client_ip),
+    client: httpx.AsyncClient = Depends(get_http_client),
 ):
     """
     Обработка callback от Google после успешной авторизации.
@@ -49,31 +92,30 @@ async def google_callback(
     """
     try:
         # Обмен кода на токены
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                "https://oauth2.googleapis.com/token",
-                data={
-                    "code": code,
-                    "client_id": settings.google_client_id,
-                    "client_secret": settings.google_client_secret,
-                    "redirect_uri": settings.google_redirect_uri,
-                    "grant_type": "authorization_code",
-                },
-            )
-            token_data = token_response.json()
-
-            if "error" in token_data:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=token_data.get("error_description", "Failed to get token"),
-                )
-
-            # Получение информации о пользователе
-            user_response = await client.get(
-                "https://www.googleapis.com/oauth2/v2/userinfo",
-                headers={"Authorization": f"Bearer {token_data['access_token']}"},
+        token_response = await client.post(
+            "https://oauth2.googleapis.com/token",
+            data={
+                "code": code,
+                "client_id": settings.google_client_id,
+                "client_secret": settings.google_client_secret,
+                "redirect_uri": settings.google_redirect_uri,
+                "grant_type": "authorization_code",
+            },
+        )
+        token_data = token_response.json()
+
+        if "error" in token_data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=token_data.get("error_description", "Failed to get token"),
             )
-            user_info = user_response.json()
+
+        # Получение информации о пользователе
+        user_response = await client.get(
+            "https://www.googleapis.com/oauth2/v2/userinfo",
+            headers={"Authorization": f"Bearer {token_data['access_token']}"},
+        )
+        user_info = user_response.json()
 
         # Аутентификация/создание пользователя
         user, token = await auth_service.authenticate_with_google(
@@ -81,11 +123,15 @@ async def google_callback(
             email=user_info["email"],
             full_name=user_info.get("name"),
             picture=user_info.get("picture"),
+            ip_address=client_ip,
         )
 
-        # Перенаправление на frontend с токеном
+        # Перенаправление на frontend с токеном доступа; refresh токен - в cookie
         frontend_url = settings.frontend_url
-        return RedirectResponse(url=f"{frontend_url}/?token={token.access_token}")
+        response = RedirectResponse(url=f"{frontend_url}/?token={token.access_token}")
+        if token.refresh_token:
+            set_refresh_cookie(response, token.refresh_token)
+        return response
 
     except Exception as e:
         raise HTTPException(
@@ -95,42 +141,57 @@ async def google_callback(
 
 
 @router.get("/me", response_model=User)
-async def get_me(current_user: UserInDB = Depends(get_current_user)):
+async def get_me(current_user: User = Depends(get_current_user_claims)):
     """
     Получить информацию о текущем авторизованном пользователе.
     Требует Bearer токен в заголовке Authorization.
+    Профиль берется из claims токена, БД - только для устаревших токенов.
     """
-    return User(
-        id=current_user.id,
-        email=current_user.email,
-        full_name=current_user.full_name,
-        picture=current_user.picture,
-        is_active=current_user.is_active,
-    )
+    return current_user
 
 
 @router.post("/logout")
-async def logout(current_user: UserInDB = Depends(get_current_user)):
+async def logout(
+    logout_data: Optional[LogoutRequest] = Body(None),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    auth_service: AuthService = Depends(get_auth_service),
+):
     """
-    Выход из системы (в данной реализации просто подтверждение).
-    Клиент должен удалить токен на своей стороне.
+    Выход из системы: токен доступа отзывается до истечения срока,
+    переданный refresh токен - вместе со всей цепочкой ротации.
     """
+    if not await auth_service.revoke_access_token(credentials.credentials):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if logout_data is not None and logout_data.refresh_token:
+        await auth_service.revoke_refresh_token(logout_data.refresh_token)
+
     return {"message": "Successfully logged out"}
 
 
 @router.post("/register", response_model=Token)
 async def register(
-    user_data: UserRegister, auth_service: AuthService = Depends(get_auth_service)
+    user_data: UserRegister,
+    auth_service: AuthService = Depends(get_auth_service),
+    rate_limiter: AuthRateLimiter = Depends(get_auth_rate_limiter),
+    client_ip: str = Depends(get_client_ip),
 ):
     """
     Регистрация нового пользователя с email и паролем.
     Возвращает JWT токен для последующей аутентификации.
     """
+    await rate_limiter.check_register(client_ip, user_data.email)
+
     try:
         user, token = await auth_service.register_user(
             email=user_data.email,
             password=user_data.password,
             full_name=user_data.full_name,
+            ip_address=client_ip,
         )
         return token
     except ValueError as e:
@@ -139,14 +200,19 @@ async def register(
 
 @router.post("/login", response_model=Token)
 async def login(
-    user_data: UserLogin, auth_service: AuthService = Depends(get_auth_service)
+    user_data: UserLogin,
+    auth_service: AuthService = Depends(get_auth_service),
+    rate_limiter: AuthRateLimiter = Depends(get_auth_rate_limiter),
+    client_ip: str = Depends(get_client_ip),
 ):
     """
     Вход пользователя с email и паролем.
     Возвращает JWT токен.
     """
+    await rate_limiter.check_login(client_ip, user_data.email)
+
     result = await auth_service.authenticate_user(
-        email=user_data.email, password=user_data.password
+        email=user_data.email, password=user_data.password, ip_address=client_ip
     )
 
     if result is None:
@@ -157,3 +223,50 @@ async def login(
 
     user, token = result
     return token
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    response: Response,
+    request_data: Optional[RefreshTokenRequest] = Body(None),
+    refresh_cookie: Optional[str] = Cookie(None, alias=REFRESH_COOKIE),
+    auth_service: AuthService = Depends(get_auth_service),
+):
+    """
+    Обновление токена доступа по refresh токену.
+    Refresh токен одноразовый: в ответе выдается новый. Токен из cookie
+    (вход через Google) заменяется новым в cookie, а не в теле ответа.
+    """
+    from_cookie = request_data is None
+    refresh_token = refresh_cookie if from_cookie else request_data.refresh_token
+    result = await auth_service.refresh_tokens(refresh_token) if refresh_token else None
+
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+
+    user, token = result
+    if from_cookie:
+        set_refresh_cookie(response, token.refresh_token)
+        token = token.model_copy(update={"refresh_token": None})
+    return token
+
+
+@router.delete("/refresh", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_refresh_cookie(
+    response: Response,
+    refresh_cookie: Optional[str] = Cookie(None, alias=REFRESH_COOKIE),
+    auth_service: AuthService = Depends(get_auth_service),
+):
+    """Выход для входа через Google: отозвать refresh токен из cookie и удалить ее"""
+    if refresh_cookie:
+        await auth_service.revoke_refresh_token(refresh_cookie)
+    response.delete_cookie(
+        REFRESH_COOKIE,
+        path=REFRESH_COOKIE_PATH,
+        secure=True,
+        httponly=True,
+        samesite="strict",
+    )
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, Request
+
+from src.database import engine, pool_stats
+from src.dependencies.internal import require_internal_api_key
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    dependencies=[Depends(require_internal_api_key)],
+    include_in_schema=False,
+)
+
+
+@router.get("/db/pool")
+async def db_pool():
+    """
+    Состояние пула соединений этого воркера: занятые соединения, overflow,
+    время ожидания checkout, таймауты и инвалидации.
+    """
+    return pool_stats.snapshot(engine.sync_engine.pool)
+
+
+@router.get("/db/replicas")
+async def db_replicas(request: Request):
+    """Реплики для чтения: в ротации ли, отставание, число исключений"""
+    replica_router = request.app.state.replica_router
+    if replica_router is None:
+        return {"replica_reads": 0, "primary_reads": 0, "replicas": []}
+    return replica_router.stats()
+
+
+@router.get("/users/lookups")
+async def user_lookups(request: Request):
+    """Кэш пользователей и объединение одновременных поисков в один запрос"""
+    return {
+        "cache": request.app.state.user_cache.stats(),
+        "single_flight": request.app.state.user_lookups.stats(),
+    }
+
+
+@router.get("/login-events")
+async def login_events(request: Request):
+    """Очередь журнала входов: ожидают записи, записано, отброшено, ошибки"""
+    return request.app.state.login_events.stats()
@@ -0,0 +1,31 @@
+import hashlib
+import json
+
+from fastapi import APIRouter, Depends, Request, Response, status
+
+from src.config import get_settings
+from src.dependencies.auth import get_token_codec
+from src.services.token_codec import JWTCodec
+
+router = APIRouter(tags=["authentication"])
+
+
+@router.get("/.well-known/jwks.json")
+async def jwks(request: Request, token_codec: JWTCodec = Depends(get_token_codec)):
+    """
+    Публичные ключи подписи токенов (JWKS).
+    Другие сервисы проверяют токены локально, не обращаясь к /auth/me.
+    """
+    body = json.dumps(
+        {"keys": token_codec.key_ring.public_jwks}, separators=(",", ":")
+    ).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {
+        "Cache-Control": f"public, max-age={get_settings().jwks_cache_max_age_seconds}",
+        "ETag": etag,
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,11 +1,21 @@
-from datetime import datetime, timedelta
+import hashlib
+import hmac
+import secrets
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from jose import JWTError, jwt
-
-from src.models.user import Token, TokenData, UserInDB
+from src.models.user import Token, TokenData, User, UserCreate, UserRecord
+from src.repositories.refresh_token_repository import RefreshTokenRepositoryInterface
+from src.repositories.revoked_token_repository import RevokedTokenRepositoryInterface
 from src.repositories.user_repository import UserRepositoryInterface
-from src.utils import hash_password, verify_password
+from src.services.login_events import LoginEventRecorder
+from src.services.token_cache import VerifiedTokenCache
+from src.services.token_codec import JWTCodec, TokenError
+from src.services.token_revocation import TokenRevocationList
+from src.services.user_versions import UserVersionStore
+from src.utils.hashing import PasswordHashingExecutor
 
 
 class AuthService:
@@ -14,113 +24,343 @@ class AuthService:
     def __init__(
         self,
         user_repository: UserRepositoryInterface,
-        secret_key: str,
-        algorithm: str,
+        token_codec: JWTCodec,
         access_token_expire_minutes: int,
+        password_hasher: PasswordHashingExecutor,
+        token_cache: Optional[VerifiedTokenCache] = None,
+        claims_max_age_seconds: int = 300,
+        user_versions: Optional[UserVersionStore] = None,
+        refresh_token_repository: Optional[RefreshTokenRepositoryInterface] = None,
+        refresh_token_secret: str = "",
+        refresh_token_expire_days: int = 30,
+        revocation_list: Optional[TokenRevocationList] = None,
+        revoked_token_repository: Optional[RevokedTokenRepositoryInterface] = None,
+        login_events: Optional[LoginEventRecorder] = None,
     ):
         self.user_repository = user_repository
-        self.secret_key = secret_key
-        self.algorithm = algorithm
+        self.token_codec = token_codec
         self.access_token_expire_minutes = access_token_expire_minutes
+        self.password_hasher = password_hasher
+        self.token_cache = token_cache
+        self.claims_max_age_seconds = claims_max_age_seconds
+        # Последние версии пользователей после записи (общие или воркера)
+        self.user_versions = user_versions
+        self.refresh_token_repository = refresh_token_repository
+        self._refresh_token_key = refresh_token_secret.encode()
+        self.refresh_token_expire_days = refresh_token_expire_days
+        self.revocation_list = revocation_list
+        self.revoked_token_repository = revoked_token_repository
+        self.login_events = login_events
+
+    @staticmethod
+    def user_version(user: UserRecord) -> int:
+        """Метка версии пользователя: updated_at в миллисекундах"""
+        updated_at = user.updated_at.replace(tzinfo=timezone.utc)
+        return int(updated_at.timestamp() * 1000)
+
+    @staticmethod
+    def version_updated_at(version: Optional[int]) -> Optional[datetime]:
+        """
+        Нижняя граница updated_at для метки версии из токена: чтение с
+        реплики, которая еще не видит эту версию, повторяется на primary
+        """
+        if version is None:
+            return None
+        return datetime.utcfromtimestamp(version / 1000)
+
+    def _record_login(
+        self, user: UserRecord, method: str, ip_address: Optional[str]
+    ) -> None:
+        """Событие входа в журнал; пишется в БД в фоне пачками"""
+        if self.login_events is not None:
+            self.login_events.record(user.id, method, ip_address)
+
+    async def _remember_version(self, user: UserRecord) -> None:
+        """Записать новую версию пользователя после записи в БД"""
+        if self.user_versions is not None:
+            await self.user_versions.record(user.id, self.user_version(user))
 
-    def create_access_token(self, user: UserInDB) -> Token:
+    def create_access_token(self, user: UserRecord) -> Token:
         """Создать JWT токен доступа для пользователя"""
-        expires_delta = timedelta(minutes=self.access_token_expire_minutes)
-        expire = datetime.utcnow() + expires_delta
+        now = int(time.time())
+        claims = {
+            "sub": user.id,
+            "em": user.email,
+            "act": user.is_active,
+            "ver": self.user_version(user),
+            "jti": secrets.token_urlsafe(12),
+            "iat": now,
+            "exp": now + self.access_token_expire_minutes * 60,
+        }
+        if user.full_name is not None:
+            claims["name"] = user.full_name
+        if user.picture is not None:
+            claims["pic"] = user.picture
+        return Token(access_token=self.token_codec.encode(claims))
 
-        to_encode = {"user_id": user.id, "email": user.email, "exp": expire}
+    def _hash_refresh_token(self, refresh_token: str) -> str:
+        """HMAC от refresh токена: в БД хранится только он"""
+        return hmac.new(
+            self._refresh_token_key, refresh_token.encode(), hashlib.sha256
+        ).hexdigest()
+
+    async def issue_tokens(
+        self, user: UserRecord, family_id: Optional[str] = None
+    ) -> Token:
+        """Выдать токен доступа и (если включено) refresh токен"""
+        token = self.create_access_token(user)
+        if self.refresh_token_repository is None:
+            return token
 
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
-        return Token(access_token=encoded_jwt)
+        refresh_token = secrets.token_urlsafe(32)
+        await self.refresh_token_repository.create_token(
+            user_id=user.id,
+            family_id=family_id or str(uuid.uuid4()),
+            token_hash=self._hash_refresh_token(refresh_token),
+            expires_at=datetime.utcnow()
+            + timedelta(days=self.refresh_token_expire_days),
+        )
+        return Token(access_token=token.access_token, refresh_token=refresh_token)
+
+    async def refresh_tokens(
+        self, refresh_token: str
+    ) -> Optional[tuple[UserRecord, Token]]:
+        """
+        Обменять refresh токен на новую пару токенов (ротация).
+        Повторное предъявление уже использованного токена отзывает всю цепочку.
+        """
+        if self.refresh_token_repository is None:
+            return None
+
+        stored = await self.refresh_token_repository.get_token_by_hash(
+            self._hash_refresh_token(refresh_token)
+        )
+        if stored is None or stored.revoked_at is not None:
+            return None
+        if stored.expires_at <= datetime.utcnow():
+            return None
+
+        if stored.rotated_at is not None or not (
+            await self.refresh_token_repository.mark_rotated(stored.id)
+        ):
+            # Токен уже обменивали: вероятно, он украден - отзываем всю цепочку
+            await self.refresh_token_repository.revoke_family(stored.family_id)
+            return None
+
+        user = await self.user_repository.get_user_by_id(stored.user_id)
+        if user is None or not user.is_active:
+            return None
+
+        token = await self.issue_tokens(user, family_id=stored.family_id)
+        return user, token
 
     async def verify_token(self, token: str) -> Optional[TokenData]:
         """Проверить и декодировать JWT токен"""
+        if self.token_cache is not None:
+            cached = self.token_cache.get(token)
+            if cached is not None:
+                return None if await self._is_revoked(cached) else cached
+
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            user_id: str = payload.get("user_id")
-            email: str = payload.get("email")
+            payload = self.token_codec.decode(token)
+        except TokenError:
+            return None
+
+        # user_id/email - имена claims в токенах, выпущенных до компактного формата
+        user_id = payload.get("sub", payload.get("user_id"))
+        email = payload.get("em", payload.get("email"))
+        if not isinstance(user_id, str):
+            return None
 
-            if user_id is None:
-                return None
+        token_data = TokenData(
+            user_id=user_id,
+            email=email,
+            full_name=payload.get("name"),
+            picture=payload.get("pic"),
+            is_active=payload.get("act"),
+            version=payload.get("ver"),
+            issued_at=payload.get("iat"),
+            jti=payload.get("jti"),
+            expires_at=payload.get("exp"),
+        )
 
-            return TokenData(user_id=user_id, email=email)
-        except JWTError:
+        if await self._is_revoked(token_data):
             return None
 
-    async def get_current_user(self, token: str) -> Optional[UserInDB]:
+        # Токены без exp не кэшируем: их срок жизни неизвестен
+        if self.token_cache is not None and "exp" in payload:
+            self.token_cache.put(token, token_data, payload["exp"])
+
+        return token_data
+
+    async def _is_revoked(self, token_data: TokenData) -> bool:
+        """
+        Проверка отзыва: фильтр в памяти, в БД - только при срабатывании фильтра
+        """
+        if self.revocation_list is None or token_data.jti is None:
+            return False
+        if not self.revocation_list.might_be_revoked(token_data.jti):
+            return False
+        if self.revoked_token_repository is None:
+            return True
+        return await self.revoked_token_repository.is_revoked(token_data.jti)
+
+    async def revoke_access_token(self, token: str) -> bool:
+        """
+        Отозвать токен доступа до истечения его срока (logout).
+        Возвращает False, если токен невалиден; токены без jti
+        (выпущенные до появления отзыва) доживают до exp.
+        """
+        token_data = await self.verify_token(token)
+        if token_data is None:
+            return False
+        if (
+            token_data.jti is None
+            or self.revocation_list is None
+            or self.revoked_token_repository is None
+        ):
+            return True
+
+        expires_at = token_data.expires_at or int(time.time()) + (
+            self.access_token_expire_minutes * 60
+        )
+        await self.revoked_token_repository.revoke(
+            token_data.jti, datetime.utcfromtimestamp(expires_at)
+        )
+        self.revocation_list.add(token_data.jti)
+        if self.token_cache is not None:
+            self.token_cache.invalidate(token)
+        return True
+
+    async def revoke_refresh_token(self, refresh_token: str) -> None:
+        """Отозвать цепочку refresh токенов сессии"""
+        if self.refresh_token_repository is None:
+            return
+
+        stored = await self.refresh_token_repository.get_token_by_hash(
+            self._hash_refresh_token(refresh_token)
+        )
+        if stored is not None:
+            await self.refresh_token_repository.revoke_family(stored.family_id)
+
+    async def get_current_user(self, token: str) -> Optional[UserRecord]:
         """Получить текущего пользователя по токену"""
         token_data = await self.verify_token(token)
         if token_data is None or token_data.user_id is None:
             return None
 
-        user = await self.user_repository.get_user_by_id(token_data.user_id)
+        user = await self.user_repository.get_user_by_id(
+            token_data.user_id, self.version_updated_at(token_data.version)
+        )
         return user
 
+    async def _claims_are_fresh(self, token_data: TokenData) -> bool:
+        """
+        Профиль в токене свежий, если после его выпуска пользователь
+        не менялся: метка ver не старше версии из хранилища версий.
+        Хранилище в памяти не знает об изменениях других воркеров, поэтому
+        без общего хранилища claims дополнительно ограничены по возрасту.
+        """
+        if (
+            token_data.version is None
+            or token_data.issued_at is None
+            or token_data.is_active is None
+        ):
+            return False
+
+        shared = self.user_versions is not None and self.user_versions.shared
+        if (
+            not shared
+            and time.time() - token_data.issued_at > self.claims_max_age_seconds
+        ):
+            return False
+
+        if self.user_versions is not None:
+            known_version = await self.user_versions.get(token_data.user_id)
+            if known_version is not None and known_version > token_data.version:
+                return False
+
+        return True
+
+    async def get_current_user_from_claims(
+        self, token: str, require_fresh: bool = False
+    ) -> Optional[User]:
+        """
+        Получить текущего пользователя из claims токена.
+        В БД идем, только если метка версии устарела или require_fresh=True.
+        """
+        token_data = await self.verify_token(token)
+        if token_data is None:
+            return None
+
+        if not require_fresh and await self._claims_are_fresh(token_data):
+            return User(
+                id=token_data.user_id,
+                email=token_data.email,
+                full_name=token_data.full_name,
+                picture=token_data.picture,
+                is_active=token_data.is_active,
+            )
+
+        user = await self.user_repository.get_user_by_id(
+            token_data.user_id, self.version_updated_at(token_data.version)
+        )
+        return user.to_user() if user is not None else None
+
     async def authenticate_with_google(
         self,
         google_id: str,
         email: str,
         full_name: Optional[str] = None,
         picture: Optional[str] = None,
-    ) -> tuple[UserInDB, Token]:
+        ip_address: Optional[str] = None,
+    ) -> tuple[UserRecord, Token]:
         """
         Аутентификация через Google OAuth.
-        Если пользователь существует - возвращаем его, иначе создаем нового.
+        Если пользователь существует - обновляем его, иначе создаем нового.
         """
-        # Проверяем, существует ли пользователь
-        user = await self.user_repository.get_user_by_google_id(google_id)
-
-        if user is None:
-            # Создаем нового пользователя
-            from src.models.user import UserCreate
-
-            user_create = UserCreate(
+        # Создаем пользователя или обновляем имя/аватар одним запросом
+        user = await self.user_repository.upsert_google_user(
+            UserCreate(
                 email=email, google_id=google_id, full_name=full_name, picture=picture
             )
-            user = await self.user_repository.create_user(user_create)
-        else:
-            # Обновляем информацию о пользователе
-            update_data = {}
-            if full_name and user.full_name != full_name:
-                update_data["full_name"] = full_name
-            if picture and user.picture != picture:
-                update_data["picture"] = picture
-
-            if update_data:
-                user = await self.user_repository.update_user(user.id, update_data)
-
-        # Создаем токен доступа
-        token = self.create_access_token(user)
+        )
+        # Если профиль изменился, claims в ранее выданных токенах устарели
+        await self._remember_version(user)
+
+        # Создаем токены
+        token = await self.issue_tokens(user)
+        self._record_login(user, "google", ip_address)
 
         return user, token
 
     async def register_user(
-        self, email: str, password: str, full_name: Optional[str] = None
-    ) -> tuple[UserInDB, Token]:
+        self,
+        email: str,
+        password: str,
+        full_name: Optional[str] = None,
+        ip_address: Optional[str] = None,
+    ) -> tuple[UserRecord, Token]:
         """
         Регистрация нового пользователя с email и паролем
         """
-        # Проверяем, не существует ли пользователь с таким email
-        existing_user = await self.user_repository.get_user_by_email(email)
-        if existing_user:
-            raise ValueError("User with this email already exists")
-
         # Хешируем пароль
-        hashed_pwd = hash_password(password)
+        hashed_pwd = await self.password_hasher.hash_password(password)
 
-        # Создаем пользователя
+        # Уникальность email проверяет БД: занятый email - UserAlreadyExistsError
         user = await self.user_repository.create_user_with_password(
             email=email, hashed_password=hashed_pwd, full_name=full_name
         )
 
-        # Создаем токен
-        token = self.create_access_token(user)
+        # Создаем токены
+        token = await self.issue_tokens(user)
+        self._record_login(user, "register", ip_address)
 
         return user, token
 
     async def authenticate_user(
-        self, email: str, password: str
-    ) -> Optional[tuple[UserInDB, Token]]:
+        self, email: str, password: str, ip_address: Optional[str] = None
+    ) -> Optional[tuple[UserRecord, Token]]:
         """
         Аутентификация пользователя по email и паролю
         """
@@ -133,10 +373,23 @@ class AuthService:
         if not user.hashed_password:
             return None
 
-        if not verify_password(password, user.hashed_password):
+        if not await self.password_hasher.verify_password(
+            password, user.hashed_password
+        ):
             return None
 
-        # Создаем токен
-        token = self.create_access_token(user)
+        # Прозрачно обновляем хеш, созданный с устаревшими параметрами argon2
+        if self.password_hasher.needs_rehash(user.hashed_password):
+            new_hash = await self.password_hasher.hash_password(password)
+            updated_user = await self.user_repository.update_user(
+                user.id, {"hashed_password": new_hash}
+            )
+            if updated_user is not None:
+                user = updated_user
+                await self._remember_version(user)
+
+        # Создаем токены
+        token = await self.issue_tokens(user)
+        self._record_login(user, "password", ip_address)
 
         return user, token
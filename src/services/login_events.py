@@ -0,0 +1,96 @@
+"""
+Журнал входов: очередь в памяти и запись пачками в фоне
+"""
+
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncContextManager, Callable, Deque, Dict, List, Optional
+
+from src.models.user import LoginEvent
+from src.repositories.login_event_repository import LoginEventRepositoryInterface
+
+logger = logging.getLogger(__name__)
+
+RepositoryFactory = Callable[[], AsyncContextManager[LoginEventRepositoryInterface]]
+
+
+class LoginEventRecorder:
+    """
+    События входа копятся в ограниченной очереди и пишутся фоновой задачей
+    пачками: когда набралось batch_size событий или прошло flush_interval.
+    На пути входа остается только добавление в очередь - ни одной записи в БД.
+
+    При переполнении очереди (БД недоступна или не успевает) новые события
+    отбрасываются и считаются в dropped: вход важнее журнала. При остановке
+    приложения оставшиеся события дописываются.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1,
+    ):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._events: Deque[LoginEvent] = deque()
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, user_id: str, method: str, ip_address: Optional[str]) -> None:
+        """Поставить событие в очередь (не ждет БД)"""
+        if len(self._events) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._events.append(LoginEvent(user_id, method, ip_address, datetime.utcnow()))
+        self.recorded += 1
+        if len(self._events) >= self.batch_size:
+            self._wakeup.set()
+
+    def _next_batch(self) -> List[LoginEvent]:
+        count = min(self.batch_size, len(self._events))
+        return [self._events.popleft() for _ in range(count)]
+
+    async def flush(self, repository_factory: RepositoryFactory) -> None:
+        """Записать все накопленные события пачками по batch_size"""
+        while self._events:
+            batch = self._next_batch()
+            try:
+                async with repository_factory() as repository:
+                    await repository.write_batch(batch)
+                self.written += len(batch)
+            except Exception:
+                self.failed += len(batch)
+                logger.exception("Failed to write %d login events", len(batch))
+
+    async def run(self, repository_factory: RepositoryFactory) -> None:
+        """Фоновая запись (запускается в lifespan, завершается через close)"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush(repository_factory)
+
+    async def close(self, task: asyncio.Task) -> None:
+        """Остановить фоновую запись, дописав оставшиеся события"""
+        self._closing = True
+        self._wakeup.set()
+        await task
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._events),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
@@ -0,0 +1,184 @@
+"""
+Маршрутизация чтений на реплики БД
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики PostgreSQL в секундах. Если все полученное WAL уже
+# применено, реплика догнала primary (даже если записей давно не было)
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery()"
+    " OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+# Сколько ключей недавних записей помнит процесс
+RECENT_WRITES_SIZE = 100000
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """
+    Ошибка соединения с БД, а не конкретного запроса: только она - повод
+    исключить реплику. Ошибки SQL, данных и таймауты запроса реплику
+    не исключают.
+    """
+    if isinstance(error, OSError):
+        return True
+    return (
+        isinstance(error, (OperationalError, InterfaceError))
+        and error.connection_invalidated
+    )
+
+
+class Replica:
+    """Реплика и ее состояние в ротации"""
+
+    __slots__ = ("name", "engine", "ejected_until", "lag_seconds", "ejections")
+
+    def __init__(self, engine: AsyncEngine):
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.engine = engine
+        self.ejected_until = 0.0
+        self.lag_seconds: Optional[float] = None
+        self.ejections = 0
+
+
+class ReplicaRouter:
+    """
+    Выбор соединения для чтения: реплики по кругу, primary - если реплик
+    в ротации нет или пользователь только что что-то записал.
+
+    Read-your-writes: ключи записанных пользователей (id, email, google_id)
+    помнятся read_your_writes_seconds, и их чтения идут на primary, пока
+    реплика не догонит запись. Это окно действует в пределах процесса;
+    запись другого воркера видна по метке версии из токена: репозиторий
+    перепроверяет на primary промах или строку старше нее (note_stale_read).
+    Упавшая или отставшая больше max_lag_seconds реплика исключается
+    на ejection_seconds; фоновая проверка возвращает ее, когда она догонит.
+    """
+
+    def __init__(
+        self,
+        engines: Sequence[AsyncEngine],
+        read_your_writes_seconds: float = 5,
+        max_lag_seconds: float = 5,
+        ejection_seconds: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.replicas: List[Replica] = [Replica(engine) for engine in engines]
+        self.max_lag_seconds = max_lag_seconds
+        self.ejection_seconds = ejection_seconds
+        self._clock = clock
+        self._recent_writes = TTLCache(
+            maxsize=RECENT_WRITES_SIZE, ttl=read_your_writes_seconds, clock=clock
+        )
+        self._next = 0
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.stale_reads = 0
+
+    def note_write(self, *keys: Optional[Hashable]) -> None:
+        """Запомнить ключи только что записанного пользователя"""
+        for key in keys:
+            if key is not None:
+                self._recent_writes.set(key, True)
+
+    def note_stale_read(self) -> None:
+        """Ответ реплики отброшен как устаревший, чтение повторено на primary"""
+        self.stale_reads += 1
+        self.primary_reads += 1
+
+    def engine_for_read(self, *keys: Optional[Hashable]) -> Optional[AsyncEngine]:
+        """Движок реплики для чтения; None - читать с primary"""
+        if any(key is not None and self._recent_writes.get(key, False) for key in keys):
+            self.primary_reads += 1
+            return None
+
+        now = self._clock()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if replica.ejected_until <= now:
+                self.replica_reads += 1
+                return replica.engine
+
+        self.primary_reads += 1
+        return None
+
+    def eject(self, engine: AsyncEngine, reason: str) -> None:
+        """Исключить реплику из ротации на ejection_seconds"""
+        for replica in self.replicas:
+            if replica.engine is engine:
+                if replica.ejected_until <= self._clock():
+                    logger.warning("Replica %s ejected: %s", replica.name, reason)
+                    replica.ejections += 1
+                replica.ejected_until = self._clock() + self.ejection_seconds
+
+    async def _measure_lag(self, engine: AsyncEngine) -> float:
+        async with engine.connect() as conn:
+            if engine.dialect.name != "postgresql":
+                await conn.execute(text("SELECT 1"))
+                return 0.0
+            return float((await conn.execute(POSTGRES_LAG_QUERY)).scalar_one())
+
+    async def check(self) -> None:
+        """Проверить доступность и отставание всех реплик"""
+        for replica in self.replicas:
+            try:
+                replica.lag_seconds = await self._measure_lag(replica.engine)
+            except Exception as e:
+                replica.lag_seconds = None
+                self.eject(replica.engine, f"health check failed: {e}")
+                continue
+
+            if replica.lag_seconds > self.max_lag_seconds:
+                self.eject(
+                    replica.engine, f"replication lag {replica.lag_seconds:.1f}s"
+                )
+            elif replica.ejected_until > self._clock():
+                logger.info("Replica %s is back in rotation", replica.name)
+                replica.ejected_until = 0.0
+
+    async def run(self, interval: float) -> None:
+        """Фоновая проверка реплик (запускается в lifespan)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Failed to check replicas")
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние реплик для /internal/db/replicas"""
+        now = self._clock()
+        return {
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "stale_reads": self.stale_reads,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "in_rotation": replica.ejected_until <= now,
+                    "lag_seconds": replica.lag_seconds,
+                    "ejections": replica.ejections,
+                }
+                for replica in self.replicas
+            ],
+        }
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
@@ -0,0 +1,60 @@
+"""
+Кэш проверенных JWT токенов
+"""
+
+import hashlib
+import time
+from typing import Any, Dict, Optional
+
+from src.models.user import TokenData
+from src.utils.cache import TTLCache
+
+
+class VerifiedTokenCache:
+    """
+    Кэш результатов проверки токенов.
+
+    Ключ - SHA-256 от токена (сам токен в памяти не хранится), время жизни
+    записи не превышает ни TTL кэша, ни exp токена. Кэшируются только
+    успешно проверенные токены.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 300):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[TokenData]:
+        """Получить результат проверки токена из кэша"""
+        return self._cache.get(self._key(token))
+
+    def put(self, token: str, token_data: TokenData, expires_at: float) -> None:
+        """Сохранить проверенный токен до его exp (unix time)"""
+        self._cache.set(self._key(token), token_data, ttl=expires_at - time.time())
+
+    def invalidate(self, token: str) -> None:
+        """Удалить токен из кэша (например, при отзыве)"""
+        self._cache.pop(self._key(token))
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Удалить все токены пользователя"""
+        for key, token_data in self._cache.items():
+            if token_data.user_id == user_id:
+                self._cache.pop(key)
+
+    def clear(self) -> None:
+        """Сбросить кэш (например, при ротации ключей подписи)"""
+        self._cache.clear()
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
@@ -0,0 +1,327 @@
+"""
+Компактный кодек JWT (HS256/HS512, EdDSA, RS256) с набором ключей по kid
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+
+# Ключ из secret_key: им подписаны токены без kid, выпущенные до появления набора ключей
+DEFAULT_KID = "default"
+
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS512": hashlib.sha512}
+
+
+class TokenError(Exception):
+    """Токен не прошел проверку"""
+
+
+def b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _json_segment(obj: Mapping[str, Any]) -> bytes:
+    return b64url_encode(json.dumps(obj, separators=(",", ":")).encode())
+
+
+class SigningKey:
+    """Ключ подписи с заранее закодированным заголовком JWT"""
+
+    __slots__ = ("kid", "algorithm", "header")
+
+    def __init__(self, kid: str, algorithm: str):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.header = _json_segment({"alg": algorithm, "typ": "JWT", "kid": kid})
+
+    def sign(self, signing_input: bytes) -> bytes:
+        raise NotImplementedError
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        raise NotImplementedError
+
+    @property
+    def can_sign(self) -> bool:
+        return True
+
+    def public_jwk(self) -> Optional[Dict[str, str]]:
+        """Публичная часть ключа в формате JWK (None для симметричных ключей)"""
+        return None
+
+
+class HMACKey(SigningKey):
+    """Симметричный ключ HS256/HS512"""
+
+    __slots__ = ("_secret", "_digest")
+
+    def __init__(self, kid: str, secret: str, algorithm: str = "HS256"):
+        if algorithm not in _HMAC_DIGESTS:
+            raise ValueError(f"Unsupported HMAC algorithm: {algorithm}")
+
+        super().__init__(kid, algorithm)
+        self._secret = secret.encode()
+        self._digest = _HMAC_DIGESTS[algorithm]
+
+    def sign(self, signing_input: bytes) -> bytes:
+        return hmac.new(self._secret, signing_input, self._digest).digest()
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(self.sign(signing_input), signature)
+
+
+class Ed25519Key(SigningKey):
+    """Асимметричный ключ EdDSA (Ed25519)"""
+
+    __slots__ = ("_private_key", "_public_key")
+
+    def __init__(
+        self,
+        kid: str,
+        private_key: Optional[ed25519.Ed25519PrivateKey] = None,
+        public_key: Optional[ed25519.Ed25519PublicKey] = None,
+    ):
+        super().__init__(kid, "EdDSA")
+        self._private_key = private_key
+        self._public_key = public_key or private_key.public_key()
+
+    @property
+    def can_sign(self) -> bool:
+        return self._private_key is not None
+
+    def sign(self, signing_input: bytes) -> bytes:
+        if self._private_key is None:
+            raise ValueError(f"Key '{self.kid}' can only verify signatures")
+        return self._private_key.sign(signing_input)
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        try:
+            self._public_key.verify(signature, signing_input)
+        except InvalidSignature:
+            return False
+        return True
+
+    def public_jwk(self) -> Dict[str, str]:
+        raw = self._public_key.public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        return {
+            "kty": "OKP",
+            "crv": "Ed25519",
+            "x": b64url_encode(raw).decode(),
+            "kid": self.kid,
+            "alg": self.algorithm,
+            "use": "sig",
+        }
+
+
+class RSAKey(SigningKey):
+    """Асимметричный ключ RS256 (RSASSA-PKCS1-v1_5 + SHA-256)"""
+
+    __slots__ = ("_private_key", "_public_key")
+
+    def __init__(
+        self,
+        kid: str,
+        private_key: Optional[rsa.RSAPrivateKey] = None,
+        public_key: Optional[rsa.RSAPublicKey] = None,
+    ):
+        super().__init__(kid, "RS256")
+        self._private_key = private_key
+        self._public_key = public_key or private_key.public_key()
+
+    @property
+    def can_sign(self) -> bool:
+        return self._private_key is not None
+
+    def sign(self, signing_input: bytes) -> bytes:
+        if self._private_key is None:
+            raise ValueError(f"Key '{self.kid}' can only verify signatures")
+        return self._private_key.sign(
+            signing_input, padding.PKCS1v15(), hashes.SHA256()
+        )
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        try:
+            self._public_key.verify(
+                signature, signing_input, padding.PKCS1v15(), hashes.SHA256()
+            )
+        except InvalidSignature:
+            return False
+        return True
+
+    def public_jwk(self) -> Dict[str, str]:
+        numbers = self._public_key.public_numbers()
+
+        def encode_int(value: int) -> str:
+            return b64url_encode(
+                value.to_bytes((value.bit_length() + 7) // 8, "big")
+            ).decode()
+
+        return {
+            "kty": "RSA",
+            "n": encode_int(numbers.n),
+            "e": encode_int(numbers.e),
+            "kid": self.kid,
+            "alg": self.algorithm,
+            "use": "sig",
+        }
+
+
+def load_pem_key(kid: str, pem: bytes) -> SigningKey:
+    """
+    Загрузить асимметричный ключ из PEM.
+    Приватный ключ подписывает и проверяет, публичный - только проверяет.
+    """
+    if b"PRIVATE KEY" in pem:
+        key = serialization.load_pem_private_key(pem, password=None)
+        if isinstance(key, ed25519.Ed25519PrivateKey):
+            return Ed25519Key(kid, private_key=key)
+        if isinstance(key, rsa.RSAPrivateKey):
+            return RSAKey(kid, private_key=key)
+    else:
+        key = serialization.load_pem_public_key(pem)
+        if isinstance(key, ed25519.Ed25519PublicKey):
+            return Ed25519Key(kid, public_key=key)
+        if isinstance(key, rsa.RSAPublicKey):
+            return RSAKey(kid, public_key=key)
+    raise ValueError(f"Unsupported key type for '{kid}': use Ed25519 or RSA")
+
+
+class KeyRing:
+    """
+    Набор ключей подписи.
+
+    Новые токены подписываются активным ключом, проверка выполняется ключом
+    из kid заголовка. Старые ключи остаются в наборе, пока живут выпущенные
+    ими токены, поэтому ротация не разлогинивает пользователей.
+    """
+
+    def __init__(self, keys: Iterable[SigningKey], active_kid: str):
+        self.keys: Dict[str, SigningKey] = {key.kid: key for key in keys}
+        if active_kid not in self.keys:
+            raise ValueError(f"Active key '{active_kid}' is not in the key ring")
+        self.active = self.keys[active_kid]
+        if not self.active.can_sign:
+            raise ValueError(f"Active key '{active_kid}' has no private part")
+
+        # Быстрый путь: заголовки наших токенов совпадают побайтово
+        self._by_header: Dict[bytes, SigningKey] = {
+            key.header: key for key in self.keys.values()
+        }
+        # Токены без kid (выпущенные python-jose) проверяются ключом по умолчанию
+        legacy = self.keys.get(DEFAULT_KID)
+        if legacy is not None:
+            legacy_header = _json_segment({"alg": legacy.algorithm, "typ": "JWT"})
+            self._by_header[legacy_header] = legacy
+
+        # Публикуемые ключи (JWKS): только асимметричные, секреты HMAC не раскрываются
+        self.public_jwks: List[Dict[str, str]] = [
+            jwk for jwk in (key.public_jwk() for key in self.keys.values()) if jwk
+        ]
+
+    def key_for_header(self, header_segment: bytes) -> SigningKey:
+        """Найти ключ проверки по сегменту заголовка"""
+        key = self._by_header.get(header_segment)
+        if key is not None:
+            return key
+
+        try:
+            header = json.loads(b64url_decode(header_segment))
+        except (ValueError, binascii.Error) as e:
+            raise TokenError("Malformed header") from e
+        if not isinstance(header, dict):
+            raise TokenError("Malformed header")
+
+        key = self.keys.get(header.get("kid", DEFAULT_KID))
+        if key is None:
+            raise TokenError("Unknown key id")
+        # Алгоритм из заголовка должен совпадать с алгоритмом ключа (никаких "none")
+        if header.get("alg") != key.algorithm:
+            raise TokenError("Algorithm mismatch")
+        return key
+
+
+def create_key_ring(
+    secret_key: str,
+    algorithm: str = "HS256",
+    keys: Optional[Mapping[str, str]] = None,
+    active_kid: Optional[str] = None,
+    key_files: Optional[Mapping[str, str]] = None,
+) -> KeyRing:
+    """
+    Собрать набор ключей из настроек: secret_key всегда доступен под kid
+    "default", дополнительные HMAC ключи задаются словарем kid -> secret,
+    асимметричные (Ed25519/RSA) - словарем kid -> путь к PEM файлу.
+    """
+    secrets = {DEFAULT_KID: secret_key, **(keys or {})}
+    ring: List[SigningKey] = [
+        HMACKey(kid, secret, algorithm) for kid, secret in secrets.items()
+    ]
+    for kid, path in (key_files or {}).items():
+        with open(path, "rb") as f:
+            ring.append(load_pem_key(kid, f.read()))
+
+    return KeyRing(ring, active_kid or DEFAULT_KID)
+
+
+class JWTCodec:
+    """Кодирование и проверка JWT без универсальной машинерии python-jose"""
+
+    def __init__(self, key_ring: KeyRing):
+        self.key_ring = key_ring
+
+    def encode(self, claims: Mapping[str, Any]) -> str:
+        """Подписать claims активным ключом"""
+        key = self.key_ring.active
+        signing_input = key.header + b"." + _json_segment(claims)
+        signature = b64url_encode(key.sign(signing_input))
+        return (signing_input + b"." + signature).decode("ascii")
+
+    def decode(self, token: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """Проверить подпись и срок действия, вернуть claims"""
+        try:
+            raw = token.encode("ascii")
+        except UnicodeEncodeError as e:
+            raise TokenError("Malformed token") from e
+
+        parts = raw.split(b".")
+        if len(parts) != 3:
+            raise TokenError("Malformed token")
+        header_segment, payload_segment, signature_segment = parts
+
+        key = self.key_ring.key_for_header(header_segment)
+        try:
+            signature = b64url_decode(signature_segment)
+        except (ValueError, binascii.Error) as e:
+            raise TokenError("Malformed signature") from e
+
+        if not key.verify(header_segment + b"." + payload_segment, signature):
+            raise TokenError("Signature verification failed")
+
+        try:
+            claims = json.loads(b64url_decode(payload_segment))
+        except (ValueError, binascii.Error) as e:
+            raise TokenError("Malformed payload") from e
+        if not isinstance(claims, dict):
+            raise TokenError("Malformed payload")
+
+        exp = claims.get("exp")
+        if exp is not None:
+            if not isinstance(exp, (int, float)):
+                raise TokenError("Invalid exp claim")
+            if exp <= (time.time() if now is None else now):
+                raise TokenError("Token has expired")
+
+        return claims
@@ -0,0 +1,98 @@
+"""
+Список отозванных токенов доступа
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import AsyncContextManager, Callable, List, Optional
+
+from src.repositories.revoked_token_repository import RevokedTokenRepositoryInterface
+from src.utils.bloom_filter import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+RepositoryFactory = Callable[[], AsyncContextManager[RevokedTokenRepositoryInterface]]
+
+# Перекрытие инкрементальной синхронизации: записи других воркеров
+# могут прийти с небольшим опозданием относительно revoked_at
+SYNC_OVERLAP = timedelta(seconds=2)
+
+
+class TokenRevocationList:
+    """
+    Фильтр Блума по jti отозванных токенов, копия denylist из БД в памяти.
+
+    Для неотозванных токенов проверка стоит несколько хешей и не трогает БД;
+    точный запрос к denylist выполняется только при срабатывании фильтра.
+    Фильтр периодически догружает отзывы других воркеров и пересобирается,
+    чтобы из него уходили истекшие токены.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._last_seen: Optional[datetime] = None
+        # jti, отозванные локально во время пересборки фильтра
+        self._added_during_rebuild: Optional[List[str]] = None
+        self.filter_hits = 0
+
+    def might_be_revoked(self, jti: str) -> bool:
+        """False - токен точно не отозван; True - нужна точная проверка"""
+        if jti in self._filter:
+            self.filter_hits += 1
+            return True
+        return False
+
+    def add(self, jti: str) -> None:
+        """Добавить отозванный токен в фильтр"""
+        self._filter.add(jti)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.append(jti)
+
+    async def rebuild(self, repository: RevokedTokenRepositoryInterface) -> None:
+        """Пересобрать фильтр из неистекших записей denylist"""
+        self._added_during_rebuild = []
+        try:
+            rows = await repository.list_revoked()
+            new_filter = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+            for jti, _ in rows:
+                new_filter.add(jti)
+            for jti in self._added_during_rebuild:
+                new_filter.add(jti)
+        finally:
+            self._added_during_rebuild = None
+
+        self._filter = new_filter
+        self._last_seen = max((revoked_at for _, revoked_at in rows), default=None)
+
+    async def sync(self, repository: RevokedTokenRepositoryInterface) -> None:
+        """Догрузить токены, отозванные с момента прошлой синхронизации"""
+        since = self._last_seen - SYNC_OVERLAP if self._last_seen else None
+        for jti, revoked_at in await repository.list_revoked(since=since):
+            self._filter.add(jti)
+            if self._last_seen is None or revoked_at > self._last_seen:
+                self._last_seen = revoked_at
+
+    async def run(
+        self,
+        repository_factory: RepositoryFactory,
+        sync_interval: float,
+        rebuild_interval: float,
+    ) -> None:
+        """Фоновая синхронизация с denylist (запускается в lifespan)"""
+        last_rebuild = time.monotonic()
+        while True:
+            await asyncio.sleep(sync_interval)
+            try:
+                async with repository_factory() as repository:
+                    if time.monotonic() - last_rebuild >= rebuild_interval:
+                        await repository.purge_expired()
+                        await self.rebuild(repository)
+                        last_rebuild = time.monotonic()
+                    else:
+                        await self.sync(repository)
+            except Exception:
+                logger.exception("Failed to sync revoked tokens")
@@ -0,0 +1,91 @@
+"""
+Кэш пользователей в памяти процесса
+"""
+
+from typing import Any, Dict, Hashable, List, Optional
+
+from src.models.user import UserRecord
+from src.utils.cache import TTLCache
+
+
+class UserCache:
+    """
+    LRU кэш пользователей по id с вторичными индексами по email и google_id.
+
+    Индексы хранят только id, поэтому поиск по любому ключу попадает в одну
+    и ту же запись, а инвалидация по id делает недоступными все ключи.
+    Изменения, сделанные другими процессами, видны не позже чем через TTL.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 60):
+        self._users = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        # У пользователя до двух вторичных ключей
+        self._index = TTLCache(maxsize=2 * maxsize, ttl=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, user_id: Optional[str]) -> Optional[UserRecord]:
+        user = self._users.get(user_id) if user_id is not None else None
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def _lookup_by(self, field: str, value: str) -> Optional[UserRecord]:
+        user = self._lookup(self._index.get((field, value)))
+        # Индекс мог остаться от старой версии записи (например, до смены email)
+        if user is not None and getattr(user, field) != value:
+            self._index.pop((field, value))
+            self.hits -= 1
+            self.misses += 1
+            return None
+        return user
+
+    def get_by_id(self, user_id: str) -> Optional[UserRecord]:
+        return self._lookup(user_id)
+
+    def get_by_email(self, email: str) -> Optional[UserRecord]:
+        return self._lookup_by("email", email)
+
+    def get_by_google_id(self, google_id: str) -> Optional[UserRecord]:
+        return self._lookup_by("google_id", google_id)
+
+    def _index_keys(self, user: UserRecord) -> List[Hashable]:
+        keys: List[Hashable] = [("email", user.email)]
+        if user.google_id:
+            keys.append(("google_id", user.google_id))
+        return keys
+
+    def put(self, user: UserRecord) -> None:
+        """Сохранить пользователя под id и вторичными ключами"""
+        previous = self._users.pop(user.id)
+        if previous is not None:
+            for key in self._index_keys(previous):
+                self._index.pop(key)
+
+        self._users.set(user.id, user)
+        for key in self._index_keys(user):
+            self._index.set(key, user.id)
+
+    def invalidate(self, user_id: str) -> None:
+        """Удалить пользователя и его вторичные ключи"""
+        user = self._users.pop(user_id)
+        if user is not None:
+            for key in self._index_keys(user):
+                self._index.pop(key)
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика попаданий по всем видам поиска"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._users),
+            "maxsize": self._users.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
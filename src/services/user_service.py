@@ -1,6 +1,6 @@
 from typing import Optional
 
-from src.models.user import User, UserInDB
+from src.models.user import User
 from src.repositories.user_repository import UserRepositoryInterface
 
 
@@ -12,28 +12,10 @@ class UserService:
 
     async def get_user_by_id(self, user_id: str) -> Optional[User]:
         """Получить пользователя по ID"""
-        user_in_db = await self.user_repository.get_user_by_id(user_id)
-        if user_in_db is None:
-            return None
-
-        return User(
-            id=user_in_db.id,
-            email=user_in_db.email,
-            full_name=user_in_db.full_name,
-            picture=user_in_db.picture,
-            is_active=user_in_db.is_active,
-        )
+        user = await self.user_repository.get_user_by_id(user_id)
+        return user.to_user() if user is not None else None
 
     async def get_user_by_email(self, email: str) -> Optional[User]:
         """Получить пользователя по email"""
-        user_in_db = await self.user_repository.get_user_by_email(email)
-        if user_in_db is None:
-            return None
-
-        return User(
-            id=user_in_db.id,
-            email=user_in_db.email,
-            full_name=user_in_db.full_name,
-            picture=user_in_db.picture,
-            is_active=user_in_db.is_active,
-        )
+        user = await self.user_repository.get_user_by_email(email)
+        return user.to_user() if user is not None else None
@@ -0,0 +1,98 @@
+"""
+Последние версии пользователей (updated_at в мс) для проверки claims токенов
+"""
+
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from src.utils.cache import TTLCache
+
+
+class UserVersionStore(ABC):
+    """
+    Версия записывается после каждого изменения пользователя; claims токена
+    с меткой ver старше нее устарели. Записи живут столько же, сколько
+    токен доступа: более старая версия уже не старше ни одного токена.
+    """
+
+    # Видны ли записи других воркеров
+    shared = False
+
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[int]:
+        """Последняя записанная версия пользователя"""
+        pass
+
+    @abstractmethod
+    async def record(self, user_id: str, version: int) -> None:
+        """Записать версию, если она новее сохраненной"""
+        pass
+
+    async def close(self) -> None:
+        """Освободить ресурсы хранилища"""
+        pass
+
+
+class InMemoryUserVersionStore(UserVersionStore):
+    """Версии в памяти процесса: видны только изменения этого воркера"""
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self._versions = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+
+    async def get(self, user_id: str) -> Optional[int]:
+        return self._versions.get(user_id)
+
+    async def record(self, user_id: str, version: int) -> None:
+        known = self._versions.get(user_id)
+        if known is None or known < version:
+            self._versions.set(user_id, version)
+
+
+class RedisUserVersionStore(UserVersionStore):
+    """
+    Версии в Redis: изменение, сделанное одним воркером, сразу видно всем.
+    Требует пакет redis (pip install redis).
+    """
+
+    shared = True
+
+    # Версия не откатывается назад при гонке двух записей
+    RECORD_SCRIPT = """
+    local known = redis.call('GET', KEYS[1])
+    if not known or tonumber(known) < tonumber(ARGV[1]) then
+        redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    end
+    """
+
+    def __init__(self, url: str, ttl_seconds: int):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "Redis user version storage requires the 'redis' package"
+            ) from e
+
+        self._redis = redis.from_url(url)
+        self._record = self._redis.register_script(self.RECORD_SCRIPT)
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, user_id: str) -> Optional[int]:
+        version = await self._redis.get(f"uv:{user_id}")
+        return int(version) if version is not None else None
+
+    async def record(self, user_id: str, version: int) -> None:
+        await self._record(keys=[f"uv:{user_id}"], args=[version, self.ttl_seconds])
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_user_version_store(
+    url: str, maxsize: int, ttl_seconds: int
+) -> UserVersionStore:
+    """Создать хранилище по URL: memory:// или redis://..."""
+    if url.startswith("memory://"):
+        return InMemoryUserVersionStore(maxsize, ttl_seconds)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisUserVersionStore(url, ttl_seconds)
+    raise ValueError(f"Unsupported user version storage: {url}")
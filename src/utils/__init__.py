@@ -2,18 +2,47 @@
 Утилиты для работы с паролями
 """
 
-from passlib.context import CryptContext
+from argon2 import (
+    DEFAULT_MEMORY_COST,
+    DEFAULT_PARALLELISM,
+    DEFAULT_TIME_COST,
+    PasswordHasher,
+)
+from argon2.exceptions import InvalidHashError, VerificationError
 
-# Контекст для хеширования паролей с argon2
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Хешер argon2 без промежуточного слоя passlib.
+# Параметры задаются через configure_password_hasher (см. Settings.argon2_*)
+_password_hasher = PasswordHasher()
+
+
+def configure_password_hasher(
+    time_cost: int = DEFAULT_TIME_COST,
+    memory_cost: int = DEFAULT_MEMORY_COST,
+    parallelism: int = DEFAULT_PARALLELISM,
+) -> None:
+    """Задать параметры argon2 для текущего процесса"""
+    global _password_hasher
+    _password_hasher = PasswordHasher(
+        time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )
 
 
 def hash_password(password: str) -> str:
     """Хешировать пароль"""
-    return pwd_context.hash(password)
+    return _password_hasher.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверить пароль"""
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return _password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Хеш создан с устаревшими параметрами argon2"""
+    try:
+        return _password_hasher.check_needs_rehash(hashed_password)
+    except InvalidHashError:
+        return True
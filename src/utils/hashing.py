@@ -0,0 +1,92 @@
+"""
+Пул процессов для хеширования паролей
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+from src.utils import (
+    DEFAULT_MEMORY_COST,
+    DEFAULT_PARALLELISM,
+    DEFAULT_TIME_COST,
+    configure_password_hasher,
+    hash_password,
+    password_needs_rehash,
+    verify_password,
+)
+
+
+class HashingQueueFullError(RuntimeError):
+    """Очередь задач хеширования переполнена"""
+
+
+class PasswordHashingExecutor:
+    """
+    Ограниченный пул процессов для argon2.
+
+    Хеширование и проверка паролей выполняются вне event loop. Одновременно
+    принимается не более pool_size + queue_depth задач, остальные сразу
+    получают HashingQueueFullError, чтобы всплеск логинов не копился в памяти.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 0,
+        queue_depth: int = 64,
+        time_cost: int = DEFAULT_TIME_COST,
+        memory_cost: int = DEFAULT_MEMORY_COST,
+        parallelism: int = DEFAULT_PARALLELISM,
+    ):
+        hasher_params = (time_cost, memory_cost, parallelism)
+        # Те же параметры нужны и в основном процессе - для проверки needs_rehash
+        configure_password_hasher(*hasher_params)
+
+        self.pool_size = pool_size if pool_size > 0 else (os.cpu_count() or 1)
+        self.queue_depth = max(queue_depth, 0)
+        self._capacity = self.pool_size + self.queue_depth
+        self._pending = 0
+        # spawn вместо fork: дочерние процессы не наследуют event loop и потоки
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.pool_size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=configure_password_hasher,
+            initargs=hasher_params,
+        )
+
+    @property
+    def pending(self) -> int:
+        """Количество задач в работе и в очереди"""
+        return self._pending
+
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self._capacity:
+            raise HashingQueueFullError("Password hashing queue is full")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash_password(self, password: str) -> str:
+        """Хешировать пароль в пуле процессов"""
+        return await self._submit(hash_password, password)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Проверить пароль в пуле процессов"""
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        Хеш создан с параметрами, отличными от текущих.
+        Выполняется в основном процессе: разбирается только заголовок хеша.
+        """
+        return password_needs_rehash(hashed_password)
+
+    def shutdown(self) -> None:
+        """Остановить пул процессов"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,43 @@
+"""
+Общий HTTP-клиент для запросов к внешним сервисам
+"""
+
+import httpx
+
+
+def create_http_client(
+    max_connections: int = 20,
+    max_keepalive_connections: int = 10,
+    keepalive_expiry: float = 30,
+    connect_timeout: float = 3,
+    read_timeout: float = 10,
+    http2: bool = False,
+) -> httpx.AsyncClient:
+    """
+    Клиент создается один раз на приложение (в lifespan): пул держит
+    соединения с каждым хостом открытыми keepalive_expiry секунд, и запросы
+    не платят заново за DNS, TCP и TLS. Ожидание свободного соединения
+    ограничено connect_timeout.
+
+    HTTP/2 требует пакет h2 (pip install "httpx[http2]").
+    """
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("HTTP/2 client requires the 'h2' package") from e
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=read_timeout,
+            pool=connect_timeout,
+        ),
+    )
@@ -0,0 +1,23 @@
+"""
+Упорядоченные по времени идентификаторы (UUIDv7, RFC 9562)
+"""
+
+import os
+import time
+import uuid
+
+_RAND_B_MASK = (1 << 62) - 1
+
+
+def uuid7() -> uuid.UUID:
+    """
+    UUID версии 7: 48 бит unix времени в миллисекундах, затем 12 бит доли
+    миллисекунды (метод 3 RFC 9562) и 62 случайных бита. Новые id растут
+    со временем, поэтому вставки идут в правый край B-дерева первичного ключа,
+    а не в случайные страницы, как у uuid4.
+    """
+    milliseconds, nanoseconds = divmod(time.time_ns(), 1_000_000)
+    fraction = nanoseconds * 4096 // 1_000_000
+    rand_b = int.from_bytes(os.urandom(8), "big") & _RAND_B_MASK
+    value = milliseconds << 80 | 0x7 << 76 | fraction << 64 | 0b10 << 62 | rand_b
+    return uuid.UUID(int=value)
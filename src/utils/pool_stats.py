@@ -0,0 +1,116 @@
+"""
+Статистика пула соединений SQLAlchemy
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+
+class PoolStats:
+    """
+    Счетчики пула, собираемые по событиям SQLAlchemy (connect, checkout,
+    checkin, invalidate), и время ожидания свободного соединения.
+    """
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def attach(self, pool: Pool) -> None:
+        """Подписаться на события пула (переживают engine.dispose())"""
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "invalidate", self._on_invalidate)
+        event.listen(pool, "soft_invalidate", self._on_soft_invalidate)
+        if isinstance(pool, InstrumentedQueuePool):
+            pool.stats = self
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, proxy) -> None:
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        self.invalidations += 1
+
+    def _on_soft_invalidate(
+        self, dbapi_connection, connection_record, exception
+    ) -> None:
+        self.soft_invalidations += 1
+
+    def record_wait(self, seconds: float) -> None:
+        """Учесть время получения соединения из пула"""
+        self.wait_count += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        """Текущее состояние пула и накопленные счетчики"""
+        state: Dict[str, Any] = {"pool_class": type(pool).__name__}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            state.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+
+        state.update(
+            connects=self.connects,
+            checkouts=self.checkouts,
+            checkins=self.checkins,
+            invalidations=self.invalidations,
+            soft_invalidations=self.soft_invalidations,
+            timeouts=self.timeouts,
+            wait_ms={
+                "count": self.wait_count,
+                "avg": (
+                    self.wait_total / self.wait_count * 1000 if self.wait_count else 0.0
+                ),
+                "max": self.wait_max * 1000,
+            },
+        )
+        return state
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул asyncio с замером ожидания checkout: у событий SQLAlchemy нет
+    момента начала ожидания, поэтому время меряется вокруг connect().
+    """
+
+    stats: Optional[PoolStats] = None
+
+    def connect(self):
+        if self.stats is None:
+            return super().connect()
+
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - started)
+
+    def recreate(self) -> Pool:
+        # engine.dispose() пересоздает пул: статистика остается общей
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
@@ -0,0 +1,202 @@
+"""
+Ограничение частоты запросов (sliding window)
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Tuple
+
+from src.models.user import normalize_email
+
+
+class RateLimitExceeded(Exception):
+    """Превышен лимит запросов"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RateLimitStore(ABC):
+    """Хранилище счетчиков для ограничителя частоты запросов"""
+
+    @abstractmethod
+    async def increment(self, key: str, window: int, ttl: int) -> Tuple[int, int]:
+        """
+        Увеличить счетчик окна window для ключа.
+        Возвращает (счетчик предыдущего окна, счетчик текущего окна).
+        """
+        pass
+
+    async def close(self) -> None:
+        """Освободить ресурсы хранилища"""
+        pass
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """
+    Счетчики в памяти процесса.
+    Лимиты действуют в пределах одного воркера.
+    """
+
+    # Как часто (в вызовах increment) удалять устаревшие ключи
+    SWEEP_EVERY = 1024
+
+    def __init__(self):
+        # key -> (номер окна, счетчик предыдущего окна, счетчик текущего окна)
+        self._counters: Dict[str, Tuple[int, int, int]] = {}
+        self._calls = 0
+
+    async def increment(self, key: str, window: int, ttl: int) -> Tuple[int, int]:
+        stored_window, previous, current = self._counters.get(key, (window, 0, 0))
+
+        if stored_window == window:
+            current += 1
+        elif stored_window == window - 1:
+            previous, current = current, 1
+        else:
+            previous, current = 0, 1
+
+        self._counters[key] = (window, previous, current)
+
+        self._calls += 1
+        if self._calls % self.SWEEP_EVERY == 0:
+            self._sweep(window)
+
+        return previous, current
+
+    def _sweep(self, window: int) -> None:
+        """Удалить ключи, не обновлявшиеся дольше двух окон"""
+        stale = [k for k, (w, _, _) in self._counters.items() if w < window - 1]
+        for key in stale:
+            del self._counters[key]
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """
+    Счетчики в Redis: лимиты общие для всех воркеров и инстансов.
+    Требует пакет redis (pip install redis).
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "Redis rate limit storage requires the 'redis' package"
+            ) from e
+
+        self._redis = redis.from_url(url)
+
+    async def increment(self, key: str, window: int, ttl: int) -> Tuple[int, int]:
+        current_key = f"rl:{key}:{window}"
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.incr(current_key)
+            pipe.expire(current_key, ttl)
+            pipe.get(f"rl:{key}:{window - 1}")
+            current, _, previous = await pipe.execute()
+        return int(previous or 0), int(current)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_rate_limit_store(url: str) -> RateLimitStore:
+    """Создать хранилище по URL: memory:// или redis://..."""
+    if url.startswith("memory://"):
+        return InMemoryRateLimitStore()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimitStore(url)
+    raise ValueError(f"Unsupported rate limit storage: {url}")
+
+
+class SlidingWindowRateLimiter:
+    """
+    Ограничитель по скользящему окну (sliding window counter).
+
+    Число запросов оценивается как взвешенная сумма счетчиков предыдущего
+    и текущего фиксированных окон - это дает O(1) памяти на ключ.
+    """
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        name: str,
+        limit: int,
+        window_seconds: int,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._clock = clock
+
+    async def hit(self, key: str) -> None:
+        """Учесть запрос; при превышении лимита выбросить RateLimitExceeded"""
+        now = self._clock()
+        window = int(now // self.window_seconds)
+        elapsed = now - window * self.window_seconds
+
+        previous, current = await self.store.increment(
+            f"{self.name}:{key}", window, ttl=2 * self.window_seconds
+        )
+
+        weight = (self.window_seconds - elapsed) / self.window_seconds
+        if previous * weight + current > self.limit:
+            raise RateLimitExceeded(self._retry_after(previous, current, elapsed))
+
+    def _retry_after(self, previous: int, current: int, elapsed: float) -> int:
+        """Через сколько секунд оценка опустится до лимита"""
+        window = self.window_seconds
+
+        if current <= self.limit and previous > 0:
+            # Ждем, пока вес предыдущего окна уменьшится в текущем окне
+            wait_until = window * (1 - (self.limit - current) / previous)
+            if wait_until <= window:
+                return max(1, math.ceil(wait_until - elapsed))
+
+        # Ждем следующего окна, где текущий счетчик станет предыдущим
+        next_window_wait = window * (1 - self.limit / current) if current else 0
+        return max(1, math.ceil(window - elapsed + next_window_wait))
+
+
+class AuthRateLimiter:
+    """
+    Лимиты для /auth/login и /auth/register.
+    Проверяются до хеширования пароля: по IP клиента и по нормализованному email.
+    """
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        window_seconds: int,
+        login_per_ip: int,
+        login_per_account: int,
+        register_per_ip: int,
+        register_per_account: int,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+
+        def limiter(name: str, limit: int) -> SlidingWindowRateLimiter:
+            return SlidingWindowRateLimiter(store, name, limit, window_seconds, clock)
+
+        self.login_ip = limiter("login:ip", login_per_ip)
+        self.login_account = limiter("login:account", login_per_account)
+        self.register_ip = limiter("register:ip", register_per_ip)
+        self.register_account = limiter("register:account", register_per_account)
+
+    async def check_login(self, client_ip: str, email: str) -> None:
+        """Учесть попытку входа"""
+        await self.login_ip.hit(client_ip)
+        await self.login_account.hit(normalize_email(email))
+
+    async def check_register(self, client_ip: str, email: str) -> None:
+        """Учесть попытку регистрации"""
+        await self.register_ip.hit(client_ip)
+        await self.register_account.hit(normalize_email(email))
+
+    async def close(self) -> None:
+        await self.store.close()
@@ -0,0 +1,20 @@
+"""
+Распределение ключей по шардам (rendezvous hashing)
+"""
+
+import hashlib
+from typing import Iterable
+
+
+def _weight(shard: str, key: str) -> int:
+    digest = hashlib.blake2b(f"{shard}\x00{key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def rendezvous_owner(key: str, shards: Iterable[str]) -> str:
+    """
+    Шард-владелец ключа: шард с наибольшим весом hash(шард, ключ).
+    Зависит только от имен шардов, а не от их порядка; при добавлении шарда
+    на него переезжает примерно 1/N ключей, остальные остаются на месте.
+    """
+    return max(shards, key=lambda shard: _weight(shard, key))
@@ -0,0 +1,78 @@
+"""
+Объединение одновременных одинаковых запросов (single-flight)
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Первый вызов по ключу выполняет запрос, одновременные вызовы с тем же
+    ключом ждут его результат. После завершения ключ освобождается: результат
+    не хранится, ошибку получают только те, кто ждал этот запрос.
+
+    Запрос выполняется в задаче первого вызова (с его сессией БД). Если она
+    отменена, ожидающие не получают CancelledError: один из них повторяет
+    запрос сам. Рассчитан на использование из одного event loop.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Выполнить fn() или дождаться уже идущего запроса с тем же ключом"""
+        while True:
+            call = self._calls.get(key)
+            if call is None:
+                break
+            self.shared += 1
+            try:
+                # shield: отмена ожидающего не должна отменять общий результат
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                if call.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        self.leaders += 1
+        try:
+            result = await fn()
+        except Exception as e:
+            call.set_exception(e)
+            # Без ожидающих исключение некому забрать - не логируем его
+            call.exception()
+            raise
+        except BaseException:
+            call.cancel()
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            self.forget(key, call)
+
+    def forget(self, key: Hashable, call: Optional[asyncio.Future] = None) -> None:
+        """
+        Освободить ключ: следующий вызов начнет новый запрос. Ожидающие
+        текущего запроса получат его результат.
+        """
+        if call is None or self._calls.get(key) is call:
+            self._calls.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Сколько запросов выполнено и сколько вызовов получили чужой результат"""
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "shared": self.shared,
+        }
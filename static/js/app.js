@@ -3,6 +3,7 @@ const API_BASE = '';
 
 // Текущий токен
 let authToken = localStorage.getItem('authToken');
+let refreshToken = localStorage.getItem('refreshToken');
 
 // Инициализация приложения
 document.addEventListener('DOMContentLoaded', () => {
@@ -26,8 +27,8 @@ function initApp() {
     }
     
     if (token) {
-        authToken = token;
-        localStorage.setItem('authToken', token);
+        // Refresh токен входа через Google лежит в HttpOnly cookie
+        saveTokens({ access_token: token });
         window.history.replaceState({}, document.title, '/');
         showPage('profile');
         return;
@@ -187,8 +188,7 @@ async function handleLogin(event) {
         }
         
         const data = await response.json();
-        authToken = data.access_token;
-        localStorage.setItem('authToken', authToken);
+        saveTokens(data);
         
         updateNav();
         showPage('profile');
@@ -223,8 +223,7 @@ async function handleRegister(event) {
         }
         
         const data = await response.json();
-        authToken = data.access_token;
-        localStorage.setItem('authToken', authToken);
+        saveTokens(data);
         
         updateNav();
         showPage('profile');
@@ -234,16 +233,53 @@ async function handleRegister(event) {
     }
 }
 
+function saveTokens(data) {
+    authToken = data.access_token;
+    localStorage.setItem('authToken', authToken);
+
+    if (data.refresh_token) {
+        refreshToken = data.refresh_token;
+        localStorage.setItem('refreshToken', refreshToken);
+    }
+}
+
+// Обновить токен доступа по refresh токену (без повторного ввода пароля)
+// Без сохраненного токена сервер берет его из cookie (вход через Google)
+async function refreshAccessToken() {
+    const options = { method: 'POST', credentials: 'same-origin' };
+    if (refreshToken) {
+        options.headers = {'Content-Type': 'application/json'};
+        options.body = JSON.stringify({ refresh_token: refreshToken });
+    }
+
+    const response = await fetch(`${API_BASE}/auth/refresh`, options);
+
+    if (!response.ok) {
+        return false;
+    }
+
+    saveTokens(await response.json());
+    return true;
+}
+
+async function fetchProfile() {
+    return fetch(`${API_BASE}/auth/me`, {
+        headers: {
+            'Authorization': `Bearer ${authToken}`
+        }
+    });
+}
+
 async function loadProfile() {
     const app = document.getElementById('app');
     app.innerHTML = '<div class="loading">Загрузка профиля</div>';
     
     try {
-        const response = await fetch(`${API_BASE}/auth/me`, {
-            headers: {
-                'Authorization': `Bearer ${authToken}`
-            }
-        });
+        let response = await fetchProfile();
+
+        if (response.status === 401 && await refreshAccessToken()) {
+            response = await fetchProfile();
+        }
         
         if (!response.ok) {
             throw new Error('Не удалось загрузить профиль');
@@ -276,8 +312,27 @@ function loginWithGoogle() {
 }
 
 function logout() {
+    if (authToken) {
+        // Отзываем токены на сервере; локально выходим в любом случае
+        fetch(`${API_BASE}/auth/logout`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${authToken}`,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ refresh_token: refreshToken })
+        }).catch(() => {});
+    }
+    // Refresh токен из cookie отзывается отдельным запросом
+    fetch(`${API_BASE}/auth/refresh`, {
+        method: 'DELETE',
+        credentials: 'same-origin'
+    }).catch(() => {});
+
     authToken = null;
+    refreshToken = null;
     localStorage.removeItem('authToken');
+    localStorage.removeItem('refreshToken');
     updateNav();
     showPage('home');
 }
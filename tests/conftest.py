@@ -0,0 +1,32 @@
+"""
+Общие фикстуры тестов
+"""
+
+import pytest
+
+from src.services.auth_service import AuthService
+from src.services.token_codec import JWTCodec, create_key_ring
+from src.utils.hashing import PasswordHashingExecutor
+from tests.fakes import FAST_ARGON2, InMemoryUserRepository
+
+
+@pytest.fixture
+def password_hasher():
+    executor = PasswordHashingExecutor(pool_size=1, queue_depth=8, **FAST_ARGON2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def repository():
+    return InMemoryUserRepository()
+
+
+@pytest.fixture
+def auth_service(repository, password_hasher):
+    return AuthService(
+        user_repository=repository,
+        token_codec=JWTCodec(create_key_ring("test-secret")),
+        access_token_expire_minutes=30,
+        password_hasher=password_hasher,
+    )
@@ -0,0 +1,192 @@
+"""
+Репозитории в памяти для тестов сервиса аутентификации
+"""
+
+import dataclasses
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.models.user import RefreshTokenInDB, UserCreate, UserRecord
+from src.repositories.refresh_token_repository import RefreshTokenRepositoryInterface
+from src.repositories.revoked_token_repository import RevokedTokenRepositoryInterface
+from src.repositories.user_repository import (
+    UserAlreadyExistsError,
+    UserRepositoryInterface,
+)
+
+# Дешевые параметры argon2, чтобы тесты работали быстро
+FAST_ARGON2 = {"time_cost": 1, "memory_cost": 8192, "parallelism": 1}
+
+
+class InMemoryUserRepository(UserRepositoryInterface):
+    """Репозиторий пользователей в памяти для тестов"""
+
+    def __init__(self):
+        self.users: Dict[str, UserRecord] = {}
+        self.updates = 0
+        self.lookups = 0
+
+    def _check_email(self, email: str) -> None:
+        if any(u.email == email for u in self.users.values()):
+            raise UserAlreadyExistsError()
+
+    async def create_user(self, user: UserCreate) -> UserRecord:
+        self._check_email(user.email)
+        now = datetime.utcnow()
+        db_user = UserRecord(
+            id=str(uuid.uuid4()),
+            email=user.email,
+            full_name=user.full_name,
+            picture=user.picture,
+            google_id=user.google_id,
+            hashed_password=None,
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        self.users[db_user.id] = db_user
+        return db_user
+
+    async def create_user_with_password(
+        self, email: str, hashed_password: str, full_name: Optional[str] = None
+    ) -> UserRecord:
+        self._check_email(email)
+        now = datetime.utcnow()
+        db_user = UserRecord(
+            id=str(uuid.uuid4()),
+            email=email,
+            full_name=full_name,
+            picture=None,
+            google_id=None,
+            hashed_password=hashed_password,
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        self.users[db_user.id] = db_user
+        return db_user
+
+    async def get_user_by_id(
+        self, user_id: str, min_updated_at: Optional[datetime] = None
+    ) -> Optional[UserRecord]:
+        self.lookups += 1
+        return self.users.get(user_id)
+
+    async def get_user_by_email(self, email: str) -> Optional[UserRecord]:
+        return next((u for u in self.users.values() if u.email == email), None)
+
+    async def get_user_by_google_id(self, google_id: str) -> Optional[UserRecord]:
+        return next((u for u in self.users.values() if u.google_id == google_id), None)
+
+    async def upsert_google_user(self, user: UserCreate) -> UserRecord:
+        existing = await self.get_user_by_google_id(user.google_id)
+        if existing is None:
+            return await self.create_user(user)
+        update_data = {
+            key: value
+            for key, value in (("full_name", user.full_name), ("picture", user.picture))
+            if value and getattr(existing, key) != value
+        }
+        if not update_data:
+            return existing
+        return await self.update_user(existing.id, update_data)
+
+    async def list_users(
+        self, limit, after=None, is_active=None, auth_method=None
+    ) -> List[UserRecord]:
+        result = sorted(self.users.values(), key=lambda u: (u.created_at, u.id))
+        if after is not None:
+            result = [u for u in result if (u.created_at, u.id) > after]
+        if is_active is not None:
+            result = [u for u in result if u.is_active == is_active]
+        if auth_method == "google":
+            result = [u for u in result if u.google_id is not None]
+        elif auth_method == "password":
+            result = [u for u in result if u.hashed_password is not None]
+        return result[:limit]
+
+    async def update_user(self, user_id: str, user_data: Dict) -> Optional[UserRecord]:
+        user = self.users.get(user_id)
+        if user is None:
+            return None
+        self.updates += 1
+        user = dataclasses.replace(
+            user, **{**user_data, "updated_at": datetime.utcnow()}
+        )
+        self.users[user_id] = user
+        return user
+
+
+class InMemoryRefreshTokenRepository(RefreshTokenRepositoryInterface):
+    """Репозиторий refresh токенов в памяти для тестов"""
+
+    def __init__(self):
+        self.tokens: Dict[str, RefreshTokenInDB] = {}
+
+    async def create_token(
+        self, user_id: str, family_id: str, token_hash: str, expires_at: datetime
+    ) -> RefreshTokenInDB:
+        token = RefreshTokenInDB(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            family_id=family_id,
+            token_hash=token_hash,
+            created_at=datetime.utcnow(),
+            expires_at=expires_at,
+        )
+        self.tokens[token.id] = token
+        return token
+
+    async def get_token_by_hash(self, token_hash: str) -> Optional[RefreshTokenInDB]:
+        return next(
+            (t for t in self.tokens.values() if t.token_hash == token_hash), None
+        )
+
+    async def mark_rotated(self, token_id: str) -> bool:
+        token = self.tokens[token_id]
+        if token.rotated_at or token.revoked_at:
+            return False
+        self.tokens[token_id] = token.model_copy(
+            update={"rotated_at": datetime.utcnow()}
+        )
+        return True
+
+    async def revoke_family(self, family_id: str) -> None:
+        for token_id, token in self.tokens.items():
+            if token.family_id == family_id:
+                self.tokens[token_id] = token.model_copy(
+                    update={"revoked_at": datetime.utcnow()}
+                )
+
+
+class InMemoryRevokedTokenRepository(RevokedTokenRepositoryInterface):
+    """Denylist в памяти для тестов"""
+
+    def __init__(self):
+        self.tokens: Dict[str, Tuple[datetime, datetime]] = {}
+        self.lookups = 0
+
+    async def revoke(self, jti: str, expires_at: datetime) -> None:
+        self.tokens.setdefault(jti, (expires_at, datetime.utcnow()))
+
+    async def is_revoked(self, jti: str) -> bool:
+        self.lookups += 1
+        return jti in self.tokens
+
+    async def list_revoked(
+        self, since: Optional[datetime] = None
+    ) -> List[Tuple[str, datetime]]:
+        now = datetime.utcnow()
+        return [
+            (jti, revoked_at)
+            for jti, (expires_at, revoked_at) in self.tokens.items()
+            if expires_at > now and (since is None or revoked_at >= since)
+        ]
+
+    async def purge_expired(self) -> int:
+        now = datetime.utcnow()
+        expired = [jti for jti, (exp, _) in self.tokens.items() if exp <= now]
+        for jti in expired:
+            del self.tokens[jti]
+        return len(expired)
@@ -2,16 +2,22 @@
 Тесты для FastAPI OAuth приложения
 """
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from src import main
+from src.config import get_settings
+from src.database import pool_stats
 from src.main import app
+from src.utils.http import create_http_client
 
 
 @pytest.fixture
 def client():
-    """Фикстура для создания тестового клиента"""
-    return TestClient(app)
+    """Фикстура для создания тестового клиента (с запуском lifespan)"""
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 class TestHealth:
@@ -73,6 +79,20 @@ class TestAuthLogin:
         assert response.status_code == 422
 
 
+class TestRefreshToken:
+    """Тесты обновления токена"""
+
+    def test_refresh_invalid_token(self, client):
+        """Неизвестный refresh токен отклоняется"""
+        response = client.post("/auth/refresh", json={"refresh_token": "invalid"})
+        assert response.status_code == 401
+
+    def test_refresh_missing_token(self, client):
+        """Запрос без refresh токена не проходит валидацию"""
+        response = client.post("/auth/refresh", json={})
+        assert response.status_code == 422
+
+
 class TestProtectedEndpoints:
     """Тесты защищенных эндпоинтов"""
 
@@ -91,7 +111,11 @@ class TestProtectedEndpoints:
     def test_get_profile_expired_token(self, client):
         """Получение профиля с истекшим токеном"""
         # Используем токен с истекшим сроком
-        expired_token = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJ1c2VyX2lkIjoiMTIzIiwiZW1haWwiOiJ0ZXN0QGV4YW1wbGUuY29tIiwiZXhwIjoxNjAwMDAwMDAwfQ.invalid"
+        expired_token = (
+            "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9."
+            "eyJ1c2VyX2lkIjoiMTIzIiwiZW1haWwiOiJ0ZXN0QGV4YW1wbGUuY29tIiwiZXhwIjoxNjAwMDAwMDAwfQ"
+            ".invalid"
+        )
 
         response = client.get(
             "/auth/me", headers={"Authorization": f"Bearer {expired_token}"}
@@ -103,6 +127,40 @@ class TestProtectedEndpoints:
         response = client.post("/auth/logout")
         assert response.status_code == 403
 
+    def test_logout_invalid_token(self, client):
+        """Выход с невалидным токеном"""
+        response = client.post(
+            "/auth/logout", headers={"Authorization": "Bearer invalid_token"}
+        )
+        assert response.status_code == 401
+
+
+class TestLazySession:
+    """Отклоненные и обслуженные из кэша запросы не берут соединение из пула"""
+
+    def test_services_are_app_scoped(self, client):
+        state = client.app.state
+        assert state.auth_service.user_repository is state.user_repository
+
+    def test_rejected_request_skips_pool(self, client):
+        checkouts = pool_stats.checkouts
+        response = client.get(
+            "/auth/me", headers={"Authorization": "Bearer invalid_token"}
+        )
+        assert response.status_code == 401
+        assert pool_stats.checkouts == checkouts
+
+    def test_cached_profile_skips_pool(self, client):
+        payload = {"email": "lazy-session@example.com", "password": "password123"}
+        client.post("/auth/register", json=payload)
+        token = client.post("/auth/login", json=payload).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        checkouts = pool_stats.checkouts
+        for _ in range(3):
+            assert client.get("/auth/me", headers=headers).status_code == 200
+        assert pool_stats.checkouts == checkouts
+
 
 class TestGoogleOAuth:
     """Тесты Google OAuth"""
@@ -118,6 +176,144 @@ class TestGoogleOAuth:
         response = client.get("/auth/google/callback")
         assert response.status_code == 422  # Missing required parameter
 
+    @pytest.fixture
+    def created_clients(self, monkeypatch):
+        """Клиент приложения отвечает вместо Google через MockTransport"""
+
+        def google(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "oauth2.googleapis.com":
+                return httpx.Response(200, json={"access_token": "google-token"})
+            return httpx.Response(
+                200, json={"id": "google-shared-1", "email": "shared@example.com"}
+            )
+
+        created = []
+
+        def mock_http_client(**options):
+            created.append(httpx.AsyncClient(transport=httpx.MockTransport(google)))
+            return created[-1]
+
+        monkeypatch.setattr(main, "create_http_client", mock_http_client)
+        return created
+
+    def test_google_callback_uses_shared_client(self, created_clients):
+        """Callback идут через общий клиент приложения; lifespan его закрывает"""
+        requests = []
+
+        async def record(request: httpx.Request) -> None:
+            requests.append(request.url.host)
+
+        with TestClient(app) as client:
+            http_client = app.state.http_client
+            http_client.event_hooks = {"request": [record], "response": []}
+            for _ in range(2):
+                response = client.get(
+                    "/auth/google/callback?code=abc", follow_redirects=False
+                )
+                assert response.status_code == 307
+                assert "token=" in response.headers["location"]
+            assert not http_client.is_closed
+
+        assert created_clients == [http_client]
+        assert requests == ["oauth2.googleapis.com", "www.googleapis.com"] * 2
+        assert http_client.is_closed
+
+    def test_google_refresh_token_in_cookie(self, created_clients):
+        """Refresh токен не попадает в URL: он в HttpOnly cookie для /auth/refresh"""
+        with TestClient(app) as client:
+            response = client.get(
+                "/auth/google/callback?code=abc", follow_redirects=False
+            )
+            assert "refresh_token" not in response.headers["location"]
+            cookie = response.headers["set-cookie"]
+            for attribute in (
+                "HttpOnly",
+                "Secure",
+                "Path=/auth/refresh",
+                "SameSite=strict",
+            ):
+                assert attribute in cookie
+            refresh_token = response.cookies["refresh_token"]
+
+            # Cookie Secure: TestClient ходит по http, поэтому передаем ее явно
+            client.cookies.set("refresh_token", refresh_token)
+            response = client.post("/auth/refresh")
+            assert response.status_code == 200
+            assert response.json()["refresh_token"] is None
+            rotated = response.cookies["refresh_token"]
+            assert rotated != refresh_token
+
+            client.cookies.set("refresh_token", rotated)
+            assert client.delete("/auth/refresh").status_code == 204
+            # Токен отозван на сервере, а не только удален из браузера
+            client.cookies.set("refresh_token", rotated)
+            assert client.post("/auth/refresh").status_code == 401
+
+    async def test_http_client_settings(self):
+        """Таймауты общего клиента задаются явно"""
+        async with create_http_client(connect_timeout=1, read_timeout=2) as http_client:
+            assert http_client.timeout == httpx.Timeout(
+                connect=1, read=2, write=2, pool=1
+            )
+
+
+class TestInternalEndpoints:
+    """Тесты служебных эндпоинтов"""
+
+    @pytest.fixture
+    def internal_api_key(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "internal_api_key", "internal-key")
+        return "internal-key"
+
+    def test_disabled_without_key(self, client):
+        """Без INTERNAL_API_KEY эндпоинты недоступны"""
+        response = client.get("/internal/db/pool")
+        assert response.status_code == 404
+
+    def test_wrong_key(self, client, internal_api_key):
+        response = client.get(
+            "/internal/db/pool", headers={"X-Internal-Api-Key": "wrong"}
+        )
+        assert response.status_code == 403
+
+    def test_pool_stats(self, client, internal_api_key):
+        response = client.get(
+            "/internal/db/pool", headers={"X-Internal-Api-Key": internal_api_key}
+        )
+        assert response.status_code == 200
+        assert "checkouts" in response.json()
+        assert "wait_ms" in response.json()
+
+    def test_user_lookups(self, client, internal_api_key):
+        response = client.get(
+            "/internal/users/lookups", headers={"X-Internal-Api-Key": internal_api_key}
+        )
+        assert response.status_code == 200
+        assert set(response.json()) == {"cache", "single_flight"}
+        assert response.json()["single_flight"]["in_flight"] == 0
+
+    def test_admin_users_requires_key(self, client):
+        assert client.get("/admin/users").status_code == 404
+
+    def test_admin_users_page(self, client, internal_api_key):
+        headers = {"X-Internal-Api-Key": internal_api_key}
+        response = client.get("/admin/users", params={"limit": 1}, headers=headers)
+        assert response.status_code == 200
+        assert "items" in response.json()
+        assert "next_cursor" in response.json()
+
+        response = client.get(
+            "/admin/users", params={"cursor": "not-a-cursor"}, headers=headers
+        )
+        assert response.status_code == 400
+
+    def test_admin_users_ndjson(self, client, internal_api_key):
+        response = client.get(
+            "/admin/users.ndjson", headers={"X-Internal-Api-Key": internal_api_key}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+
 
 class TestAPIDocumentation:
     """Тесты API документации"""
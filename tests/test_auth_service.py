@@ -0,0 +1,263 @@
+"""
+Тесты сервиса аутентификации на репозитории в памяти
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.auth_service import AuthService
+from src.services.login_events import LoginEventRecorder
+from src.services.token_cache import VerifiedTokenCache
+from src.services.token_codec import JWTCodec, create_key_ring
+from src.services.user_versions import InMemoryUserVersionStore
+from src.utils import configure_password_hasher, hash_password
+from tests.fakes import FAST_ARGON2, InMemoryRefreshTokenRepository
+
+
+class SharedUserVersionStore(InMemoryUserVersionStore):
+    """Хранилище версий, общее для нескольких AuthService (как Redis)"""
+
+    shared = True
+
+    def __init__(self):
+        super().__init__(maxsize=100, ttl_seconds=1800)
+
+
+class TestPasswordAuthentication:
+    """Регистрация и вход по паролю"""
+
+    async def test_register_and_login(self, auth_service):
+        """Зарегистрированный пользователь может войти"""
+        user, token = await auth_service.register_user("a@example.com", "secret123")
+        assert token.access_token
+
+        result = await auth_service.authenticate_user("a@example.com", "secret123")
+        assert result is not None
+        assert result[0].id == user.id
+
+    async def test_wrong_password(self, auth_service):
+        """Неверный пароль не проходит"""
+        await auth_service.register_user("a@example.com", "secret123")
+        assert await auth_service.authenticate_user("a@example.com", "nope") is None
+
+    async def test_duplicate_registration(self, auth_service):
+        """Повторная регистрация с тем же email запрещена"""
+        await auth_service.register_user("a@example.com", "secret123")
+        with pytest.raises(ValueError):
+            await auth_service.register_user("a@example.com", "secret123")
+
+
+class TestLoginEvents:
+    """Входы попадают в журнал через очередь, без записи в БД на пути входа"""
+
+    async def test_logins_are_recorded(self, repository, password_hasher):
+        recorder = LoginEventRecorder()
+        auth_service = AuthService(
+            user_repository=repository,
+            token_codec=JWTCodec(create_key_ring("test-secret")),
+            access_token_expire_minutes=30,
+            password_hasher=password_hasher,
+            login_events=recorder,
+        )
+        user, _ = await auth_service.register_user(
+            "a@example.com", "secret123", ip_address="1.1.1.1"
+        )
+        await auth_service.authenticate_user("a@example.com", "nope")
+        await auth_service.authenticate_user(
+            "a@example.com", "secret123", ip_address="2.2.2.2"
+        )
+
+        events = recorder._next_batch()
+        assert [(e.user_id, e.method, e.ip_address) for e in events] == [
+            (user.id, "register", "1.1.1.1"),
+            (user.id, "password", "2.2.2.2"),
+        ]
+        assert repository.updates == 0
+
+
+class TestRehashOnLogin:
+    """Обновление хешей с устаревшими параметрами"""
+
+    async def test_outdated_hash_is_replaced(self, auth_service, repository):
+        """Хеш со старыми параметрами заменяется при успешном входе"""
+        configure_password_hasher(time_cost=2, memory_cost=8192, parallelism=1)
+        old_hash = hash_password("secret123")
+        configure_password_hasher(**FAST_ARGON2)
+
+        user = await repository.create_user_with_password("a@example.com", old_hash)
+        assert await auth_service.authenticate_user("a@example.com", "secret123")
+
+        new_hash = repository.users[user.id].hashed_password
+        assert new_hash != old_hash
+        assert not auth_service.password_hasher.needs_rehash(new_hash)
+
+    async def test_current_hash_is_kept(self, auth_service, repository):
+        """Актуальный хеш не перезаписывается"""
+        await auth_service.register_user("a@example.com", "secret123")
+        await auth_service.authenticate_user("a@example.com", "secret123")
+        assert repository.updates == 0
+
+
+class TestVerifiedTokenCache:
+    """Кэш проверенных токенов"""
+
+    @pytest.fixture
+    def cached_auth_service(self, auth_service):
+        auth_service.token_cache = VerifiedTokenCache(maxsize=10, ttl_seconds=60)
+        return auth_service
+
+    async def test_second_verification_hits_cache(self, cached_auth_service):
+        """Повторная проверка токена не декодирует его заново"""
+        user, token = await cached_auth_service.register_user(
+            "a@example.com", "secret123"
+        )
+        cache = cached_auth_service.token_cache
+
+        first = await cached_auth_service.verify_token(token.access_token)
+        second = await cached_auth_service.verify_token(token.access_token)
+
+        assert first == second
+        assert first.user_id == user.id
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    async def test_invalid_token_is_not_cached(self, cached_auth_service):
+        """Невалидные токены в кэш не попадают"""
+        assert await cached_auth_service.verify_token("invalid") is None
+        assert cached_auth_service.token_cache.stats()["size"] == 0
+
+    async def test_invalidate_user(self, cached_auth_service):
+        """Токены пользователя можно вытеснить из кэша"""
+        user, token = await cached_auth_service.register_user(
+            "a@example.com", "secret123"
+        )
+        cache = cached_auth_service.token_cache
+        await cached_auth_service.verify_token(token.access_token)
+
+        cache.invalidate_user(user.id)
+        assert cache.get(token.access_token) is None
+
+
+class TestClaimsOnlyCurrentUser:
+    """Текущий пользователь из claims токена"""
+
+    async def test_fresh_claims_skip_database(self, auth_service, repository):
+        """Свежий токен не требует запроса к БД"""
+        user, token = await auth_service.register_user(
+            "a@example.com", "secret123", full_name="Alice"
+        )
+
+        current = await auth_service.get_current_user_from_claims(token.access_token)
+
+        assert current.id == user.id
+        assert current.full_name == "Alice"
+        assert current.is_active
+        assert repository.lookups == 0
+
+    async def test_require_fresh_goes_to_database(self, auth_service, repository):
+        """Эндпоинт может потребовать данные из БД"""
+        _, token = await auth_service.register_user("a@example.com", "secret123")
+
+        await auth_service.get_current_user_from_claims(
+            token.access_token, require_fresh=True
+        )
+        assert repository.lookups == 1
+
+    async def test_old_claims_go_to_database(self, auth_service, repository):
+        """Токен старше claims_max_age_seconds проверяется по БД"""
+        auth_service.claims_max_age_seconds = -1
+        _, token = await auth_service.register_user("a@example.com", "secret123")
+
+        await auth_service.get_current_user_from_claims(token.access_token)
+        assert repository.lookups == 1
+
+    async def test_newer_version_invalidates_claims(self, auth_service, repository):
+        """После изменения пользователя claims старого токена устаревают"""
+        auth_service.user_versions = InMemoryUserVersionStore(10, 60)
+        user, token = await auth_service.register_user(
+            "a@example.com", "secret123", full_name="Alice"
+        )
+        await repository.update_user(user.id, {"full_name": "Bob"})
+        await auth_service.user_versions.record(
+            user.id, auth_service.user_version(user) + 1
+        )
+
+        current = await auth_service.get_current_user_from_claims(token.access_token)
+        assert current.full_name == "Bob"
+        assert repository.lookups == 1
+
+    async def test_shared_versions_replace_age_cap(
+        self, auth_service, repository, password_hasher
+    ):
+        """С общим хранилищем версий старый токен не идет в БД, пока
+        пользователь не изменен, а изменение в другом воркере видно сразу"""
+        versions = SharedUserVersionStore()
+        auth_service.user_versions = versions
+        auth_service.claims_max_age_seconds = -1
+        other_worker = AuthService(
+            user_repository=repository,
+            token_codec=auth_service.token_codec,
+            access_token_expire_minutes=30,
+            password_hasher=password_hasher,
+            user_versions=versions,
+        )
+        _, token = await auth_service.authenticate_with_google(
+            "g1", "g@example.com", "Alice"
+        )
+
+        await auth_service.get_current_user_from_claims(token.access_token)
+        assert repository.lookups == 0
+
+        # Смена имени в другом воркере: версия новее метки в токене
+        await asyncio.sleep(0.002)
+        await other_worker.authenticate_with_google("g1", "g@example.com", "Bob")
+        current = await auth_service.get_current_user_from_claims(token.access_token)
+        assert current.full_name == "Bob"
+        assert repository.lookups == 1
+
+    async def test_memory_store_keeps_newest_version(self):
+        versions = InMemoryUserVersionStore(10, 60)
+        await versions.record("u1", 2)
+        await versions.record("u1", 1)
+        assert await versions.get("u1") == 2
+        assert await versions.get("u2") is None
+
+
+class TestRefreshTokens:
+    """Refresh токены с ротацией"""
+
+    @pytest.fixture
+    def refresh_repository(self, auth_service):
+        repository = InMemoryRefreshTokenRepository()
+        auth_service.refresh_token_repository = repository
+        return repository
+
+    async def test_refresh_rotates_token(self, auth_service, refresh_repository):
+        """Refresh токен обменивается на новую пару токенов"""
+        user, token = await auth_service.register_user("a@example.com", "secret123")
+        assert token.refresh_token
+
+        refreshed_user, new_token = await auth_service.refresh_tokens(
+            token.refresh_token
+        )
+        assert refreshed_user.id == user.id
+        assert new_token.refresh_token != token.refresh_token
+        assert token.refresh_token not in str(refresh_repository.tokens)
+
+    async def test_reuse_revokes_family(self, auth_service, refresh_repository):
+        """Повторное использование токена отзывает всю цепочку"""
+        _, token = await auth_service.register_user("a@example.com", "secret123")
+        _, new_token = await auth_service.refresh_tokens(token.refresh_token)
+
+        assert await auth_service.refresh_tokens(token.refresh_token) is None
+        assert await auth_service.refresh_tokens(new_token.refresh_token) is None
+
+    async def test_expired_token(self, auth_service, refresh_repository):
+        """Истекший refresh токен не принимается"""
+        auth_service.refresh_token_expire_days = -1
+        _, token = await auth_service.register_user("a@example.com", "secret123")
+        assert await auth_service.refresh_tokens(token.refresh_token) is None
+
+    async def test_unknown_token(self, auth_service, refresh_repository):
+        """Неизвестный refresh токен не принимается"""
+        assert await auth_service.refresh_tokens("unknown") is None
@@ -0,0 +1,25 @@
+"""
+Тесты фильтра Блума
+"""
+
+from src.utils.bloom_filter import BloomFilter
+
+
+class TestBloomFilter:
+    """Тесты фильтра Блума"""
+
+    def test_no_false_negatives(self):
+        """Добавленные элементы всегда находятся"""
+        bloom = BloomFilter(1000, 0.01)
+        items = [f"jti-{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        assert all(item in bloom for item in items)
+
+    def test_false_positive_rate(self):
+        """Доля ложных срабатываний близка к заданной"""
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives < 300
@@ -0,0 +1,27 @@
+"""
+Тесты LRU кэша с TTL
+"""
+
+from src.utils.cache import TTLCache
+
+
+class TestTTLCache:
+    """LRU кэш с TTL"""
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняется давно неиспользованная запись"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+    def test_entry_ttl_is_capped(self):
+        """TTL записи не превышает TTL кэша и истекает по часам"""
+        now = [0.0]
+        cache = TTLCache(maxsize=10, ttl=5, clock=lambda: now[0])
+        cache.set("a", 1, ttl=100)
+        now[0] = 6
+        assert cache.get("a") is None
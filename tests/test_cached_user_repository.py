@@ -0,0 +1,83 @@
+"""
+Тесты read-through кэша пользователей поверх репозитория
+"""
+
+import dataclasses
+from datetime import timedelta
+
+import pytest
+
+from src.models.user import UserCreate
+from src.repositories.cached_user_repository import CachedUserRepository
+from src.services.user_cache import UserCache
+
+
+class TestCachedUserRepository:
+    """Read-through кэш пользователей"""
+
+    @pytest.fixture
+    def cache(self):
+        return UserCache(maxsize=100, ttl_seconds=60)
+
+    @pytest.fixture
+    def cached_repository(self, repository, cache):
+        return CachedUserRepository(repository, cache)
+
+    async def test_lookups_share_one_entry(self, cached_repository, repository, cache):
+        """Поиск по id, email и google_id попадает в одну запись кэша"""
+        user = await repository.create_user(
+            UserCreate(email="a@example.com", google_id="google-1")
+        )
+        assert (await cached_repository.get_user_by_id(user.id)).id == user.id
+        assert repository.lookups == 1
+
+        assert (
+            await cached_repository.get_user_by_email("a@example.com")
+        ).id == user.id
+        assert (await cached_repository.get_user_by_google_id("google-1")).id == user.id
+        assert await cached_repository.get_user_by_id(user.id)
+        assert repository.lookups == 1
+        assert cache.stats()["hits"] == 3
+        assert cache.stats()["size"] == 1
+
+    async def test_created_user_is_cached(self, cached_repository, repository):
+        user = await cached_repository.create_user_with_password("b@example.com", "h")
+        assert await cached_repository.get_user_by_id(user.id)
+        assert repository.lookups == 0
+
+    async def test_update_replaces_entry(self, cached_repository, cache):
+        """После обновления старый email не находит пользователя в кэше"""
+        user = await cached_repository.create_user_with_password("c@example.com", "h")
+        await cached_repository.update_user(user.id, {"email": "d@example.com"})
+
+        assert cache.get_by_email("c@example.com") is None
+        assert cache.get_by_email("d@example.com").id == user.id
+        assert await cached_repository.get_user_by_email("c@example.com") is None
+
+    async def test_entry_older_than_token_version_is_refreshed(
+        self, auth_service, repository, cache
+    ):
+        """Запись другого воркера: токен новее кэша - кэш не используется"""
+        auth_service.user_repository = CachedUserRepository(repository, cache)
+        user, _ = await auth_service.register_user("f@example.com", "secret123")
+        updated = dataclasses.replace(
+            user, full_name="New", updated_at=user.updated_at + timedelta(seconds=1)
+        )
+        repository.users[user.id] = updated
+        token = auth_service.create_access_token(updated)
+
+        assert (await auth_service.get_current_user(token.access_token)).full_name == (
+            "New"
+        )
+        assert repository.lookups == 1
+
+    async def test_missing_user_is_not_cached(self, cached_repository, cache):
+        assert await cached_repository.get_user_by_email("none@example.com") is None
+        assert cache.stats()["size"] == 0
+
+    async def test_login_served_from_cache(self, auth_service, repository, cache):
+        """Повторный вход и проверка токена не обращаются к репозиторию"""
+        auth_service.user_repository = CachedUserRepository(repository, cache)
+        _, token = await auth_service.register_user("e@example.com", "secret123")
+        assert await auth_service.get_current_user(token.access_token)
+        assert repository.lookups == 0
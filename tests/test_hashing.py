@@ -0,0 +1,47 @@
+"""
+Тесты пула хеширования паролей
+"""
+
+import asyncio
+
+import pytest
+
+from src.utils.hashing import HashingQueueFullError, PasswordHashingExecutor
+
+
+@pytest.fixture
+def hasher():
+    """Пул из одного процесса без очереди"""
+    executor = PasswordHashingExecutor(pool_size=1, queue_depth=0)
+    yield executor
+    executor.shutdown()
+
+
+class TestPasswordHashingExecutor:
+    """Тесты PasswordHashingExecutor"""
+
+    async def test_hash_and_verify(self, hasher):
+        """Хеш, полученный в пуле, проверяется там же"""
+        hashed = await hasher.hash_password("password123")
+        assert hashed.startswith("$argon2")
+        assert await hasher.verify_password("password123", hashed)
+        assert not await hasher.verify_password("wrong", hashed)
+        assert hasher.pending == 0
+
+    async def test_queue_full(self, hasher):
+        """Задачи сверх pool_size + queue_depth отклоняются"""
+        first = asyncio.ensure_future(hasher.hash_password("password123"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(HashingQueueFullError):
+            await hasher.hash_password("password123")
+
+        assert (await first).startswith("$argon2")
+
+    def test_default_pool_size(self):
+        """По умолчанию размер пула равен числу CPU"""
+        executor = PasswordHashingExecutor(pool_size=0)
+        try:
+            assert executor.pool_size >= 1
+        finally:
+            executor.shutdown()
@@ -10,11 +10,11 @@ import pytest
 from alembic import command
 from alembic.config import Config
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 
 from src.config import get_settings
-from src.database import get_db
+from src.database import get_async_database_url, get_db
 from src.main import app
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -56,13 +56,16 @@ def db_session_factory(postgres_url):
     alembic_cfg = Config(str(BASE_DIR / "alembic.ini"))
     command.upgrade(alembic_cfg, "head")
 
-    engine = create_engine(postgres_url)
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # NullPool: TestClient runs each app in its own event loop
+    engine = create_async_engine(get_async_database_url(postgres_url), poolclass=NullPool)
+    TestingSessionLocal = async_sessionmaker(
+        engine, autoflush=False, expire_on_commit=False
+    )
 
     try:
         yield TestingSessionLocal
     finally:
-        engine.dispose()
+        engine.sync_engine.dispose()
         for key, value in env_backup.items():
             if value is None:
                 os.environ.pop(key, None)
@@ -74,12 +77,9 @@ def db_session_factory(postgres_url):
 @pytest.fixture
 def client(db_session_factory):
     """Test client wired to the temporary database."""
-    def override_get_db():
-        db = db_session_factory()
-        try:
+    async def override_get_db():
+        async with db_session_factory() as db:
             yield db
-        finally:
-            db.close()
 
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
@@ -112,4 +112,19 @@ def test_register_login_and_profile(client):
     assert profile.json()["email"] == "testuser@example.com"
 
 
+def test_refresh_token_rotation(client):
+    """Refresh token rotation and reuse detection."""
+    register = client.post(
+        "/auth/register",
+        json={"email": "refresh@example.com", "password": "test1234"},
+    )
+    assert register.status_code == 200
+    refresh_token = register.json()["refresh_token"]
+
+    rotated = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert rotated.status_code == 200
+    assert rotated.json()["refresh_token"] != refresh_token
+
+    reused = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert reused.status_code == 401
 
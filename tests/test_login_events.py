@@ -0,0 +1,145 @@
+"""
+Тесты журнала входов: очередь, фоновая запись пачками, last_login_at
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database import Base, LoginEventModel
+from src.models.user import LoginEvent
+from src.repositories.login_event_repository import SQLAlchemyLoginEventRepository
+from src.repositories.user_repository import SQLAlchemyUserRepository, users
+from src.services.login_events import LoginEventRecorder
+
+
+class FakeRepository:
+    """Запоминает записанные пачки; может падать по требованию"""
+
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    async def write_batch(self, events):
+        if self.fail:
+            raise RuntimeError("db down")
+        self.batches.append(list(events))
+
+
+@pytest.fixture
+def written():
+    return FakeRepository()
+
+
+@pytest.fixture
+def factory(written):
+    @asynccontextmanager
+    async def repository_factory():
+        yield written
+
+    return repository_factory
+
+
+class TestLoginEventRecorder:
+    """Тесты очереди событий входа"""
+
+    async def test_size_trigger(self, written, factory):
+        recorder = LoginEventRecorder(batch_size=3, flush_interval=60)
+        task = asyncio.create_task(recorder.run(factory))
+        for i in range(3):
+            recorder.record(f"u{i}", "password", None)
+        await asyncio.sleep(0.05)
+
+        assert [len(batch) for batch in written.batches] == [3]
+        await recorder.close(task)
+
+    async def test_time_trigger(self, written, factory):
+        recorder = LoginEventRecorder(batch_size=100, flush_interval=0.05)
+        task = asyncio.create_task(recorder.run(factory))
+        recorder.record("u1", "google", "1.1.1.1")
+        await asyncio.sleep(0.15)
+
+        assert [len(batch) for batch in written.batches] == [1]
+        await recorder.close(task)
+
+    async def test_overflow_drops(self, written, factory):
+        recorder = LoginEventRecorder(max_pending=2, batch_size=100)
+        for i in range(5):
+            recorder.record(f"u{i}", "password", None)
+        assert recorder.stats()["dropped"] == 3
+
+        await recorder.flush(factory)
+        assert recorder.stats()["written"] == 2
+
+    async def test_close_flushes_pending(self, written, factory):
+        recorder = LoginEventRecorder(batch_size=2, flush_interval=60)
+        task = asyncio.create_task(recorder.run(factory))
+        await asyncio.sleep(0)
+        for i in range(5):
+            recorder.record(f"u{i}", "password", None)
+
+        await recorder.close(task)
+        assert sum(len(batch) for batch in written.batches) == 5
+        assert max(len(batch) for batch in written.batches) == 2
+        assert recorder.stats()["pending"] == 0
+
+    async def test_failed_batch_is_counted(self, written, factory):
+        recorder = LoginEventRecorder()
+        written.fail = True
+        recorder.record("u1", "password", None)
+        await recorder.flush(factory)
+
+        written.fail = False
+        recorder.record("u2", "password", None)
+        await recorder.flush(factory)
+        assert recorder.stats()["failed"] == 1
+        assert recorder.stats()["written"] == 1
+
+
+class TestSQLAlchemyLoginEventRepository:
+    """Тесты записи пачки в БД"""
+
+    @pytest.fixture
+    async def session_factory(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        yield async_sessionmaker(engine, expire_on_commit=False)
+        await engine.dispose()
+
+    async def test_write_batch(self, session_factory):
+        async with session_factory() as db:
+            user = await SQLAlchemyUserRepository(db).create_user_with_password(
+                "a@example.com", "h"
+            )
+            first = datetime.utcnow()
+            last = first + timedelta(seconds=5)
+            repository = SQLAlchemyLoginEventRepository(db)
+            await repository.write_batch(
+                [
+                    LoginEvent(user.id, "password", "1.1.1.1", last),
+                    LoginEvent(user.id, "password", "1.1.1.1", first),
+                ]
+            )
+            # Событие старше сохраненного last_login_at его не откатывает
+            await repository.write_batch(
+                [LoginEvent(user.id, "google", None, first - timedelta(hours=1))]
+            )
+
+            count = await db.scalar(select(func.count()).select_from(LoginEventModel))
+            row = (
+                await db.execute(
+                    select(users.c.last_login_at, users.c.updated_at).where(
+                        users.c.id == user.id
+                    )
+                )
+            ).one()
+
+        assert count == 3
+        assert row.last_login_at == last
+        # Версия пользователя (updated_at) не меняется: токены остаются свежими
+        assert row.updated_at == user.updated_at
@@ -0,0 +1,171 @@
+"""
+Тесты массового импорта/экспорта пользователей (manage_users.py)
+"""
+
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DataError
+
+import manage_users
+from src.database import Base
+
+HASH = "$argon2id$v=19$m=65536,t=3,p=4$c2FsdA$aGFzaA"
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'users.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return url
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+
+class TestValidateBatch:
+    """Проверка пачки моделью UserInDB"""
+
+    def test_invalid_rows_are_reported(self):
+        rows = [
+            (1, {"email": "a@example.com", "hashed_password": HASH}),
+            (2, {"email": "not-an-email"}),
+            (3, None),
+            (4, {"email": "b@example.com", "hashed_password": "$2b$12$bcrypt"}),
+            (5, {"email": "c@example.com", "google_id": "g-1"}),
+        ]
+        records, errors = manage_users.validate_batch(rows)
+
+        assert [r["email"] for r in records] == ["a@example.com", "c@example.com"]
+        assert [line_no for line_no, _ in errors] == [2, 3, 4]
+        assert all(record["id"] and record["created_at"] for record in records)
+
+    def test_each_invalid_row_is_reported_once(self):
+        """Несколько ошибок в одной записи не мешают проверке остальных"""
+        rows = [
+            (1, {"email": "bad", "is_active": "maybe", "created_at": "never"}),
+            (2, {"email": "a@example.com"}),
+            (3, {"email": "b@example.com", "updated_at": "never"}),
+        ]
+        records, errors = manage_users.validate_batch(rows)
+
+        assert [r["email"] for r in records] == ["a@example.com"]
+        assert [line_no for line_no, _ in errors] == [1, 3]
+        assert errors[1][1].startswith("updated_at:")
+
+    def test_id_must_be_uuid(self):
+        """Id не UUID отклоняется до записи в БД"""
+        user_id = "0192b3c4-d5e6-7f80-9a1b-2c3d4e5f6a7b"
+        rows = [
+            (1, {"email": "a@example.com", "id": "42"}),
+            (2, {"email": "b@example.com", "id": user_id.upper()}),
+        ]
+        records, errors = manage_users.validate_batch(rows)
+
+        assert [r["id"] for r in records] == [user_id]
+        assert errors == [(1, "id: expected a UUID")]
+
+
+class TestImportExport:
+    """Импорт и экспорт через SQLite"""
+
+    def test_round_trip(self, tmp_path, database_url):
+        source = tmp_path / "users.jsonl"
+        write_jsonl(
+            source,
+            [
+                {"email": f"user{i}@example.com", "hashed_password": HASH}
+                for i in range(25)
+            ],
+        )
+        manage_users.main(
+            [
+                "--database-url",
+                database_url,
+                "import",
+                str(source),
+                "--batch-size",
+                "10",
+            ]
+        )
+
+        dump = tmp_path / "dump.csv"
+        manage_users.main(["--database-url", database_url, "export", str(dump)])
+        lines = dump.read_text().splitlines()
+        assert lines[0].split(",") == manage_users.FIELDS
+        assert len(lines) == 26
+
+    def test_skip_and_upsert(self, tmp_path, database_url):
+        source = tmp_path / "users.jsonl"
+        write_jsonl(source, [{"email": "a@example.com", "full_name": "Old"}])
+        manage_users.main(["--database-url", database_url, "import", str(source)])
+
+        write_jsonl(
+            source,
+            [{"email": "a@example.com", "full_name": "New", "hashed_password": HASH}],
+        )
+        manage_users.main(["--database-url", database_url, "import", str(source)])
+        export = tmp_path / "dump.jsonl"
+        manage_users.main(["--database-url", database_url, "export", str(export)])
+        assert json.loads(export.read_text())["full_name"] == "Old"
+
+        manage_users.main(
+            [
+                "--database-url",
+                database_url,
+                "import",
+                str(source),
+                "--on-conflict",
+                "upsert",
+            ]
+        )
+        manage_users.main(["--database-url", database_url, "export", str(export)])
+        record = json.loads(export.read_text())
+        assert record["full_name"] == "New"
+        assert record["hashed_password"] == HASH
+
+    def test_invalid_rows_fail_the_run(self, tmp_path, database_url):
+        source = tmp_path / "users.jsonl"
+        write_jsonl(source, [{"email": "bad"}])
+        with pytest.raises(SystemExit):
+            manage_users.main(["--database-url", database_url, "import", str(source)])
+
+    def test_refuses_sharded_users(self, tmp_path, database_url, monkeypatch):
+        """При USER_SHARDS записи не должны идти в обход каталога шардов"""
+        monkeypatch.setattr(
+            manage_users.get_settings(), "user_shards", {"a": database_url}
+        )
+        source = tmp_path / "users.jsonl"
+        write_jsonl(source, [{"email": "a@example.com"}])
+        for command in ("import", "export"):
+            with pytest.raises(SystemExit):
+                manage_users.main(
+                    ["--database-url", database_url, command, str(source)]
+                )
+        assert source.read_text() == '{"email": "a@example.com"}\n'
+
+    def test_data_error_is_reported_per_row(self, database_url, monkeypatch):
+        """DataError (например, слишком длинное значение) не прерывает импорт"""
+        engine = create_engine(database_url)
+        records, _ = manage_users.validate_batch(
+            [(1, {"email": "a@example.com"}), (2, {"email": "b@example.com"})]
+        )
+        with engine.connect() as conn:
+            importer = manage_users.UserImporter(conn, "skip", use_copy=False)
+            write = importer.write
+
+            def write_or_fail(batch):
+                if any(record["email"] == "b@example.com" for record in batch):
+                    raise DataError("INSERT", {}, Exception("value too long"))
+                return write(batch)
+
+            monkeypatch.setattr(importer, "write", write_or_fail)
+            written, failed = importer.write_row_by_row(records)
+        engine.dispose()
+
+        assert written == 1
+        assert failed == [("b@example.com", "value too long")]
@@ -0,0 +1,83 @@
+"""
+Тесты статистики пула соединений
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.utils.pool_stats import InstrumentedQueuePool, PoolStats
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    """Пул из одного соединения без overflow и с коротким таймаутом"""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    yield engine
+    await engine.dispose()
+
+
+class TestPoolStats:
+    """Тесты PoolStats"""
+
+    async def test_checkout_and_checkin(self, engine):
+        stats = PoolStats()
+        stats.attach(engine.sync_engine.pool)
+
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert stats.snapshot(engine.sync_engine.pool)["checked_out"] == 1
+
+        snapshot = stats.snapshot(engine.sync_engine.pool)
+        assert snapshot["connects"] == 1
+        assert snapshot["checkouts"] == snapshot["checkins"] == 1
+        assert snapshot["checked_out"] == 0
+        assert snapshot["wait_ms"]["count"] == 1
+
+    async def test_exhausted_pool_times_out(self, engine):
+        """Таймаут ожидания соединения попадает в статистику"""
+        stats = PoolStats()
+        stats.attach(engine.sync_engine.pool)
+
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        assert stats.timeouts == 1
+        assert stats.wait_max >= 0.1
+
+    async def test_stats_survive_dispose(self, engine):
+        stats = PoolStats()
+        stats.attach(engine.sync_engine.pool)
+        async with engine.connect():
+            pass
+
+        await engine.dispose()
+        async with engine.connect():
+            pass
+
+        assert stats.connects == 2
+        assert engine.sync_engine.pool.stats is stats
+
+    async def test_concurrent_waits_are_recorded(self, engine):
+        """Ожидающие соединения checkout учитываются в среднем времени ожидания"""
+        stats = PoolStats()
+        stats.attach(engine.sync_engine.pool)
+
+        async def query():
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        await asyncio.gather(query(), query())
+        assert stats.wait_count == 2
+        assert stats.timeouts == 0
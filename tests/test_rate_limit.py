@@ -0,0 +1,94 @@
+"""
+Тесты ограничения частоты запросов
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.utils.rate_limit import (
+    AuthRateLimiter,
+    InMemoryRateLimitStore,
+    RateLimitExceeded,
+    SlidingWindowRateLimiter,
+)
+
+
+class FakeClock:
+    """Управляемые часы"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSlidingWindowRateLimiter:
+    """Тесты скользящего окна"""
+
+    async def test_limit_within_window(self):
+        """Запросы сверх лимита в окне отклоняются"""
+        clock = FakeClock()
+        limiter = SlidingWindowRateLimiter(InMemoryRateLimitStore(), "t", 3, 60, clock)
+
+        for _ in range(3):
+            await limiter.hit("key")
+
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            await limiter.hit("key")
+        assert exc_info.value.retry_after >= 1
+
+    async def test_keys_are_independent(self):
+        """Лимиты разных ключей не влияют друг на друга"""
+        limiter = SlidingWindowRateLimiter(
+            InMemoryRateLimitStore(), "t", 1, 60, FakeClock()
+        )
+        await limiter.hit("a")
+        await limiter.hit("b")
+
+    async def test_previous_window_decays(self):
+        """Вклад предыдущего окна уменьшается со временем"""
+        clock = FakeClock(now=60.0)
+        limiter = SlidingWindowRateLimiter(InMemoryRateLimitStore(), "t", 2, 60, clock)
+        for key in ("early", "early", "late", "late"):
+            await limiter.hit(key)
+
+        # Начало следующего окна: предыдущее окно весит почти полностью
+        clock.now = 121.0
+        with pytest.raises(RateLimitExceeded):
+            await limiter.hit("early")
+
+        # Конец следующего окна: вклад предыдущего окна почти нулевой
+        clock.now = 179.0
+        await limiter.hit("late")
+
+
+class TestAuthRateLimiter:
+    """Лимиты входа по IP и по аккаунту"""
+
+    async def test_account_key_is_normalized(self):
+        """Email приводится к нижнему регистру"""
+        limiter = AuthRateLimiter(InMemoryRateLimitStore(), 60, 100, 1, 100, 1)
+        await limiter.check_login("1.1.1.1", "User@Example.com")
+        with pytest.raises(RateLimitExceeded):
+            await limiter.check_login("2.2.2.2", " user@example.com")
+
+
+class TestLoginThrottling:
+    """Ограничение частоты на уровне API"""
+
+    def test_login_returns_429(self):
+        """После исчерпания лимита /auth/login отвечает 429 с Retry-After"""
+        with TestClient(app) as client:
+            client.app.state.auth_rate_limiter = AuthRateLimiter(
+                InMemoryRateLimitStore(), 60, 2, 100, 100, 100
+            )
+            payload = {"email": "nobody@example.com", "password": "password123"}
+
+            assert client.post("/auth/login", json=payload).status_code == 401
+            assert client.post("/auth/login", json=payload).status_code == 401
+
+            response = client.post("/auth/login", json=payload)
+            assert response.status_code == 429
+            assert int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,220 @@
+"""
+Тесты маршрутизации чтений на реплики
+"""
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database import Base
+from src.models.user import UserCreate
+from src.repositories.user_repository import SQLAlchemyUserRepository, users
+from src.services.replica_router import ReplicaRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def create_engine(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+@pytest.fixture
+async def primary(tmp_path):
+    engine = await create_engine(tmp_path / "primary.db")
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def replica(tmp_path):
+    """Отдельная база: "реплика", которая не получает записи primary"""
+    engine = await create_engine(tmp_path / "replica.db")
+    yield engine
+    await engine.dispose()
+
+
+class TestReplicaRouter:
+    """Тесты выбора реплики"""
+
+    def test_round_robin(self, primary, replica):
+        router = ReplicaRouter([primary, replica])
+        assert router.engine_for_read() is primary
+        assert router.engine_for_read() is replica
+        assert router.engine_for_read() is primary
+
+    def test_read_your_writes_window(self, replica):
+        clock = FakeClock()
+        router = ReplicaRouter([replica], read_your_writes_seconds=5, clock=clock)
+        router.note_write(("id", "u1"))
+
+        assert router.engine_for_read(("id", "u1")) is None
+        assert router.engine_for_read(("id", "u2")) is replica
+
+        clock.now += 6
+        assert router.engine_for_read(("id", "u1")) is replica
+
+    def test_ejection_expires(self, replica):
+        clock = FakeClock()
+        router = ReplicaRouter([replica], ejection_seconds=30, clock=clock)
+        router.eject(replica, "test")
+
+        assert router.engine_for_read() is None
+        assert router.stats()["replicas"][0]["ejections"] == 1
+        clock.now += 31
+        assert router.engine_for_read() is replica
+
+    async def test_lagging_replica_is_ejected(self, replica):
+        router = ReplicaRouter([replica], max_lag_seconds=5)
+
+        async def lagging(engine):
+            return 42.0
+
+        router._measure_lag = lagging
+        await router.check()
+        assert router.engine_for_read() is None
+
+        async def caught_up(engine):
+            return 0.0
+
+        router._measure_lag = caught_up
+        await router.check()
+        assert router.engine_for_read() is replica
+
+    async def test_failed_health_check_ejects(self, tmp_path):
+        broken = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}"
+        )
+        router = ReplicaRouter([broken])
+        await router.check()
+        assert router.engine_for_read() is None
+        await broken.dispose()
+
+
+class TestRepositoryRouting:
+    """Репозиторий: чтения на реплике, записи и read-your-writes на primary"""
+
+    async def test_reads_go_to_replica(self, primary, replica):
+        router = ReplicaRouter([replica])
+        async with async_sessionmaker(primary)() as db, async_sessionmaker(
+            replica
+        )() as replica_db:
+            writer = SQLAlchemyUserRepository(db, router)
+            user = await writer.create_user_with_password("r@example.com", "h")
+            # Копия на "реплике" со старым профилем
+            await SQLAlchemyUserRepository(replica_db).create_user(
+                UserCreate(email="r@example.com", google_id="g", full_name="Old"),
+                user_id=user.id,
+            )
+
+            # Сразу после записи - primary
+            assert (await writer.get_user_by_id(user.id)).full_name is None
+
+            # Вне окна read-your-writes - реплика
+            reader = SQLAlchemyUserRepository(db, ReplicaRouter([replica]))
+            assert (await reader.get_user_by_id(user.id)).full_name == "Old"
+            assert (await reader.get_user_by_email("r@example.com")).full_name == (
+                "Old"
+            )
+
+    async def test_replica_miss_without_version_stays_on_replica(
+        self, primary, replica
+    ):
+        """Промах без метки версии (неизвестный email) не идет на primary"""
+        router = ReplicaRouter([replica])
+        async with async_sessionmaker(primary)() as db:
+            user = await SQLAlchemyUserRepository(db).create_user_with_password(
+                "m@example.com", "h"
+            )
+            reader = SQLAlchemyUserRepository(db, router)
+            assert await reader.get_user_by_email("none@example.com") is None
+            assert await reader.get_user_by_id(user.id) is None
+
+            # Метка версии из токена: пользователь есть, реплика отстала
+            found = await reader.get_user_by_id(user.id, user.updated_at)
+            assert found.id == user.id
+
+        stats = router.stats()
+        assert stats["stale_reads"] == 1
+        assert stats["primary_reads"] == 1
+
+    async def test_update_without_returning_notes_write_once(
+        self, primary, replica, monkeypatch
+    ):
+        """Диалект без UPDATE ... RETURNING: перечитывание и одна отметка записи"""
+        router = ReplicaRouter([replica])
+        writes = []
+        monkeypatch.setattr(router, "note_write", lambda *keys: writes.append(keys))
+        monkeypatch.setattr(primary.dialect, "update_returning", False)
+        async with async_sessionmaker(primary)() as db:
+            repository = SQLAlchemyUserRepository(db, router)
+            user = await SQLAlchemyUserRepository(db).create_user_with_password(
+                "w@example.com", "h"
+            )
+            updated = await repository.update_user(user.id, {"full_name": "New"})
+
+        assert updated.full_name == "New"
+        assert writes == [(("id", user.id), ("email", user.email), ("google_id", None))]
+
+    async def test_stale_replica_version_is_reread(self, primary, replica):
+        """Версия на реплике старше метки из токена - читаем primary"""
+        router = ReplicaRouter([replica])
+        async with async_sessionmaker(primary)() as db, async_sessionmaker(
+            replica
+        )() as replica_db:
+            user = await SQLAlchemyUserRepository(db).create_user_with_password(
+                "s@example.com", "h"
+            )
+            await SQLAlchemyUserRepository(replica_db).create_user(
+                UserCreate(email="s@example.com", google_id="g", full_name="Old"),
+                user_id=user.id,
+            )
+            await replica_db.execute(
+                update(users)
+                .where(users.c.id == user.id)
+                .values(updated_at=user.updated_at - timedelta(seconds=1))
+            )
+            await replica_db.commit()
+
+            reader = SQLAlchemyUserRepository(db, router)
+            assert (await reader.get_user_by_id(user.id)).full_name == "Old"
+            fresh = await reader.get_user_by_id(user.id, user.updated_at)
+            assert fresh.full_name is None
+
+    async def test_failed_replica_falls_back_to_primary(self, primary, tmp_path):
+        broken = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}"
+        )
+        router = ReplicaRouter([broken])
+        async with async_sessionmaker(primary)() as db:
+            user = await SQLAlchemyUserRepository(db).create_user_with_password(
+                "f@example.com", "h"
+            )
+            repository = SQLAlchemyUserRepository(db, router)
+            assert (await repository.get_user_by_id(user.id)).id == user.id
+
+        assert router.stats()["replicas"][0]["in_rotation"] is False
+        await broken.dispose()
+
+    async def test_query_error_keeps_replica(self, primary, tmp_path):
+        """Ошибка запроса (здесь - нет таблицы) не исключает живую реплику"""
+        empty = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'empty.db'}")
+        router = ReplicaRouter([empty])
+        async with async_sessionmaker(primary)() as db:
+            repository = SQLAlchemyUserRepository(db, router)
+            with pytest.raises(OperationalError):
+                await repository.get_user_by_email("q@example.com")
+
+        assert router.stats()["replicas"][0]["in_rotation"] is True
+        await empty.dispose()
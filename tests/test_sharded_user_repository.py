@@ -0,0 +1,266 @@
+"""
+Тесты шардированного репозитория пользователей (несколько SQLite баз)
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database import Base
+from src.models.user import UserCreate
+from src.repositories.sharded_user_repository import (
+    ShardedUserRepository,
+    UserShards,
+    rebalance,
+    rebuild_directory,
+    shard_status,
+)
+from src.repositories.user_repository import (
+    SQLAlchemyUserRepository,
+    UserAlreadyExistsError,
+)
+from src.utils.sharding import rendezvous_owner
+
+
+async def create_engine(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+@pytest.fixture
+async def engines(tmp_path):
+    """Основная БД (каталог) и четыре шарда; в тестах используется часть"""
+    created = {
+        name: await create_engine(tmp_path / f"{name}.db")
+        for name in ("main", "a", "b", "c", "d")
+    }
+    yield created
+    for engine in created.values():
+        await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engines):
+    return async_sessionmaker(engines["main"], expire_on_commit=False)
+
+
+def shards_of(engines, *names) -> UserShards:
+    return UserShards({name: engines[name] for name in names})
+
+
+class TestRendezvousHashing:
+    """Тесты выбора шарда"""
+
+    def test_stable_and_order_independent(self):
+        keys = [f"user-{i}" for i in range(100)]
+        owners = [rendezvous_owner(key, ["a", "b", "c"]) for key in keys]
+        assert owners == [rendezvous_owner(key, ["c", "a", "b"]) for key in keys]
+        assert set(owners) == {"a", "b", "c"}
+
+    def test_adding_shard_moves_only_its_share(self):
+        keys = [f"user-{i}" for i in range(3000)]
+        moved = [
+            key
+            for key in keys
+            if rendezvous_owner(key, ["a", "b", "c"])
+            != rendezvous_owner(key, ["a", "b", "c", "d"])
+        ]
+        # Переезжают только ключи нового шарда, примерно четверть
+        assert all(rendezvous_owner(key, ["a", "b", "c", "d"]) == "d" for key in moved)
+        assert 0.2 < len(moved) / len(keys) < 0.3
+
+
+class TestShardedUserRepository:
+    """Тесты репозитория поверх нескольких шардов"""
+
+    async def test_lookups(self, engines, session_factory):
+        shards = shards_of(engines, "a", "b", "c")
+        async with session_factory() as db:
+            repository = ShardedUserRepository(db, shards)
+            created = [
+                await repository.create_user_with_password(f"u{i}@example.com", "h")
+                for i in range(20)
+            ]
+            google = await repository.create_user(
+                UserCreate(email="G@example.com", google_id="google-1")
+            )
+
+            for user in created:
+                assert (await repository.get_user_by_id(user.id)).email == user.email
+            found = await repository.get_user_by_email("U3@Example.com")
+            assert found.id == created[3].id
+            assert (await repository.get_user_by_google_id("google-1")).id == google.id
+            assert await repository.get_user_by_email("missing@example.com") is None
+
+        counts = await shard_status(shards)
+        assert sum(c["users"] for c in counts.values()) == 21
+        assert all(c["users"] > 0 for c in counts.values())
+        assert all(c["misplaced"] == 0 for c in counts.values())
+
+    async def test_email_is_unique_across_shards(self, engines, session_factory):
+        async with session_factory() as db:
+            repository = ShardedUserRepository(db, shards_of(engines, "a", "b"))
+            await repository.create_user_with_password("dup@example.com", "h")
+            # Другой id почти наверняка попадет на другой шард - ловит каталог
+            for _ in range(5):
+                with pytest.raises(UserAlreadyExistsError):
+                    await repository.create_user_with_password("dup@example.com", "h")
+
+    async def test_google_upsert_and_update(self, engines, session_factory):
+        async with session_factory() as db:
+            repository = ShardedUserRepository(db, shards_of(engines, "a", "b"))
+            user = await repository.upsert_google_user(
+                UserCreate(email="g@example.com", google_id="google-2", full_name="G")
+            )
+            again = await repository.upsert_google_user(
+                UserCreate(email="g@example.com", google_id="google-2", full_name="H")
+            )
+            assert again.id == user.id
+            assert again.full_name == "H"
+
+            updated = await repository.update_user(
+                user.id, {"email": "new@example.com"}
+            )
+            assert updated.email == "new@example.com"
+            assert (await repository.get_user_by_email("new@example.com")).id == user.id
+            assert await repository.get_user_by_email("g@example.com") is None
+
+    async def test_list_users_merges_shards(self, engines, session_factory):
+        async with session_factory() as db:
+            repository = ShardedUserRepository(db, shards_of(engines, "a", "b", "c"))
+            for i in range(10):
+                await repository.create_user_with_password(f"l{i}@example.com", "h")
+
+            first = await repository.list_users(6)
+            last = first[-1]
+            second = await repository.list_users(6, (last.created_at, last.id))
+
+        page = first + second
+        assert len(page) == 10
+        keys = [(user.created_at, user.id) for user in page]
+        assert keys == sorted(keys)
+
+
+class TestRebalance:
+    """Тесты переноса пользователей при добавлении шарда"""
+
+    async def test_add_shard(self, engines, session_factory):
+        old = shards_of(engines, "a", "b")
+        async with session_factory() as db:
+            repository = ShardedUserRepository(db, old)
+            users = [
+                await repository.create_user_with_password(f"r{i}@example.com", "h")
+                for i in range(40)
+            ]
+
+        new = shards_of(engines, "a", "b", "c")
+        planned = await rebalance(engines["main"], new, batch_size=7, dry_run=True)
+        assert sum(planned.values()) > 0
+        assert all(route.endswith("-> c") for route in planned)
+
+        # До переноса пользователи доступны через каталог
+        async with session_factory() as db:
+            repository = ShardedUserRepository(db, new)
+            for user in users:
+                assert (await repository.get_user_by_id(user.id)) is not None
+
+        moved = await rebalance(engines["main"], new, batch_size=7)
+        assert moved == planned
+        counts = await shard_status(new)
+        assert all(c["misplaced"] == 0 for c in counts.values())
+        assert sum(c["users"] for c in counts.values()) == 40
+
+        async with session_factory() as db:
+            repository = ShardedUserRepository(db, new)
+            for user in users:
+                assert (await repository.get_user_by_id(user.id)).id == user.id
+                assert (await repository.get_user_by_email(user.email)).id == user.id
+
+    async def test_writes_during_move_are_kept(self, engines, session_factory):
+        """Запись, пришедшая между копией и удалением, не теряется"""
+        old = shards_of(engines, "a")
+        async with session_factory() as db:
+            repository = ShardedUserRepository(db, old)
+            created = [
+                await repository.create_user_with_password(f"m{i}@example.com", "h")
+                for i in range(20)
+            ]
+            created += [
+                await repository.upsert_google_user(
+                    UserCreate(
+                        email=f"g{i}@example.com", full_name="Old", google_id=f"g{i}"
+                    )
+                )
+                for i in range(20)
+            ]
+
+        new = shards_of(engines, "a", "b")
+        movers = [user for user in created if new.owner(user.id) == "b"]
+        password_user = next(user for user in movers if user.google_id is None)
+        google_user = next(user for user in movers if user.google_id is not None)
+
+        async def rename():
+            async with session_factory() as db:
+                repository = ShardedUserRepository(db, new)
+                await repository.update_user(password_user.id, {"full_name": "New"})
+
+        async def sign_in():
+            async with session_factory() as db:
+                repository = ShardedUserRepository(db, new)
+                await repository.upsert_google_user(
+                    UserCreate(
+                        email=google_user.email,
+                        full_name="New",
+                        google_id=google_user.google_id,
+                    )
+                )
+
+        writes = []
+
+        class PausingDirectory:
+            """Каталог: перед переключением записи успевают дойти до источника"""
+
+            dialect = engines["main"].dialect
+
+            @asynccontextmanager
+            async def begin(self):
+                if not writes:
+                    writes.extend(
+                        [
+                            asyncio.ensure_future(rename()),
+                            asyncio.ensure_future(sign_in()),
+                        ]
+                    )
+                    await asyncio.wait(writes, timeout=0.5)
+                async with engines["main"].begin() as conn:
+                    yield conn
+
+        await rebalance(PausingDirectory(), new)
+        await asyncio.gather(*writes)
+
+        assert writes
+        counts = await shard_status(new)
+        assert sum(c["users"] for c in counts.values()) == len(created)
+        async with session_factory() as db:
+            repository = ShardedUserRepository(db, new)
+            for user in (password_user, google_user):
+                stored = await repository.get_user_by_id(user.id)
+                assert stored.full_name == "New"
+
+    async def test_rebuild_directory(self, engines, session_factory):
+        """Существующая БД становится одним из шардов"""
+        async with async_sessionmaker(engines["a"])() as db:
+            legacy = SQLAlchemyUserRepository(db)
+            user = await legacy.create_user_with_password("old@example.com", "h")
+
+        shards = shards_of(engines, "a", "b")
+        assert await rebuild_directory(engines["main"], shards) == 1
+        await rebalance(engines["main"], shards)
+
+        async with session_factory() as db:
+            repository = ShardedUserRepository(db, shards)
+            assert (await repository.get_user_by_email("old@example.com")).id == user.id
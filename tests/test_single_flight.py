@@ -0,0 +1,171 @@
+"""
+Тесты объединения одновременных поисков пользователей
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.models.user import UserRecord
+from src.repositories.single_flight_user_repository import SingleFlightUserRepository
+from src.utils.single_flight import SingleFlight
+
+
+class Gate:
+    """Запрос, который ждет разрешения и считает вызовы"""
+
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.opened = asyncio.Event()
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await self.opened.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestSingleFlight:
+    """Тесты SingleFlight"""
+
+    async def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        query = Gate(result="user")
+        tasks = [asyncio.create_task(flight.do("k", query)) for _ in range(10)]
+        await settle()
+        query.opened.set()
+
+        assert await asyncio.gather(*tasks) == ["user"] * 10
+        assert query.calls == 1
+        assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 9}
+
+    async def test_keys_are_separate(self):
+        flight = SingleFlight()
+        query = Gate(result="user")
+        query.opened.set()
+        await asyncio.gather(
+            flight.do(("id", "1"), query), flight.do(("id", "2"), query)
+        )
+        assert query.calls == 2
+
+    async def test_error_is_shared_but_not_cached(self):
+        flight = SingleFlight()
+        failing = Gate(error=RuntimeError("db down"))
+        tasks = [asyncio.create_task(flight.do("k", failing)) for _ in range(3)]
+        await settle()
+        failing.opened.set()
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert failing.calls == 1
+
+        recovered = Gate(result="user")
+        recovered.opened.set()
+        assert await flight.do("k", recovered) == "user"
+
+    async def test_cancelled_leader_hands_over(self):
+        """Отмена первого вызова (разрыв соединения) не отменяет остальных"""
+        flight = SingleFlight()
+        query = Gate(result="user")
+        leader = asyncio.create_task(flight.do("k", query))
+        await settle()
+        follower = asyncio.create_task(flight.do("k", query))
+        await settle()
+
+        leader.cancel()
+        await settle()
+        query.opened.set()
+
+        assert await follower == "user"
+        assert query.calls == 2
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    async def test_cancelled_follower_keeps_query(self):
+        flight = SingleFlight()
+        query = Gate(result="user")
+        leader = asyncio.create_task(flight.do("k", query))
+        await settle()
+        follower = asyncio.create_task(flight.do("k", query))
+        await settle()
+
+        follower.cancel()
+        await settle()
+        query.opened.set()
+
+        assert await leader == "user"
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+
+
+def make_user(user_id="u1", email="a@example.com") -> UserRecord:
+    now = datetime.utcnow()
+    return UserRecord(user_id, email, None, None, None, None, True, now, now)
+
+
+class CountingRepository:
+    """Репозиторий, отвечающий после разрешения теста"""
+
+    def __init__(self, user: UserRecord):
+        self.user = user
+        self.opened = asyncio.Event()
+        self.queries = []
+
+    async def get_user_by_id(self, user_id, min_updated_at=None):
+        self.queries.append(("id", user_id))
+        await self.opened.wait()
+        return self.user
+
+    async def get_user_by_email(self, email):
+        self.queries.append(("email", email))
+        await self.opened.wait()
+        return self.user
+
+    async def update_user(self, user_id, user_data):
+        self.user = make_user(user_id, user_data["email"])
+        return self.user
+
+
+class TestSingleFlightUserRepository:
+    """Тесты SingleFlightUserRepository"""
+
+    async def test_lookups_are_coalesced_per_key(self):
+        source = CountingRepository(make_user())
+        repository = SingleFlightUserRepository(source, SingleFlight())
+        tasks = [
+            asyncio.create_task(repository.get_user_by_id("u1")) for _ in range(20)
+        ] + [
+            asyncio.create_task(repository.get_user_by_email("A@example.com"))
+            for _ in range(20)
+        ]
+        await settle()
+        source.opened.set()
+
+        users = await asyncio.gather(*tasks)
+        assert {user.id for user in users} == {"u1"}
+        assert source.queries == [("id", "u1"), ("email", "A@example.com")]
+
+    async def test_update_forgets_in_flight_reads(self):
+        """Чтение после записи не присоединяется к чтению, начатому до нее"""
+        source = CountingRepository(make_user())
+        repository = SingleFlightUserRepository(source, SingleFlight())
+        before = asyncio.create_task(repository.get_user_by_id("u1"))
+        await settle()
+
+        await repository.update_user("u1", {"email": "b@example.com"})
+        after = asyncio.create_task(repository.get_user_by_id("u1"))
+        await settle()
+        source.opened.set()
+
+        await before
+        assert (await after).email == "b@example.com"
+        assert source.queries == [("id", "u1"), ("id", "u1")]
@@ -0,0 +1,160 @@
+"""
+Тесты кодека JWT
+"""
+
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from src.main import app
+from src.services.token_codec import JWTCodec, TokenError, create_key_ring
+
+
+@pytest.fixture
+def codec():
+    return JWTCodec(create_key_ring("secret"))
+
+
+class TestJWTCodec:
+    """Выпуск и проверка токенов"""
+
+    def test_roundtrip(self, codec):
+        """Подписанный токен проверяется и возвращает claims"""
+        claims = {"sub": "user-1", "exp": int(time.time()) + 60}
+        assert codec.decode(codec.encode(claims)) == claims
+
+    def test_compatible_with_jose(self, codec):
+        """Токены совместимы с python-jose в обе стороны"""
+        exp = int(time.time()) + 60
+        token = codec.encode({"sub": "user-1", "exp": exp})
+        assert jwt.decode(token, "secret", algorithms=["HS256"])["sub"] == "user-1"
+
+        legacy = jwt.encode({"user_id": "user-1", "exp": exp}, "secret", "HS256")
+        assert codec.decode(legacy)["user_id"] == "user-1"
+
+    def test_expired(self, codec):
+        """Истекший токен отклоняется"""
+        token = codec.encode({"sub": "user-1", "exp": int(time.time()) - 1})
+        with pytest.raises(TokenError):
+            codec.decode(token)
+
+    def test_tampered_payload(self, codec):
+        """Измененный payload не проходит проверку подписи"""
+        header, _, signature = codec.encode({"sub": "a"}).split(".")
+        forged = JWTCodec(create_key_ring("other")).encode({"sub": "b"})
+        with pytest.raises(TokenError):
+            codec.decode(".".join([header, forged.split(".")[1], signature]))
+
+    @pytest.mark.parametrize("token", ["", "a.b", "a.b.c", "ключ.b.c", "a.b.c.d"])
+    def test_malformed(self, codec, token):
+        """Мусор вместо токена дает TokenError"""
+        with pytest.raises(TokenError):
+            codec.decode(token)
+
+    def test_alg_none_rejected(self, codec):
+        """Заголовок с alg=none не принимается"""
+        token = jwt.encode({"sub": "a"}, "secret", "HS256")
+        _, payload, signature = token.split(".")
+        header = "eyJhbGciOiJub25lIiwidHlwIjoiSldUIn0"  # {"alg":"none","typ":"JWT"}
+        with pytest.raises(TokenError):
+            codec.decode(f"{header}.{payload}.{signature}")
+
+
+class TestKeyRotation:
+    """Ротация ключей по kid"""
+
+    def test_old_tokens_survive_rotation(self):
+        """Токены старого ключа валидны после смены активного ключа"""
+        old = JWTCodec(create_key_ring("secret", keys={"k1": "one"}, active_kid="k1"))
+        token = old.encode({"sub": "user-1"})
+
+        rotated = JWTCodec(
+            create_key_ring("secret", keys={"k1": "one", "k2": "two"}, active_kid="k2")
+        )
+        assert rotated.decode(token)["sub"] == "user-1"
+        assert rotated.key_ring.active.kid == "k2"
+
+    def test_removed_key_rejected(self):
+        """После удаления ключа из набора его токены отклоняются"""
+        old = JWTCodec(create_key_ring("secret", keys={"k1": "one"}, active_kid="k1"))
+        token = old.encode({"sub": "user-1"})
+
+        with pytest.raises(TokenError):
+            JWTCodec(create_key_ring("secret")).decode(token)
+
+    def test_hs512(self):
+        """Поддерживается HS512"""
+        codec = JWTCodec(create_key_ring("secret", algorithm="HS512"))
+        token = codec.encode({"sub": "user-1"})
+        assert jwt.decode(token, "secret", algorithms=["HS512"])["sub"] == "user-1"
+
+
+def write_pem(path, private_key):
+    """Сохранить приватный ключ в PEM файл"""
+    path.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return str(path)
+
+
+class TestAsymmetricKeys:
+    """Подпись EdDSA/RS256 и публикация JWKS"""
+
+    def test_eddsa_roundtrip(self, tmp_path):
+        """Токен, подписанный Ed25519, проверяется и публикуется в JWKS"""
+        key_file = write_pem(tmp_path / "ed.pem", ed25519.Ed25519PrivateKey.generate())
+        codec = JWTCodec(
+            create_key_ring("secret", key_files={"ed1": key_file}, active_kid="ed1")
+        )
+
+        token = codec.encode({"sub": "user-1"})
+        assert codec.decode(token)["sub"] == "user-1"
+        assert [jwk["kid"] for jwk in codec.key_ring.public_jwks] == ["ed1"]
+        assert codec.key_ring.public_jwks[0]["crv"] == "Ed25519"
+
+    def test_rs256_verifiable_from_jwks(self, tmp_path):
+        """Сторонний сервис проверяет RS256 токен по опубликованному JWK"""
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        key_file = write_pem(tmp_path / "rsa.pem", private_key)
+        codec = JWTCodec(
+            create_key_ring("secret", key_files={"rsa1": key_file}, active_kid="rsa1")
+        )
+
+        token = codec.encode({"sub": "user-1"})
+        jwk = codec.key_ring.public_jwks[0]
+        assert jwt.decode(token, jwk, algorithms=["RS256"])["sub"] == "user-1"
+
+    def test_hmac_secret_not_published(self, codec):
+        """Симметричные ключи в JWKS не попадают"""
+        assert codec.key_ring.public_jwks == []
+
+    def test_algorithm_confusion_rejected(self, tmp_path):
+        """HS256 токен с kid асимметричного ключа отклоняется"""
+        key_file = write_pem(tmp_path / "ed.pem", ed25519.Ed25519PrivateKey.generate())
+        codec = JWTCodec(create_key_ring("secret", key_files={"ed1": key_file}))
+
+        forged = jwt.encode({"sub": "a"}, "secret", "HS256", headers={"kid": "ed1"})
+        with pytest.raises(TokenError):
+            codec.decode(forged)
+
+    def test_jwks_endpoint(self):
+        """JWKS отдается с Cache-Control и поддерживает условные запросы"""
+        with TestClient(app) as client:
+            response = client.get("/.well-known/jwks.json")
+            assert response.status_code == 200
+            assert response.json() == {"keys": []}
+            assert "max-age=" in response.headers["cache-control"]
+
+            cached = client.get(
+                "/.well-known/jwks.json",
+                headers={"If-None-Match": response.headers["etag"]},
+            )
+            assert cached.status_code == 304
@@ -0,0 +1,97 @@
+"""
+Тесты отзыва токенов доступа: AuthService и фильтр поверх denylist
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.services.token_cache import VerifiedTokenCache
+from src.services.token_revocation import TokenRevocationList
+from tests.fakes import InMemoryRefreshTokenRepository, InMemoryRevokedTokenRepository
+
+
+@pytest.fixture
+def revoked_repository():
+    return InMemoryRevokedTokenRepository()
+
+
+@pytest.fixture
+def revoking_auth_service(auth_service, revoked_repository):
+    auth_service.revocation_list = TokenRevocationList(capacity=1000)
+    auth_service.revoked_token_repository = revoked_repository
+    auth_service.token_cache = VerifiedTokenCache(maxsize=100, ttl_seconds=60)
+    auth_service.refresh_token_repository = InMemoryRefreshTokenRepository()
+    return auth_service
+
+
+class TestTokenRevocation:
+    """Тесты отзыва токенов в AuthService"""
+
+    async def test_revoked_token_is_rejected(self, revoking_auth_service):
+        """После logout токен не проходит проверку, даже из кэша"""
+        _, token = await revoking_auth_service.register_user(
+            "a@example.com", "password1"
+        )
+        access_token = token.access_token
+        assert await revoking_auth_service.verify_token(access_token) is not None
+
+        assert await revoking_auth_service.revoke_access_token(access_token)
+        assert await revoking_auth_service.verify_token(access_token) is None
+        assert await revoking_auth_service.get_current_user(access_token) is None
+
+    async def test_valid_token_skips_denylist(
+        self, revoking_auth_service, revoked_repository
+    ):
+        """Неотозванный токен проверяется без запроса к denylist"""
+        _, token = await revoking_auth_service.register_user(
+            "b@example.com", "password1"
+        )
+        await revoking_auth_service.verify_token(token.access_token)
+        assert revoked_repository.lookups == 0
+
+    async def test_other_tokens_stay_valid(self, revoking_auth_service):
+        """Отзыв одного токена не затрагивает другие сессии"""
+        _, first = await revoking_auth_service.register_user(
+            "c@example.com", "password1"
+        )
+        _, second = await revoking_auth_service.authenticate_user(
+            "c@example.com", "password1"
+        )
+        await revoking_auth_service.revoke_access_token(first.access_token)
+        assert await revoking_auth_service.verify_token(second.access_token)
+
+    async def test_logout_revokes_refresh_token(self, revoking_auth_service):
+        """Refresh токен сессии после logout не обменивается"""
+        _, token = await revoking_auth_service.register_user(
+            "d@example.com", "password1"
+        )
+        await revoking_auth_service.revoke_refresh_token(token.refresh_token)
+        assert await revoking_auth_service.refresh_tokens(token.refresh_token) is None
+
+    async def test_invalid_token_cannot_be_revoked(self, revoking_auth_service):
+        assert not await revoking_auth_service.revoke_access_token("invalid")
+
+
+class TestTokenRevocationList:
+    """Тесты синхронизации фильтра с denylist"""
+
+    async def test_sync_picks_up_other_workers(self, revoked_repository):
+        """Отзывы, сделанные другим воркером, попадают в фильтр при sync"""
+        revocation_list = TokenRevocationList(capacity=100)
+        await revocation_list.rebuild(revoked_repository)
+        assert not revocation_list.might_be_revoked("jti-1")
+
+        await revoked_repository.revoke("jti-1", datetime.utcnow() + timedelta(hours=1))
+        await revocation_list.sync(revoked_repository)
+        assert revocation_list.might_be_revoked("jti-1")
+
+    async def test_rebuild_drops_expired(self, revoked_repository):
+        """Пересборка убирает из фильтра истекшие токены"""
+        revocation_list = TokenRevocationList(capacity=100)
+        await revoked_repository.revoke("old", datetime.utcnow() - timedelta(hours=1))
+        await revoked_repository.revoke("new", datetime.utcnow() + timedelta(hours=1))
+
+        await revocation_list.rebuild(revoked_repository)
+        assert revocation_list.might_be_revoked("new")
+        assert not revocation_list.might_be_revoked("old")
@@ -0,0 +1,425 @@
+"""
+Тесты SQLAlchemy репозитория пользователей на асинхронном движке (aiosqlite)
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select, text
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.config import get_settings
+from src.database import (
+    Base,
+    LazySession,
+    ReadRoutingSession,
+    RequestSession,
+    RevokedTokenModel,
+    UserId,
+    UserModel,
+    configure_sqlite,
+    get_async_database_url,
+    is_sqlite_memory,
+    request_session,
+)
+from src.models.user import User, UserCreate, UserLogin, UserRecord, UserRegister
+from src.repositories.revoked_token_repository import (
+    SQLAlchemyRevokedTokenRepository,
+)
+from src.repositories.user_repository import (
+    SQLAlchemyUserRepository,
+    UserAlreadyExistsError,
+    new_user_id,
+)
+from src.utils.ids import uuid7
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    """Отдельная SQLite база со схемой из моделей"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL запросы, выполненные через engine"""
+    executed = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    return executed
+
+
+class TestAsyncDatabaseUrl:
+    """Тесты выбора асинхронного драйвера по database_url"""
+
+    def test_sqlite(self):
+        assert (
+            get_async_database_url("sqlite:///./oauth_app.db")
+            == "sqlite+aiosqlite:///./oauth_app.db"
+        )
+
+    def test_postgres(self):
+        url = "postgresql://user:pass@db:5432/app"
+        assert (
+            get_async_database_url(url) == "postgresql+asyncpg://user:pass@db:5432/app"
+        )
+        psycopg2_url = "postgresql+psycopg2://user:pass@db:5432/app"
+        assert get_async_database_url(psycopg2_url) == (
+            "postgresql+asyncpg://user:pass@db:5432/app"
+        )
+
+    def test_async_url_is_kept(self):
+        url = "postgresql+asyncpg://db/app"
+        assert get_async_database_url(url) == url
+
+
+class TestSQLiteProfile:
+    """Тесты PRAGMA профиля SQLite"""
+
+    async def test_pragmas(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'wal.db'}")
+        configure_sqlite(engine, get_settings())
+        async with engine.connect() as conn:
+            journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+        await engine.dispose()
+
+        assert journal_mode == "wal"
+        assert busy_timeout == get_settings().sqlite_busy_timeout_ms
+
+    async def test_reader_is_read_only(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ro.db'}")
+        configure_sqlite(engine, get_settings(), query_only=True)
+        async with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                await conn.execute(text("CREATE TABLE t (id INTEGER)"))
+        await engine.dispose()
+
+
+class TestReadRoutingSession:
+    """WAL профиль: чтения сессии - в пул только для чтения"""
+
+    @pytest.fixture
+    async def routed(self, tmp_path):
+        url = f"sqlite+aiosqlite:///{tmp_path / 'routed.db'}"
+        writer = create_async_engine(url)
+        reader = create_async_engine(url)
+        configure_sqlite(writer, get_settings())
+        configure_sqlite(reader, get_settings(), query_only=True)
+        async with writer.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        yield async_sessionmaker(
+            writer,
+            expire_on_commit=False,
+            sync_session_class=ReadRoutingSession,
+            info={"reader": reader.sync_engine},
+        ), reader
+        await writer.dispose()
+        await reader.dispose()
+
+    async def test_reads_use_reader(self, routed):
+        factory, reader = routed
+        async with factory() as db:
+            users = SQLAlchemyUserRepository(db)
+            user = await users.create_user_with_password("rw@example.com", "h")
+            revoked = SQLAlchemyRevokedTokenRepository(db)
+            await revoked.revoke("jti-1", datetime.utcnow() + timedelta(hours=1))
+
+            query = select(UserModel.id)
+            assert db.sync_session.get_bind(clause=query) is reader.sync_engine
+            assert (await users.get_user_by_id(user.id)).id == user.id
+            assert await revoked.is_revoked("jti-1")
+
+    async def test_reads_after_write_stay_on_writer(self, routed):
+        """Незакоммиченную запись видит только соединение писателя"""
+        factory, reader = routed
+        async with factory() as db:
+            db.add(RevokedTokenModel(jti="jti-2", expires_at=datetime.utcnow()))
+            await db.flush()
+            query = select(RevokedTokenModel.jti)
+            assert db.sync_session.get_bind(clause=query) is not reader.sync_engine
+            assert await db.scalar(query) == "jti-2"
+            await db.commit()
+
+            assert db.sync_session.get_bind(clause=query) is reader.sync_engine
+
+    def test_memory_urls(self):
+        assert is_sqlite_memory("sqlite+aiosqlite:///:memory:")
+        assert is_sqlite_memory("sqlite+aiosqlite://")
+        assert is_sqlite_memory("sqlite+aiosqlite:///file:db?mode=memory&uri=true")
+        assert not is_sqlite_memory("sqlite+aiosqlite:///./oauth_app.db")
+
+
+class TestLazySession:
+    """Сессия запроса создается при первом обращении"""
+
+    async def test_created_on_first_use(self, session_factory):
+        created = []
+
+        def factory():
+            created.append(session_factory())
+            return created[-1]
+
+        db = LazySession(factory)
+        await db.close()
+        assert created == []
+
+        db = LazySession(factory)
+        repository = SQLAlchemyUserRepository(db)
+        user = await repository.create_user_with_password("lazy@example.com", "h")
+        assert db.started and len(created) == 1
+        assert (await repository.get_user_by_id(user.id)).id == user.id
+        await db.close()
+
+    async def test_request_session_proxy(self, session_factory):
+        repository = SQLAlchemyUserRepository(RequestSession())
+        with pytest.raises(RuntimeError):
+            await repository.get_user_by_id("missing")
+
+        token = request_session.set(LazySession(session_factory))
+        try:
+            assert await repository.get_user_by_id("missing") is None
+        finally:
+            await request_session.get().close()
+            request_session.reset(token)
+
+
+class TestUserIds:
+    """Упорядоченные по времени id пользователей"""
+
+    def test_uuid7_layout(self):
+        value = uuid7()
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+        assert abs((value.int >> 80) - time.time_ns() // 1_000_000) < 1000
+
+    def test_ids_grow_with_time(self):
+        ids = []
+        for _ in range(5):
+            ids.append(new_user_id())
+            time.sleep(0.002)
+        assert ids == sorted(ids)
+        assert len(set(new_user_id() for _ in range(10000))) == 10000
+
+    def test_postgres_id_binds_without_cast(self):
+        """Запросы одинаково работают с varchar и uuid колонкой"""
+        users = UserModel.__table__
+        sql = str(
+            select(users.c.id)
+            .where(users.c.id == "x")
+            .compile(dialect=asyncpg.dialect())
+        )
+        assert "::" not in sql
+
+        value = uuid7()
+        result = UserId().process_result_value(value, asyncpg.dialect())
+        assert result == str(value)
+
+
+class TestEmailNormalization:
+    """Email приводится к нижнему регистру на входе API"""
+
+    def test_register_and_login(self):
+        register = UserRegister(email=" Mixed@Example.COM", password="p")
+        login = UserLogin(email="MIXED@example.com", password="p")
+        assert register.email == login.email == "mixed@example.com"
+
+    def test_google_user(self):
+        user = UserCreate(email="Google@Example.com", google_id="g")
+        assert user.email == "google@example.com"
+
+
+class TestSQLAlchemyUserRepository:
+    """Тесты SQLAlchemyUserRepository на AsyncSession"""
+
+    async def test_create_and_get(self, session_factory):
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            user = await repository.create_user_with_password(
+                "a@example.com", "hash", "Alice"
+            )
+
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            record = await repository.get_user_by_id(user.id)
+            assert isinstance(record, UserRecord)
+            assert not hasattr(record, "__dict__")
+            assert record.email == "a@example.com"
+            assert record.to_user() == User(
+                id=user.id, email="a@example.com", full_name="Alice", is_active=True
+            )
+            assert (await repository.get_user_by_email("a@example.com")).id == user.id
+            assert await repository.get_user_by_email("missing@example.com") is None
+
+    async def test_google_user_and_update(self, session_factory):
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            user = await repository.create_user(
+                UserCreate(email="g@example.com", google_id="google-1")
+            )
+            assert (await repository.get_user_by_google_id("google-1")).id == user.id
+
+            updated = await repository.update_user(
+                user.id, {"full_name": "Gina", "google_id": "other"}
+            )
+            assert updated.full_name == "Gina"
+            assert updated.google_id == "google-1"
+            assert await repository.update_user("missing", {"full_name": "X"}) is None
+
+    async def test_concurrent_sessions(self, session_factory):
+        """Запросы в разных сессиях выполняются конкурентно в одном event loop"""
+
+        async def register(i: int):
+            async with session_factory() as db:
+                repository = SQLAlchemyUserRepository(db)
+                return await repository.create_user_with_password(
+                    f"user{i}@example.com", "hash"
+                )
+
+        users = await asyncio.gather(*(register(i) for i in range(10)))
+        assert len({user.id for user in users}) == 10
+
+
+class TestSingleStatementWrites:
+    """Запись одним запросом: upsert для Google и вставка по ограничению"""
+
+    async def test_google_upsert_creates_and_updates(self, session_factory):
+        google_user = UserCreate(
+            email="g@example.com", google_id="google-1", full_name="Gina"
+        )
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            created = await repository.upsert_google_user(google_user)
+            same = await repository.upsert_google_user(google_user)
+            assert same.id == created.id
+            # Данные не изменились - версия пользователя тоже
+            assert same.updated_at == created.updated_at
+
+            renamed = await repository.upsert_google_user(
+                google_user.model_copy(update={"full_name": "Gina B", "picture": ""})
+            )
+            assert renamed.id == created.id
+            assert renamed.full_name == "Gina B"
+            assert renamed.updated_at > created.updated_at
+
+            kept = await repository.upsert_google_user(
+                google_user.model_copy(update={"full_name": None})
+            )
+            assert kept.full_name == "Gina B"
+
+    async def test_google_upsert_is_one_statement(self, session_factory, statements):
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            await repository.upsert_google_user(
+                UserCreate(email="one@example.com", google_id="google-2")
+            )
+            statements.clear()
+            await repository.upsert_google_user(
+                UserCreate(email="one@example.com", google_id="google-2")
+            )
+
+        assert len(statements) == 1
+        assert "ON CONFLICT" in statements[0]
+
+    async def test_duplicate_email_is_rejected_by_constraint(
+        self, session_factory, statements
+    ):
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            await repository.create_user_with_password("dup@example.com", "hash")
+            statements.clear()
+            with pytest.raises(UserAlreadyExistsError):
+                await repository.create_user_with_password("dup@example.com", "hash")
+
+        assert len(statements) == 1
+
+    async def test_google_email_conflict(self, session_factory):
+        """Новый google_id с занятым email - ошибка, а не второй пользователь"""
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            await repository.create_user_with_password("taken@example.com", "hash")
+            with pytest.raises(UserAlreadyExistsError):
+                await repository.upsert_google_user(
+                    UserCreate(email="taken@example.com", google_id="google-3")
+                )
+
+    async def test_email_case_is_ignored(self, session_factory, statements):
+        """Foo@x.com и foo@x.com - один аккаунт, поиск идет по lower(email)"""
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            user = await repository.create_user_with_password("Case@Example.com", "h")
+            with pytest.raises(UserAlreadyExistsError):
+                await repository.create_user_with_password("case@example.com", "h")
+            statements.clear()
+            found = await repository.get_user_by_email("CASE@example.COM")
+
+        assert user.email == "case@example.com"
+        assert found.id == user.id
+        assert "lower(users.email)" in statements[0]
+
+    async def test_update_returns_row(self, session_factory, statements):
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            user = await repository.create_user_with_password("u@example.com", "h")
+            statements.clear()
+            updated = await repository.update_user(user.id, {"full_name": "Uma"})
+
+        assert updated.full_name == "Uma"
+        assert len(statements) == 1
+
+
+class TestListUsers:
+    """Тесты keyset пагинации списка пользователей"""
+
+    async def test_pages_cover_all_users(self, session_factory):
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            for i in range(5):
+                await repository.create_user_with_password(f"p{i}@example.com", "h")
+
+            seen, after = [], None
+            while True:
+                page = await repository.list_users(2, after)
+                seen.extend(page)
+                if len(page) < 2:
+                    break
+                after = (page[-1].created_at, page[-1].id)
+
+        assert len(seen) == 5
+        assert len({user.id for user in seen}) == 5
+        keys = [(user.created_at, user.id) for user in seen]
+        assert keys == sorted(keys)
+
+    async def test_filters(self, session_factory):
+        async with session_factory() as db:
+            repository = SQLAlchemyUserRepository(db)
+            await repository.create_user_with_password("pw@example.com", "h")
+            google = await repository.create_user(
+                UserCreate(email="g@example.com", google_id="google-9")
+            )
+            await repository.update_user(google.id, {"is_active": False})
+
+            by_google = await repository.list_users(10, auth_method="google")
+            by_password = await repository.list_users(10, auth_method="password")
+            inactive = await repository.list_users(10, is_active=False)
+
+        assert [user.email for user in by_google] == ["g@example.com"]
+        assert [user.email for user in by_password] == ["pw@example.com"]
+        assert [user.email for user in inactive] == ["g@example.com"]